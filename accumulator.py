@@ -0,0 +1,117 @@
+import numpy as np
+
+# Column order of StatAccumulator.counts
+COUNTERS = ['Games', 'RedGames', 'BlueGames', 'Wins', 'RedWins', 'BlueWins']
+
+# Stat values and minutes are summed as integer thousandths, so totals are
+# exact and do not depend on the order matches are added or merged in.
+# Per-match values have at most a couple of decimals; finer digits round off.
+FIXED_POINT = 1000
+
+
+def to_fixed(values):
+    """(fixed-point int64 values, NaN mask) of a float array."""
+    values = np.asarray(values, dtype=float)
+    missing = np.isnan(values)
+    return np.rint(np.where(missing, 0.0, values) * FIXED_POINT).astype(np.int64), missing
+
+
+class StatAccumulator:
+    """
+    Running totals for one scope (overall, or one map), stored as a single
+    (entries x stats) fixed-point array plus an (entries x counters) int
+    array. Entries are addressed by a normalized key; the display name is
+    the one seen first for that key. A NaN value makes that total NaN.
+    """
+
+    def __init__(self, stats, capacity=64):
+        self.stats = list(stats)
+        self.index = {}
+        self.names = []
+        self._totals = np.zeros((capacity, len(self.stats)), dtype=np.int64)
+        self._minutes = np.zeros(capacity, dtype=np.int64)
+        self._missing = np.zeros((capacity, len(self.stats) + 1), dtype=bool)  # stats, then minutes
+        self._counts = np.zeros((capacity, len(COUNTERS)), dtype=np.int64)
+
+    def __setstate__(self, state):
+        # Accumulators pickled before totals were fixed-point held floats.
+        self.__dict__.update(state)
+        if self._totals.dtype.kind == 'f':
+            self._totals, totals_missing = to_fixed(self._totals)
+            self._minutes, minutes_missing = to_fixed(self._minutes)
+            self._missing = np.column_stack([totals_missing, minutes_missing])
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def totals(self):
+        n = len(self)
+        return np.where(self._missing[:n, :-1], np.nan, self._totals[:n] / FIXED_POINT)
+
+    @property
+    def minutes(self):
+        n = len(self)
+        return np.where(self._missing[:n, -1], np.nan, self._minutes[:n] / FIXED_POINT)
+
+    @property
+    def counts(self):
+        return self._counts[:len(self)]
+
+    def counter(self, name):
+        return self.counts[:, COUNTERS.index(name)]
+
+    def _grow(self):
+        capacity = 2 * len(self._totals)
+        for attr in ('_totals', '_minutes', '_missing', '_counts'):
+            old = getattr(self, attr)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def _row(self, key, name):
+        row = self.index.get(key)
+        if row is None:
+            row = len(self.names)
+            if row == len(self._totals):
+                self._grow()
+            self.index[key] = row
+            self.names.append(name)
+        return row
+
+    def _add_fixed(self, rows, totals, minutes, missing, counts):
+        np.add.at(self._totals, rows, totals)
+        np.add.at(self._minutes, rows, minutes)
+        np.logical_or.at(self._missing, rows, missing)
+        np.add.at(self._counts, rows, counts)
+
+    def add(self, keys, names, sides, wins, minutes, values):
+        """
+        Fold one batch of player rows into the totals.
+
+        `sides` holds the lower-cased team colour of each row, `wins` a
+        boolean per row, `minutes` a float per row and `values` an
+        (rows x stats) array in the order of `self.stats`. Keys may repeat
+        within a batch.
+        """
+        rows = np.fromiter((self._row(k, n) for k, n in zip(keys, names)),
+                           dtype=np.intp, count=len(keys))
+        sides = np.asarray(sides)
+        wins = np.asarray(wins, dtype=bool)
+        red = sides == 'red'
+        blue = sides == 'blue'
+        counts = np.column_stack([np.ones(len(rows), dtype=np.int64), red, blue,
+                                  wins, wins & red, wins & blue])
+        totals, totals_missing = to_fixed(np.reshape(values, (len(rows), len(self.stats))))
+        minutes, minutes_missing = to_fixed(minutes)
+        self._add_fixed(rows, totals, minutes, np.column_stack([totals_missing, minutes_missing]), counts)
+
+    def merge(self, other, sign=1):
+        """Add (sign=1) or subtract (sign=-1) another accumulator's totals, matching entries by key."""
+        if not len(other):
+            return
+        rows = np.fromiter((self._row(k, other.names[i]) for k, i in other.index.items()),
+                           dtype=np.intp, count=len(other))
+        src = np.fromiter(other.index.values(), dtype=np.intp, count=len(other))
+        self._add_fixed(rows, sign * other._totals[src], sign * other._minutes[src],
+                        other._missing[src], sign * other._counts[src])
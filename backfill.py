@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Sharded backfill of a matchId range.
+
+`run` splits the range into shards and runs extraction and aggregation on
+each one independently (in a process pool, or on other machines with
+--only). A shard writes its combined rows and a partial aggregate: summed
+raw totals, games, wins and map results, no derived ratios. Finished
+shards are skipped, so a failed shard is retried by running again.
+
+`merge` adds up any set of finished partials and writes the usual stats
+outputs, identical to one serial stats.py run over the same matches.
+
+    python3 backfill.py run 3000000 3400000 --shard-size 20000 --workers 4
+    python3 backfill.py merge --master backfilledMaster.csv
+"""
+import argparse
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os.path import exists, join
+
+import eu_ctf
+import latest_match
+import stats
+from combine import append_to_master
+from match_index import build_match_index, is_eligible, load_match_filters
+from ratings import RatingEngine
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR           = os.path.dirname(os.path.abspath(__file__))
+BACKFILL_DIR       = join(ROOT_DIR, "backfill")
+BULK_MAPS_FILE     = join(ROOT_DIR, "bulkmaps.json")
+DEFAULT_SHARD_SIZE = 10000
+PARTIAL_FILE       = "partial.pkl"
+ROWS_FILE          = "rows.csv"
+MERGED_RATINGS     = "ratings.json"  # in --dir, unless merge is given --ratings
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def shard_ranges(first, last, size):
+    """Inclusive (first, last) matchId ranges of at most `size` ids covering first..last."""
+    return [(start, min(start + size - 1, last)) for start in range(first, last + 1, size)]
+
+
+def shard_dir(directory, first, last):
+    return join(directory, f"shard_{first}_{last}")
+
+
+def has_rows(csv_path):
+    """False for the header-less file combine_stats_csv writes when no match was combined."""
+    return os.path.getsize(csv_path) > len(os.linesep)
+
+
+class PartialAggregate:
+    """
+    The stats.fold_match totals of one shard's matches, plus what it saw:
+    matches combined, matches filtered out and failed match ids.
+    """
+
+    def __init__(self, first, last):
+        self.first, self.last = first, last
+        self.overall, self.per_map, self.map_results = stats.new_entry(), {}, {}
+        self.matches = self.filtered = 0
+        self.failed = []
+
+    def fold_rows(self, rows_csv):
+        """Fold a combined rows CSV exactly as stats.py folds the master."""
+        for match_id, match_df in stats.iter_matches(rows_csv):
+            stats.fold_match(match_id, match_df, self.overall, self.per_map, self.map_results)
+            self.matches += 1
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        for map_name, entry in other.per_map.items():
+            self.per_map.setdefault(map_name, stats.new_entry()).merge(entry)
+        for map_name, result in other.map_results.items():
+            mr = self.map_results.setdefault(map_name, {'Games': 0, 'RedWins': 0, 'BlueWins': 0})
+            for field, value in result.items():
+                mr[field] += value
+        self.matches += other.matches
+        self.filtered += other.filtered
+        self.failed += other.failed
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def run_shard(directory, first, last, bulk_matches, bulk_maps):
+    """
+    Extract and aggregate the matches of one shard. `bulk_matches` holds the
+    shard's bulk data, or is None to download it. Writes the shard's rows
+    CSV and, last, its partial aggregate; returns the partial.
+    """
+    out = shard_dir(directory, first, last)
+    os.makedirs(out, exist_ok=True)
+    if bulk_matches is None:
+        bulk_matches = latest_match.download_matches(first, last)
+    bulk_matches = {mid: m for mid, m in bulk_matches.items() if first <= int(mid) <= last}
+
+    filters = load_match_filters()
+    index = build_match_index(bulk_matches)
+    partial = PartialAggregate(first, last)
+
+    # The same extract → combine path as a serial run, into a scratch folder.
+    work = tempfile.mkdtemp(prefix="matches-", dir=out)
+    try:
+        for mid in sorted(bulk_matches, key=int):
+            if not is_eligible(index[mid], filters):
+                partial.filtered += 1
+                continue
+            try:
+                eu_ctf.extract_match_data(mid, bulk_matches, bulk_maps, work)
+            except Exception as e:
+                print(f"[backfill] ✖ match {mid} failed: {e}")
+                partial.failed.append(int(mid))
+            eu_ctf.match_event_records.clear()
+
+        rows_csv = join(out, ROWS_FILE)
+        eu_ctf.combine_stats_csv(work, join(work, "AggregatedStatsOutput.csv"), rows_csv + '.tmp',
+                                 bulk_matches, bulk_maps, index, filters)
+        os.replace(rows_csv + '.tmp', rows_csv)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if has_rows(rows_csv):
+        partial.fold_rows(rows_csv)
+    partial.save(join(out, PARTIAL_FILE))
+    return partial
+
+
+def finished_shards(directory):
+    """(first, last, shard folder) of every shard with a partial, by first matchId."""
+    shards = []
+    for name in os.listdir(directory) if exists(directory) else []:
+        parts = name.split('_')
+        if len(parts) == 3 and parts[0] == 'shard' and exists(join(directory, name, PARTIAL_FILE)):
+            shards.append((int(parts[1]), int(parts[2]), join(directory, name)))
+    return sorted(shards)
+
+
+def run(args):
+    ranges = shard_ranges(args.first, args.last, args.shard_size)
+    if args.only:
+        ranges = [ranges[i] for i in args.only]
+    done = {(first, last) for first, last, _ in finished_shards(args.dir)}
+    pending = [r for r in ranges if args.force or r not in done]
+    print(f"[backfill] {len(ranges)} shards of {args.shard_size} ids, {len(ranges) - len(pending)} already done")
+    if not pending:
+        return
+
+    bulk_maps = eu_ctf.load_bulk_maps(args.maps)
+    bulk = eu_ctf.load_bulk_matches(args.bulk) if args.bulk else None
+    os.makedirs(args.dir, exist_ok=True)
+
+    def shard_data(first, last):
+        return None if bulk is None else {mid: m for mid, m in bulk.items() if first <= int(mid) <= last}
+
+    failed_shards = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(run_shard, args.dir, first, last, shard_data(first, last), bulk_maps): (first, last)
+                   for first, last in pending}
+        for future in as_completed(futures):
+            first, last = futures[future]
+            try:
+                partial = future.result()
+                print(f"[backfill] ✓ shard {first}→{last}: {partial.matches} matches, "
+                      f"{partial.filtered} filtered, {len(partial.failed)} failed")
+            except Exception as e:
+                failed_shards.append((first, last))
+                print(f"[backfill] ✖ shard {first}→{last} failed: {e}")
+
+    if failed_shards:
+        print(f"[backfill] ✖ {len(failed_shards)} shards failed; run again to retry them")
+        sys.exit(1)
+
+
+def merge(args):
+    shards = finished_shards(args.dir)
+    if not shards:
+        print(f"[backfill] ✖ no finished shards in {args.dir}")
+        sys.exit(1)
+    for (_, prev_last, _), (first, last, _) in zip(shards, shards[1:]):
+        if first <= prev_last:
+            print(f"[backfill] ✖ shard {first}→{last} overlaps the one before it; remove one of them")
+            sys.exit(1)
+        if first > prev_last + 1:
+            print(f"[backfill] ! matches {prev_last + 1}→{first - 1} are not covered by any shard")
+    if args.master and exists(args.master):
+        print(f"[backfill] ✖ {args.master} already exists; pass a new file to write the merged rows to")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    total = PartialAggregate(shards[0][0], shards[-1][1])
+    # Replayed from scratch: the shards are the whole history being rebuilt.
+    ratings = RatingEngine()
+    ratings_file = args.ratings or join(args.dir, MERGED_RATINGS)
+    for first, last, folder in shards:
+        total.merge(PartialAggregate.load(join(folder, PARTIAL_FILE)))
+        rows_csv = join(folder, ROWS_FILE)
+        if not has_rows(rows_csv):
+            continue
+        # Ratings depend on match order, so they are replayed from the rows.
+        for match_id, match_df in stats.iter_matches(rows_csv):
+            score = stats.match_score(match_df)
+            if score is not None:
+                ratings.update(match_id, match_df, *score)
+        if args.master:
+            append_to_master(rows_csv, args.master)
+    ratings.save(ratings_file)
+
+    manifest, changed = stats.write_snapshot(total.overall, total.per_map, total.map_results, args.out,
+                                             args.workers, ratings, stats.rankings_from_args(args),
+                                             input=os.path.abspath(args.dir),
+                                             shards=[[first, last] for first, last, _ in shards])
+    print(f"[backfill] merged {len(shards)} shards ({total.matches} matches, {total.filtered} filtered, "
+          f"{len(total.failed)} failed) in {time.perf_counter() - start:.1f}s → stats run {manifest['run']} "
+          f"({changed} files changed), ratings → {ratings_file}")
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Backfill a matchId range in independent shards.")
+    parser.add_argument('--dir', default=BACKFILL_DIR, help="shard folders")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help="extract and aggregate the shards of a matchId range")
+    p.add_argument('first', type=int)
+    p.add_argument('last', type=int)
+    p.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="matchIds per shard")
+    p.add_argument('--workers', type=int, default=os.cpu_count(), help="shards processed at once")
+    p.add_argument('--only', type=int, nargs='+', metavar='N', help="run only these shard numbers (0-based)")
+    p.add_argument('--bulk', help="read matches from this bulk JSON instead of downloading each shard")
+    p.add_argument('--maps', default=BULK_MAPS_FILE)
+    p.add_argument('--force', action='store_true', help="redo shards that already finished")
+
+    p = sub.add_parser('merge', help="combine the finished shards into stats outputs")
+    p.add_argument('--out', default=stats.STATS_DIR, help="snapshot store for the merged stats")
+    p.add_argument('--ratings', metavar='PATH',
+                   help=f"write the replayed ratings here, e.g. ratings.json to replace the live ones "
+                        f"(default: {MERGED_RATINGS} in --dir)")
+    p.add_argument('--master', help="also write the merged rows to this (new) master CSV")
+    p.add_argument('--workers', type=int, default=os.cpu_count())
+    stats.add_ranking_arguments(p)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    else:
+        merge(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+A local stand-in for the tagpro.eu endpoints the pipeline uses: the sitemap
+index, the match sitemaps and the bulk matches API. Matches are "posted"
+over time with release(), so watch mode can be tested offline:
+
+    python3 benchmarks/fake_tagpro_eu.py --port 8765 --initial 20 --release-every 5
+    TAGPRO_EU_URL=http://127.0.0.1:8765 python3 watch.py --interval 2
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic import generate_bulk
+
+SITEMAP_SIZE = 1000  # match URLs per sitemap, as on tagpro.eu
+
+
+class FakeTagproEU:
+    """Serves `matches` ({id: match json}); only released ones are visible."""
+
+    def __init__(self, matches, host='127.0.0.1', port=0, initial=0, sitemap_size=SITEMAP_SIZE):
+        self.ids = sorted(matches, key=int)
+        self.sitemap_size = sitemap_size
+        self.matches = matches
+        self.released = initial
+        self.lock = threading.Lock()
+        self.requests = []  # request paths, for tests
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = None
+
+    def release(self, n=1):
+        with self.lock:
+            self.released = min(len(self.ids), self.released + n)
+
+    def visible_ids(self):
+        with self.lock:
+            return self.ids[:self.released]
+
+    def sitemaps(self):
+        ids = self.visible_ids()
+        return [ids[i:i + self.sitemap_size] for i in range(0, len(ids), self.sitemap_size)]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body, content_type):
+                data = body.encode('utf-8')
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                fake.requests.append(self.path)
+                if url.path == '/sitemaps.xml':
+                    locs = [f"{fake.url}/sitemap-{i}.xml" for i in range(len(fake.sitemaps()))]
+                    self._send('<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex>'
+                               + ''.join(f'<sitemap><loc>{loc}</loc></sitemap>' for loc in locs)
+                               + '</sitemapindex>', 'application/xml')
+                elif url.path.startswith('/sitemap-') and url.path.endswith('.xml'):
+                    i = int(url.path[len('/sitemap-'):-len('.xml')])
+                    sitemaps = fake.sitemaps()
+                    if i >= len(sitemaps):
+                        self.send_error(404)
+                        return
+                    self._send('<?xml version="1.0" encoding="UTF-8"?>\n<urlset>'
+                               + ''.join(f'<url><loc>{fake.url}/?match={mid}</loc></url>' for mid in sitemaps[i])
+                               + '</urlset>', 'application/xml')
+                elif url.path == '/data/':
+                    query = parse_qs(url.query)
+                    first, last = int(query['first'][0]), int(query['last'][0])
+                    self._send(json.dumps({mid: fake.matches[mid] for mid in fake.visible_ids()
+                                           if first <= int(mid) <= last}), 'application/json')
+                else:
+                    self.send_error(404)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic matches like tagpro.eu.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--matches', type=int, default=200, help="synthetic matches to serve")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--initial', type=int, default=0, help="matches visible at start")
+    parser.add_argument('--release-every', type=float, default=10.0,
+                        help="seconds between newly posted matches")
+    parser.add_argument('--maps-json', help="also write the synthetic bulkmaps.json here")
+    args = parser.parse_args()
+
+    matches, maps = generate_bulk(args.matches, seed=args.seed)
+    if args.maps_json:
+        with open(args.maps_json, 'w') as f:
+            json.dump(maps, f)
+    fake = FakeTagproEU(matches, port=args.port, initial=args.initial).start()
+    print(f"[fake_tagpro_eu] serving {len(matches)} matches at {fake.url} ({args.initial} visible)")
+    try:
+        while True:
+            time.sleep(args.release_every)
+            fake.release()
+            print(f"[fake_tagpro_eu] posted match {fake.visible_ids()[-1]}")
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the stats pipeline on synthetic tagpro.eu data.
+
+For each size, a fresh child process generates the bulk files and times
+every stage (JSON load, extraction with its decode/advanced breakdown,
+event store, compile_data, combine_stats_csv, stats.py), reporting wall
+time, matches/s and peak memory. A second child extracts the same matches
+in one batch, as watch mode does (the extract_batch stage), so neither
+run extracts them twice.
+
+    python3 benchmarks/run_benchmarks.py --sizes 1000 10000 100000
+    python3 benchmarks/run_benchmarks.py --golden      # check outputs are unchanged
+
+--golden also backfills the same matches in shards and checks the merged
+stats and ratings are byte for byte those of the serial stats.py run.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from glob import glob
+from os.path import abspath, basename, dirname, join
+
+BENCH_DIR = dirname(abspath(__file__))
+ROOT_DIR = dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+DEFAULT_SIZES = [1000, 10000, 100000]
+GOLDEN_FILE = join(BENCH_DIR, "golden.json")
+GOLDEN_MATCHES = 200
+GOLDEN_SEED = 1
+BACKFILL_SHARDS = 6
+# Ranking thresholds for stats.py: a synthetic player has about 8 games (a
+# few per map), far below rankings.json's, so the top-N tables get rows.
+BENCH_RANKINGS = ['--top', '5', '--min-games', '8', '--min-map-games', '3']
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class StageTimer:
+    """Wall time and (optionally) traced peak memory per named stage."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'seconds': 0.0})
+            entry['seconds'] += time.perf_counter() - start
+            if self.trace_memory:
+                entry['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+
+    def wrap(self, module, name):
+        """Time every call of module.name under a stage of the same name."""
+        original = getattr(module, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                entry = self.stages.setdefault(name, {'seconds': 0.0})
+                entry['seconds'] += time.perf_counter() - start
+        setattr(module, name, timed)
+
+
+def run_pipeline(work_dir, n_matches, seed, density=1.0, players=8, trace_memory=False, batch=False):
+    """
+    Generate n_matches synthetic matches in work_dir and push them through
+    every pipeline stage, or with batch=True only through the batch
+    extraction of watch mode. Returns (StageTimer, number of matches extracted).
+    """
+    from synthetic import generate_bulk
+    import eu_ctf
+    import event_store
+    import stats
+
+    timer = StageTimer(trace_memory)
+    matches_json = join(work_dir, "bulkmatches.json")
+    maps_json = join(work_dir, "bulkmaps.json")
+    run_dir = join(work_dir, "run")
+    os.makedirs(run_dir)
+
+    matches, maps = generate_bulk(n_matches, seed=seed, players=players, density=density)
+    with open(matches_json, 'w') as f:
+        json.dump(matches, f)
+    with open(maps_json, 'w') as f:
+        json.dump(maps, f)
+    del matches, maps
+
+    with timer.stage('json_load'):
+        bulk_matches = eu_ctf.load_bulk_matches(matches_json)
+        bulk_maps = eu_ctf.load_bulk_maps(maps_json)
+
+    if batch:
+        # The matches into one table, as watch mode extracts them.
+        with timer.stage('extract_batch'):
+            rows, _ = eu_ctf.extract_matches(list(bulk_matches), bulk_matches, bulk_maps)
+        return timer, rows['matchId'].nunique() if len(rows) else 0
+
+    # Sub-stage breakdown of extraction
+    timer.wrap(eu_ctf, 'read_match_from_bulk')
+    timer.wrap(eu_ctf.MatchEvents, 'from_match')
+    timer.wrap(eu_ctf, 'advanced_counts')
+    timer.wrap(eu_ctf, 'game_state_counts')
+    with timer.stage('extract'):
+        extracted = sum(eu_ctf.extract_match_data(mid, bulk_matches, bulk_maps, run_dir) is not None
+                        for mid in bulk_matches)
+
+    with timer.stage('event_store'):
+        event_store.save_event_store(join(run_dir, "events.npz"), eu_ctf.match_event_records.items())
+
+    agg_csv = join(run_dir, "AggregatedStatsOutput.csv")
+    comb_csv = join(run_dir, "CombinedStatsOutput.csv")
+    with timer.stage('compile_data'):
+        eu_ctf.compile_data(run_dir, agg_csv)
+    with timer.stage('combine_stats_csv'):
+        eu_ctf.combine_stats_csv(run_dir, agg_csv, comb_csv, bulk_matches, bulk_maps)
+
+    cwd, argv = os.getcwd(), sys.argv
+    os.chdir(work_dir)
+    sys.argv = ['stats.py', comb_csv, '--workers', '1', '--ratings', join(work_dir, 'ratings.json')] + BENCH_RANKINGS
+    try:
+        with timer.stage('stats'):
+            stats.main()
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+
+    return timer, extracted
+
+
+def output_digests(work_dir):
+    """sha256 of every CSV the pipeline wrote, keyed by a stable name."""
+    digests = {}
+    for path in sorted(glob(join(work_dir, "run", "*.csv")) + glob(join(work_dir, "Stats", "*", "*.csv"))):
+        with open(path, 'rb') as f:
+            digests[basename(path)] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+
+def bench_one(n_matches, seed, density, players, trace_memory, batch=False):
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.redirect_stdout(sys.stderr):
+        start = time.perf_counter()
+        timer, extracted = run_pipeline(work_dir, n_matches, seed, density, players, trace_memory, batch)
+        total = time.perf_counter() - start
+    return {
+        'matches': n_matches,
+        'extracted': extracted,
+        'total_seconds': total,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'stages': {name: dict(entry, matches_per_s=n_matches / entry['seconds'] if entry['seconds'] else None)
+                   for name, entry in timer.stages.items()},
+    }
+
+
+def print_report(result):
+    print(f"\n== {result['matches']} matches ({result['extracted']} extracted): "
+          f"{result['total_seconds']:.1f}s total, max RSS {result['max_rss_mb']:.0f} MB")
+    print(f"  {'stage':<22}{'seconds':>10}{'matches/s':>12}{'peak MB':>10}")
+    for name, entry in result['stages'].items():
+        peak = f"{entry['peak_mb']:.1f}" if 'peak_mb' in entry else '-'
+        print(f"  {name:<22}{entry['seconds']:>10.2f}{entry['matches_per_s'] or 0:>12.1f}{peak:>10}")
+
+
+def run_backfill(work_dir, shards):
+    """
+    Backfill the bulk matches of a run_pipeline work_dir in `shards` shards
+    and merge them into work_dir/backfill. Returns the backfill folder.
+    """
+    import backfill
+
+    with open(join(work_dir, "bulkmatches.json")) as f:
+        ids = sorted(int(mid) for mid in json.load(f))
+    directory = join(work_dir, "backfill")
+    shard_size = -(-(ids[-1] - ids[0] + 1) // shards)
+    argv = sys.argv
+    try:
+        for command in (['run', str(ids[0]), str(ids[-1]), '--shard-size', str(shard_size), '--workers', '1',
+                         '--bulk', join(work_dir, "bulkmatches.json"), '--maps', join(work_dir, "bulkmaps.json")],
+                        ['merge', '--out', join(directory, "Stats"), '--workers', '1'] + BENCH_RANKINGS):
+            sys.argv = ['backfill.py', '--dir', directory] + command
+            backfill.main()
+    finally:
+        sys.argv = argv
+    return directory
+
+
+def backfill_differences(work_dir, directory):
+    """Names of the stats CSVs and ratings a backfill wrote differently from the serial run."""
+    serial, merged = join(work_dir, "Stats", "latest"), join(directory, "Stats", "latest")
+    pairs = [(join(work_dir, "ratings.json"), join(directory, "ratings.json"))]
+    names = {basename(p) for p in glob(join(serial, "*.csv")) + glob(join(merged, "*.csv"))}
+    pairs += [(join(serial, name), join(merged, name)) for name in sorted(names)]
+
+    def content(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    return [basename(a) for a, b in pairs if content(a) is None or content(a) != content(b)]
+
+
+def check_golden(update):
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.redirect_stdout(sys.stderr):
+        run_pipeline(work_dir, GOLDEN_MATCHES, GOLDEN_SEED)
+        digests = output_digests(work_dir)
+        differences = backfill_differences(work_dir, run_backfill(work_dir, BACKFILL_SHARDS))
+
+    if differences:
+        print(f"[benchmarks] ✖ a {BACKFILL_SHARDS}-shard backfill differs from the serial run in: "
+              f"{', '.join(differences[:20])}")
+        return False
+    print(f"[benchmarks] ✓ a {BACKFILL_SHARDS}-shard backfill matches the serial run byte for byte")
+
+    if update or not os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE, 'w') as f:
+            json.dump(digests, f, indent=2, sort_keys=True)
+        print(f"[benchmarks] wrote {len(digests)} golden digests → {GOLDEN_FILE}")
+        return True
+
+    with open(GOLDEN_FILE) as f:
+        golden = json.load(f)
+    changed = sorted(k for k in golden.keys() | digests.keys() if golden.get(k) != digests.get(k))
+    if changed:
+        print(f"[benchmarks] ✖ {len(changed)} output file(s) differ from golden: {', '.join(changed[:20])}")
+        return False
+    print(f"[benchmarks] ✓ all {len(golden)} output files match golden")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stats pipeline on synthetic matches.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--density', type=float, default=1.0)
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--memory', action='store_true',
+                        help="trace peak Python memory per stage (slows the run down)")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--golden', action='store_true',
+                        help=f"check pipeline outputs for {GOLDEN_MATCHES} fixed matches against {basename(GOLDEN_FILE)}")
+    parser.add_argument('--update-golden', action='store_true')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--batch', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.golden or args.update_golden:
+        sys.exit(0 if check_golden(args.update_golden) else 1)
+
+    if args.single:
+        result = bench_one(args.single, args.seed, args.density, args.players, args.memory, args.batch)
+        print(json.dumps(result))
+        return
+
+    def run_child(cmd):
+        res = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True)
+        return json.loads(res.stdout.strip().splitlines()[-1])
+
+    # One child process per size keeps max RSS meaningful; the batch
+    # extraction gets its own child so the pipeline run is not affected by it.
+    results = []
+    for n in args.sizes:
+        cmd = [sys.executable, abspath(__file__), '--single', str(n), '--seed', str(args.seed),
+               '--density', str(args.density), '--players', str(args.players)]
+        if args.memory:
+            cmd.append('--memory')
+        result = run_child(cmd)
+        result['stages']['extract_batch'] = run_child(cmd + ['--batch'])['stages']['extract_batch']
+        results.append(result)
+        print_report(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
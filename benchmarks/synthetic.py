@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Synthetic tagpro.eu-format bulk data for offline benchmarks.
+
+Matches are simulated as alternating flag holds per team (grab, then a
+capture or a drop + return), plus tag/pop exchanges and prevent toggles,
+and then bit-packed exactly like the tagpro.eu player/splat/tile blobs so
+they go through the real tagpro_eu decoder.
+"""
+import argparse
+import base64
+import json
+import random
+
+FPS = 60
+TILE = 40
+MAP_WIDTH, MAP_HEIGHT = 40, 24
+
+# Encoded tile codes (see tagpro_eu.map.Map._parse_tiles)
+WALL, FLOOR, RED_FLAG, BLUE_FLAG = 1, 6, 7, 8
+
+
+class BitWriter:
+    """Inverse of tagpro_eu.blob.Blob."""
+
+    def __init__(self):
+        self.bits = []
+
+    def bool(self, value):
+        self.bits.append(1 if value else 0)
+
+    def fixed(self, value, bits):
+        for i in range(bits - 1, -1, -1):
+            self.bits.append((value >> i) & 1)
+
+    def tally(self, value):
+        self.bits.extend([1] * value)
+        self.bits.append(0)
+
+    def footer(self, value):
+        for size_bytes in range(4):
+            free = (8 - ((len(self.bits) + 2) & 7)) & 7
+            size = (size_bytes << 3) | free
+            minimum, width = 0, free
+            while width < size:
+                minimum += 1 << width
+                width += 8
+            if minimum <= value < minimum + (1 << size):
+                self.fixed(size_bytes, 2)
+                self.fixed(value - minimum, size)
+                return
+        raise ValueError(f"footer value {value} too large")
+
+    def to_b64(self):
+        bits = self.bits + [0] * (-len(self.bits) % 8)
+        data = bytes(int(''.join(map(str, bits[i:i + 8])), 2)
+                     for i in range(0, len(bits), 8))
+        return base64.b64encode(data).decode('ascii')
+
+
+def splat_bits(tiles):
+    """Bit width and offset of a splat coordinate (tagpro_eu MatchTeam._parse_splats)."""
+    size = tiles * TILE
+    return (size - 1).bit_length(), ((1 << (size - 1).bit_length()) - size >> 1) + 20
+
+
+def generate_map(name, width=MAP_WIDTH, height=MAP_HEIGHT):
+    """A walled rectangle with the red flag on the left and blue on the right."""
+    grid = [[WALL if i in (0, height - 1) or j in (0, width - 1) else FLOOR
+             for j in range(width)] for i in range(height)]
+    grid[height // 2][3] = RED_FLAG
+    grid[height // 2][width - 4] = BLUE_FLAG
+
+    w = BitWriter()
+    flat = [tile for row in grid for tile in row]
+    i = 0
+    while i < len(flat):
+        run = 1
+        while i + run < len(flat) and flat[i + run] == flat[i]:
+            run += 1
+        w.fixed(flat[i], 6)
+        w.footer(run - 1)
+        i += run
+    return {'name': name, 'author': 'synthetic', 'type': 'ctf', 'marsballs': 0,
+            'width': width, 'tiles': w.to_b64()}
+
+
+def _simulate(rng, players, duration, density):
+    """
+    Per-player {frame: actions} and per-team splat times for one match.
+    Player i is on red (1) for even i and blue (2) for odd i.
+    """
+    frames = [dict() for _ in range(players)]
+    holding = [[] for _ in range(players)]  # (start, end) frames of each player's holds
+    splats = {1: [], 2: []}
+    team_of = [1 + i % 2 for i in range(players)]
+    by_team = {t: [i for i in range(players) if team_of[i] == t] for t in (1, 2)}
+
+    def act(player, frame, **kw):
+        slot = frames[player].setdefault(frame, {})
+        for k, v in kw.items():
+            slot[k] = slot.get(k, 0) + v if k in ('returns', 'tags', 'captures') else v
+
+    # Flag holds: each team alternates gaps and holds against the other team.
+    for team, other in ((1, 2), (2, 1)):
+        t = int(rng.expovariate(density / (8 * FPS))) + 1
+        while t < duration - 1:
+            carrier = rng.choice(by_team[team])
+            end = t + 1 + int(rng.expovariate(1 / (6 * FPS)))
+            act(carrier, t, grab=True)
+            if end >= duration:
+                holding[carrier].append((t, duration))
+                break
+            holding[carrier].append((t, end))
+            if rng.random() < 0.15:
+                act(carrier, end, captures=1)
+            else:
+                returner = rng.choice(by_team[other])
+                act(carrier, end, drop_pop=True)
+                act(returner, end, returns=1, tags=1)
+                splats[team].append(end)
+            t = end + 1 + int(rng.expovariate(density / (8 * FPS)))
+
+    def busy(player, frame):
+        return frame in frames[player] or any(s <= frame <= e for s, e in holding[player])
+
+    # Tags/pops away from the flag, and prevent toggles.
+    for _ in range(int(density * players * 12)):
+        tagger, victim = rng.choice(by_team[1]), rng.choice(by_team[2])
+        if rng.random() < 0.5:
+            tagger, victim = victim, tagger
+        frame = rng.randrange(1, duration)
+        if busy(victim, frame):
+            continue
+        act(victim, frame, drop_pop=True)
+        act(tagger, frame, tags=1)
+        splats[team_of[victim]].append(frame)
+
+    for player in range(players):
+        for _ in range(int(density * 6)):
+            start = rng.randrange(1, duration - 2)
+            stop = min(duration - 1, start + 1 + int(rng.expovariate(1 / (3 * FPS))))
+            if start in frames[player] or stop in frames[player]:
+                continue
+            act(player, start, prevent=True)
+            act(player, stop, prevent=True)
+
+    return frames, holding, splats, team_of
+
+
+def _encode_player(actions):
+    w = BitWriter()
+    flag = False
+    previous = 0
+    for frame in sorted(actions):
+        a = actions[frame]
+        grab, captures = a.get('grab', False), a.get('captures', 0)
+        drop_pop = a.get('drop_pop', False)
+        w.bool(False)                      # no team change
+        w.bool(drop_pop)
+        w.tally(a.get('returns', 0))
+        w.tally(a.get('tags', 0))
+        if not flag:
+            w.bool(grab)
+        w.tally(captures)
+        keep = not drop_pop and not captures
+        if not drop_pop and captures and (flag or grab):
+            w.bool(False)                  # capture the held flag
+        if grab and keep:
+            w.fixed(0, 2)                  # Flag.opponent
+        w.tally(0)                         # no powerups
+        w.bool(a.get('prevent', False))
+        w.bool(False)                      # button
+        w.bool(False)                      # block
+        w.footer(frame - previous - 1)
+        previous = frame
+        if grab:
+            flag = True
+        if captures or drop_pop:
+            flag = False
+    return w.to_b64()
+
+
+def generate_match(rng, map_id, players=8, minutes=8, density=1.0, date=0):
+    """One finished ranked-style match (timeLimit 8, empty group) as tagpro.eu JSON."""
+    duration = minutes * 60 * FPS
+    frames, holding, splats, team_of = _simulate(rng, players, duration, density)
+
+    teams = []
+    for team, name in ((1, 'Red'), (2, 'Blue')):
+        x_bits, x_off = splat_bits(MAP_WIDTH)
+        y_bits, y_off = splat_bits(MAP_HEIGHT)
+        w = BitWriter()
+        for _ in sorted(splats[team]):
+            w.tally(1)
+            w.fixed(rng.randrange(TILE, (MAP_WIDTH - 1) * TILE) + x_off, x_bits)
+            w.fixed(rng.randrange(TILE, (MAP_HEIGHT - 1) * TILE) + y_off, y_bits)
+        caps = sum(a.get('captures', 0) for p in range(players) if team_of[p] == team
+                   for a in frames[p].values())
+        teams.append({'name': name, 'score': caps, 'splats': w.to_b64()})
+
+    return {
+        'server': 'synthetic.local', 'port': 8000, 'official': True, 'uuid': '',
+        'group': '', 'date': date, 'timeLimit': minutes, 'duration': duration,
+        'finished': True, 'mapId': map_id,
+        'players': [{'auth': False, 'name': f'Synthetic {p:04d}', 'flair': 0,
+                     'degree': 0, 'score': 0, 'points': 0, 'team': team_of[p],
+                     'events': _encode_player(frames[p])}
+                    for p in range(players)],
+        'teams': teams,
+    }
+
+
+def generate_bulk(n_matches, seed=0, players=8, minutes=8, density=1.0,
+                  n_maps=10, roster=200, first_id=1000000):
+    """
+    Return (bulk_matches, bulk_maps) dicts keyed by string ids, like the
+    tagpro.eu bulk downloads. Player names are drawn from a roster of
+    `roster` names so totals accumulate across matches.
+    """
+    rng = random.Random(seed)
+    maps = {str(m): generate_map(f'Synthetic Map {m}') for m in range(1, n_maps + 1)}
+    matches = {}
+    for i in range(n_matches):
+        map_id = rng.randint(1, n_maps)
+        match = generate_match(rng, map_id, players=players,
+                               minutes=minutes, density=density,
+                               date=1700000000 + i * 600)
+        for p, name in zip(match['players'], rng.sample(range(roster), players)):
+            p['name'] = f'Synthetic {name:04d}'
+        matches[str(first_id + i)] = match
+    return matches, maps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic bulkmatches/bulkmaps JSON files.")
+    parser.add_argument('matches_json')
+    parser.add_argument('maps_json')
+    parser.add_argument('-n', '--matches', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--minutes', type=int, default=8)
+    parser.add_argument('--density', type=float, default=1.0,
+                        help="scales the rate of flag grabs and tag/pop events")
+    args = parser.parse_args()
+
+    matches, maps = generate_bulk(args.matches, args.seed, args.players,
+                                  args.minutes, args.density)
+    with open(args.matches_json, 'w') as f:
+        json.dump(matches, f)
+    with open(args.maps_json, 'w') as f:
+        json.dump(maps, f)
+    print(f"[synthetic] wrote {len(matches)} matches → {args.matches_json}, {len(maps)} maps → {args.maps_json}")
+
+
+if __name__ == "__main__":
+    main()
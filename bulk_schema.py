@@ -0,0 +1,99 @@
+"""
+Typed schema of the tagpro.eu bulk match and map JSON.
+
+With msgspec installed, bulk payloads are decoded straight into the structs
+below. Fields the pipeline never reads (port, official, flair, degree,
+scores, ...) are skipped by the decoder, and the base64 blobs (player
+events, team splats, map tiles) stay as raw slices of the payload until
+tagpro_eu reads them, so filtered matches never materialize theirs. The
+structs answer `record[key]` and `record.get(key, default)` like the dicts
+json gives, so tagpro_eu and the rest of the pipeline take either.
+Without msgspec the payload is decoded with json.
+"""
+import json
+from typing import Dict, List, Union
+
+try:
+    import msgspec
+except ImportError:  # optional: pip install msgspec
+    msgspec = None
+
+
+def _empty(data):
+    # tagpro.eu sends an empty JSON array, not an object, when there is nothing.
+    return data.strip() in (b'', b'[]')
+
+
+if msgspec is not None:
+    Unset = msgspec.UnsetType
+    UNSET = msgspec.UNSET
+
+    class Record(msgspec.Struct, gc=False):
+        """A struct read like the dict json would have decoded; unset fields are missing keys."""
+
+        def __getitem__(self, key):
+            value = getattr(self, key, UNSET) if key in self.__struct_fields__ else UNSET
+            if value is UNSET:
+                raise KeyError(key)
+            if isinstance(value, msgspec.Raw):
+                if not len(value):
+                    raise KeyError(key)
+                return msgspec.json.decode(value)
+            return value
+
+        def get(self, key, default=None):
+            try:
+                return self[key]
+            except KeyError:
+                return default
+
+    class BulkPlayer(Record, gc=False):
+        name: Union[str, None, Unset] = UNSET
+        team: Union[int, None, Unset] = UNSET
+        events: msgspec.Raw = msgspec.Raw()
+
+    class BulkTeam(Record, gc=False):
+        name: Union[str, None, Unset] = UNSET
+        splats: msgspec.Raw = msgspec.Raw()
+
+    class BulkMatch(Record, gc=False):
+        server: Union[str, None, Unset] = UNSET
+        date: Union[int, float, None, Unset] = UNSET
+        timeLimit: Union[int, float, None, Unset] = UNSET
+        group: Union[str, None, Unset] = UNSET
+        mapId: Union[int, str, None, Unset] = UNSET
+        duration: Union[int, None, Unset] = UNSET
+        players: Union[List[BulkPlayer], Unset] = UNSET
+        teams: Union[List[BulkTeam], Unset] = UNSET
+
+    class BulkMap(Record, gc=False):
+        name: Union[str, None, Unset] = UNSET
+        width: Union[int, None, Unset] = UNSET
+        tiles: msgspec.Raw = msgspec.Raw()
+
+    _match_decoder = msgspec.json.Decoder(Dict[str, BulkMatch])
+    _map_decoder = msgspec.json.Decoder(Dict[str, BulkMap])
+
+
+def decode_matches(data):
+    """{match id: match} from a bulk matches JSON payload (bytes)."""
+    if _empty(data):
+        return {}
+    return _match_decoder.decode(data) if msgspec is not None else json.loads(data)
+
+
+def decode_maps(data):
+    """{map id: map} from a bulk maps JSON payload (bytes)."""
+    if _empty(data):
+        return {}
+    return _map_decoder.decode(data) if msgspec is not None else json.loads(data)
+
+
+def load_matches(path):
+    with open(path, 'rb') as f:
+        return decode_matches(f.read())
+
+
+def load_maps(path):
+    with open(path, 'rb') as f:
+        return decode_maps(f.read())
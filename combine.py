@@ -3,15 +3,18 @@
 import sys
 import os
 import csv
-import shutil
+import json
 import subprocess
 from os.path import join
 
+from snapshots import file_hash
+
 # ─── CONSTANTS ────────────────────────────────────────────────────────────────
 ROOT_DIR            = os.path.dirname(os.path.abspath(__file__))
 OUTPUTS_ROOT        = join(ROOT_DIR, "outputs")
 MASTER_COMBINED_CSV = join(ROOT_DIR, "combinedStatsMaster.csv")
 STATS_SCRIPT        = join(ROOT_DIR, "stats.py")
+MASTER_REF_NAME     = "master_ref.json"
 # ────────────────────────────────────────────────────────────────────────────────
 
 def find_latest_run() -> str:
@@ -23,19 +26,57 @@ def find_latest_run() -> str:
         raise RuntimeError("No run_* folders in outputs/")
     return join(OUTPUTS_ROOT, runs[-1])
 
+def upgrade_master_header(master_csv: str, columns: list) -> list:
+    """
+    Make sure the master CSV's header has all of `columns`, rewriting it
+    once with empty values on the old rows if some are new (for example
+    when matchDate was added). Returns the master's header ([] if none).
+    """
+    if not os.path.exists(master_csv) or os.path.getsize(master_csv) == 0:
+        return []
+    with open(master_csv, "r", newline="") as f:
+        header = next(csv.reader(f), [])
+    missing = [c for c in columns if c not in header]
+    if not missing:
+        return header
+
+    tmp = master_csv + ".tmp"
+    with open(master_csv, "r", newline="") as inp, open(tmp, "w", newline="") as out:
+        reader = csv.reader(inp)
+        writer = csv.writer(out)
+        next(reader, None)
+        writer.writerow(header + missing)
+        for row in reader:
+            writer.writerow(row + [""] * len(missing))
+    os.replace(tmp, master_csv)
+    print(f"[combine] added columns {', '.join(missing)} to {master_csv}")
+    return header + missing
+
 def append_to_master(new_csv: str, master_csv: str):
+    with open(new_csv, "r", newline="") as inp:
+        columns = next(csv.reader(inp), [])
+    header = upgrade_master_header(master_csv, columns)
+
     with open(master_csv, "a", newline="") as out, \
          open(new_csv,    "r", newline="") as inp:
-        reader = csv.reader(inp)
-        writer = csv.writer(out)
-        next(reader, None)  # skip header
+        reader = csv.DictReader(inp)
+        writer = csv.DictWriter(out, fieldnames=header or columns, restval="")
+        if not header:
+            writer.writeheader()
         count = 0
         for row in reader:
             writer.writerow(row)
             count += 1
     print(f"[combine] appended {count} rows from {new_csv} → {master_csv}")
 
+def write_master_ref(master_csv: str, ref_path: str) -> dict:
+    ref = {"path": master_csv, "bytes": os.path.getsize(master_csv), "sha256": file_hash(master_csv)}
+    with open(ref_path, "w") as f:
+        json.dump(ref, f, indent=1)
+    return ref
+
 def main():
+    # Extra arguments (e.g. --metrics PATH) are passed on to stats.py.
     run_dir     = find_latest_run()
     combined_csv= join(run_dir, "CombinedStatsOutput.csv")
     if not os.path.exists(combined_csv):
@@ -44,14 +85,14 @@ def main():
     # 1) Append into master CSV
     append_to_master(combined_csv, MASTER_COMBINED_CSV)
 
-    # 2) Copy updated master into this run folder
-    dest = join(run_dir, os.path.basename(MASTER_COMBINED_CSV))
-    shutil.copy2(MASTER_COMBINED_CSV, dest)
-    print(f"[combine] copied master CSV → {dest}")
+    # 2) Record which master this run produced. The master is append-only,
+    #    so its size and hash identify it without keeping a copy per run.
+    ref = write_master_ref(MASTER_COMBINED_CSV, join(run_dir, MASTER_REF_NAME))
+    print(f"[combine] master is {ref['bytes']} bytes (sha256 {ref['sha256'][:12]}) → {MASTER_REF_NAME}")
 
-    # 3) Invoke stats.py on the copied master
-    print(f"[combine] ▶ running stats.py on {dest}")
-    res = subprocess.run(["python3", STATS_SCRIPT, MASTER_COMBINED_CSV], check=False)
+    # 3) Invoke stats.py on the master
+    print(f"[combine] ▶ running stats.py on {MASTER_COMBINED_CSV}")
+    res = subprocess.run(["python3", STATS_SCRIPT, MASTER_COMBINED_CSV] + sys.argv[1:], check=False)
     if res.returncode != 0:
         print(f"[combine] ✖ stats.py failed with code {res.returncode}")
         sys.exit(res.returncode)
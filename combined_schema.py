@@ -0,0 +1,87 @@
+"""
+dtype schema of combined stats rows (per-match CSVs and combinedStatsMaster.csv).
+
+Player, Team and mapName are categoricals, and the playerKey and side
+columns hold Player and Team stripped and lowercased, worked out once per
+distinct name rather than once per row. Counts are stored in the smallest
+integer type that holds them, and float stats as float32 wherever that
+leaves every value's thousandths unchanged: StatAccumulator sums in
+thousandths, so totals are the same as from float64. matchId, matchDate
+and Minutes (which weighs ratings) keep 64 bits.
+"""
+import numpy as np
+import pandas as pd
+
+from accumulator import FIXED_POINT
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+CATEGORY_COLUMNS = ['Player', 'Team', 'mapName']
+WIDE_COLUMNS     = {'matchId', 'matchDate', 'Minutes'}
+
+KEY_COLUMN       = 'playerKey'  # Player, stripped and lowercased
+SIDE_COLUMN      = 'side'       # Team, stripped and lowercased: 'red' or 'blue'
+
+# read_csv dtypes: categoricals are parsed without an object column per row.
+CATEGORY_DTYPES  = {c: 'category' for c in CATEGORY_COLUMNS}
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def name_key(names):
+    return names.astype(str).str.strip().str.lower()
+
+
+def normalized(values, key=name_key):
+    """Categorical of key(values), with `key` applied once per category instead of per row."""
+    cat = values.astype('category').cat
+    codes, keys = pd.factorize(key(cat.categories), sort=True)
+    row_codes = cat.codes.to_numpy()
+    new_codes = np.where(row_codes >= 0, codes[row_codes] if len(codes) else -1, -1)
+    return pd.Series(pd.Categorical.from_codes(new_codes, keys), index=values.index)
+
+
+def downcast(values, floats=True):
+    """
+    A numeric column in the narrowest dtype that keeps it exact: the
+    smallest integer type for integers, and with floats=True float32 if
+    rounding every value to thousandths gives the same result. Anything
+    else is returned unchanged.
+    """
+    kind = values.dtype.kind
+    if kind in 'iu':
+        return pd.to_numeric(values, downcast='integer')
+    if kind != 'f' or not floats or values.dtype.itemsize <= 4:
+        return values
+    wide = values.to_numpy()
+    with np.errstate(over='ignore', invalid='ignore'):
+        narrow = wide.astype(np.float32)
+        exact = np.array_equal(np.rint(narrow.astype(np.float64) * FIXED_POINT),
+                               np.rint(wide * FIXED_POINT), equal_nan=True)
+    return pd.Series(narrow, index=values.index, name=values.name) if exact else values
+
+
+def apply_schema(df, floats=True):
+    """
+    A copy of combined stats rows with the schema's dtypes and the
+    playerKey/side columns. Pass floats=False where float stats are summed
+    as floats and written out, so their sums stay float64.
+    """
+    columns = {}
+    for col in df.columns:
+        if col in (KEY_COLUMN, SIDE_COLUMN):
+            continue
+        values = df[col]
+        columns[col] = values.astype('category') if col in CATEGORY_COLUMNS else \
+                       values if col in WIDE_COLUMNS else downcast(values, floats)
+    out = pd.DataFrame(columns, index=df.index)
+    if 'Player' in out:
+        out[KEY_COLUMN] = normalized(out['Player'])
+    if 'Team' in out:
+        out[SIDE_COLUMN] = normalized(out['Team'])
+    return out
+
+
+def read_combined(path, columns=None, floats=True, **kwargs):
+    """A combined stats CSV (only `columns` of it, if given) read with the schema."""
+    usecols = (lambda c: c in columns) if columns is not None else None
+    df = pd.read_csv(path, usecols=usecols, dtype=CATEGORY_DTYPES, **kwargs)
+    return apply_schema(df, floats)
@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import argparse
 import subprocess
 from glob import glob
 from os.path import join, dirname, abspath, exists
@@ -51,11 +53,19 @@ def run_subscript(path: str, *args):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Fetch new matches and rebuild all statistics.")
+    parser.add_argument('--profile-match', metavar='MATCH_ID',
+                        help="run this match's extraction under cProfile (profile_<id>.prof/.txt in the run folder)")
+    args = parser.parse_args()
+
     # 0) Ensure all required packages are installed
     check_dependencies()
 
+    from instrumentation import run_metrics, profile_call
+
     # 1) Fetch & merge new matches
-    run_subscript(LATEST_MATCH_SCRIPT)
+    with run_metrics.stage('fetch'):
+        run_subscript(LATEST_MATCH_SCRIPT)
 
     # 2) Build a fresh run folder
     with open(join(ROOT_DIR, "latest_match.txt")) as f:
@@ -68,39 +78,73 @@ def main():
     from eu_ctf import (
         load_bulk_matches, load_bulk_maps,
         extract_match_data, compile_data,
-        combine_stats_csv, failed_match_ids
+        combine_stats_csv, failed_match_ids, match_event_records
     )
+    from event_store import save_event_store
+    from heatmaps import HEATMAP_DIR, update_heatmaps
+    from match_index import MATCH_INDEX_FILE, load_or_build_match_index, is_eligible, load_match_filters
 
     print("[ctf_statistics] loading bulk JSON data...")
-    bulk_matches = load_bulk_matches(BULK_MATCHES_FILE)
-    bulk_maps    = load_bulk_maps(BULK_MAPS_FILE)
-
-    print(f"[ctf_statistics] processing {len(bulk_matches)} matches...")
-    for mid in bulk_matches:
-        print(f"[ctf_statistics] ▶ processing match {mid}")
-        try:
-            extract_match_data(mid, bulk_matches, bulk_maps, RUN_DIR)
-            print(f"[ctf_statistics] ✓ match {mid} processed successfully")
-        except Exception as e:
-            print(f"[ctf_statistics] ✖ match {mid} failed: {e}")
-            if mid not in failed_match_ids:
-                failed_match_ids.append(mid)
+    with run_metrics.stage('json_load'):
+        bulk_matches = load_bulk_matches(BULK_MATCHES_FILE)
+        bulk_maps    = load_bulk_maps(BULK_MAPS_FILE)
+        match_index  = load_or_build_match_index(MATCH_INDEX_FILE, bulk_matches)
+
+    # Ineligible matches are dropped on their headers and never decoded.
+    filters = load_match_filters()
+    eligible = [mid for mid in bulk_matches if is_eligible(match_index[str(mid)], filters)]
+    run_metrics.counters['filtered'] += len(bulk_matches) - len(eligible)
+
+    print(f"[ctf_statistics] processing {len(eligible)} of {len(bulk_matches)} matches...")
+    with run_metrics.stage('extract'):
+        for mid in eligible:
+            print(f"[ctf_statistics] ▶ processing match {mid}")
+            start = time.perf_counter()
+            try:
+                if mid == args.profile_match:
+                    df = profile_call(join(RUN_DIR, f"profile_{mid}"),
+                                      extract_match_data, mid, bulk_matches, bulk_maps, RUN_DIR)
+                else:
+                    df = extract_match_data(mid, bulk_matches, bulk_maps, RUN_DIR)
+                status = 'filtered' if df is None else 'processed'
+                print(f"[ctf_statistics] ✓ match {mid} {status}")
+            except Exception as e:
+                status = 'failed'
+                print(f"[ctf_statistics] ✖ match {mid} failed: {e}")
+                if mid not in failed_match_ids:
+                    failed_match_ids.append(mid)
+            run_metrics.record_match(mid, time.perf_counter() - start, status)
+
+    # Persist normalized events so advanced stats can be re-derived later
+    # without decoding the matches again.
+    EVENTS_FILE = join(RUN_DIR, "events.npz")
+    with run_metrics.stage('event_store'):
+        save_event_store(EVENTS_FILE, match_event_records.items())
+    print(f"[ctf_statistics] ✓ event store written: {EVENTS_FILE} ({len(match_event_records)} matches)")
+
+    # Matches already in a map's heatmap are skipped, so reruns add only new ones.
+    with run_metrics.stage('heatmaps'):
+        n_maps = update_heatmaps(match_event_records.items(), match_index, bulk_maps)
+    print(f"[ctf_statistics] ✓ heatmaps updated for {n_maps} maps → {HEATMAP_DIR}")
 
     # 4) Compile aggregated + combined CSVs
     AGG_CSV  = join(RUN_DIR, "AggregatedStatsOutput.csv")
     COMB_CSV = join(RUN_DIR, "CombinedStatsOutput.csv")
 
     print("[ctf_statistics] compiling aggregated CSV…")
-    compile_data(RUN_DIR, AGG_CSV)
+    with run_metrics.stage('compile_data'):
+        compile_data(RUN_DIR, AGG_CSV)
     print(f"[ctf_statistics] ✓ aggregated CSV compiled: {AGG_CSV}")
 
     print("[ctf_statistics] compiling combined CSV…")
-    combine_stats_csv(RUN_DIR, AGG_CSV, COMB_CSV, bulk_matches, bulk_maps)
+    with run_metrics.stage('combine_stats_csv'):
+        combine_stats_csv(RUN_DIR, AGG_CSV, COMB_CSV, bulk_matches, bulk_maps, match_index, filters)
     print(f"[ctf_statistics] ✓ combined CSV compiled: {COMB_CSV}")
 
     # 5) Update profiles using aggregated CSV
     print(f"[ctf_statistics] updating profiles from {AGG_CSV}…")
-    run_subscript(UPDATE_PROFILE_SCRIPT, AGG_CSV)
+    with run_metrics.stage('profile_scrape'):
+        run_subscript(UPDATE_PROFILE_SCRIPT, AGG_CSV)
     print("[ctf_statistics] ✓ profiles update complete")
 
     # 6) Write failures list if any
@@ -113,8 +157,20 @@ def main():
         print(f"[ctf_statistics] ✓ failure list written: {txt}")
 
 
-    # 8) Kick off combine.py
-    run_subscript(COMBINE_SCRIPT)
+    # 8) Kick off combine.py (master CSV append, stats.py and Excel export);
+    #    stats.py's own stages (fold, tables, Excel export) are added to ours.
+    STATS_METRICS = join(RUN_DIR, "stats_metrics.json")
+    with run_metrics.stage('master_and_stats'):
+        run_subscript(COMBINE_SCRIPT, '--metrics', STATS_METRICS)
+    run_metrics.add_stages(STATS_METRICS)
+    os.remove(STATS_METRICS)
+
+    # 9) Timings, latencies and match counters for this run
+    METRICS_FILE = join(RUN_DIR, "metrics.json")
+    run_metrics.write(METRICS_FILE)
+    counts = run_metrics.counters
+    print(f"[ctf_statistics] ✓ metrics written: {METRICS_FILE} "
+          f"({counts['processed']} processed, {counts['filtered']} filtered, {counts['failed']} failed)")
 
     print("[ctf_statistics] all done.")
 
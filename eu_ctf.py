@@ -1,29 +1,44 @@
 import logging
 import os
-from json import load
 from glob import iglob, glob
 from os.path import basename, exists, join, splitext
 from urllib.request import urlretrieve
 from urllib.error import HTTPError
 from datetime import datetime
 from math import sqrt
+from bisect import bisect_right
 import ssl
+import time
+from operator import attrgetter
 
 import pandas as pd
-from pandas import DataFrame, read_csv, concat, merge
+from pandas import DataFrame, read_csv, concat
 import numpy as np
-from numpy import nan, inf
+
+import bulk_schema
+from combined_schema import apply_schema, normalized
+from metrics import compute_metrics, derive, GAME_METRICS, ADVANCED_METRICS, CUMULATIVE_METRICS
+from event_store import MatchEvents, CAPTURE, DROP, GRAB, RETURN, GAME_ENDS, RED, BLUE
+from game_state import GAME_STATE_COLUMNS, GAME_STATE_ZEROS, game_state_counts
+from instrumentation import run_metrics
+from match_index import match_header, build_match_index, is_eligible, describe_filters, load_match_filters
 
 # Note: numpy.arange is imported in the original code but not used here.
 
-# Disable logging if desired.
+# Skipped files and failed matches are logged.
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
-logging.disable(logging.CRITICAL)
 
-# Global list for failed match ids due to Event dimension mismatch.
+# Global list of match ids that failed to process.
 failed_match_ids = []
 
+# Match eligibility criteria, checked against match headers (see match_index).
+MATCH_FILTERS = load_match_filters()
+
+# Normalized events of every extracted match, keyed by match id, for the
+# run's event store (see event_store.save_event_store).
+match_event_records = {}
+
 
 ############
 # NEW: Load Bulk Data
@@ -59,11 +74,12 @@ def compile_data(file_directory, output_file):
         print(f"[compile_data] No non-empty CSV files to aggregate in {file_directory!r}.")
         return
 
-    df_all = pd.concat(dfs, ignore_index=True)
+    # Float stats are summed and written as they are, so only ints are narrowed.
+    df_all = apply_schema(pd.concat(dfs, ignore_index=True), floats=False)
 
-    # 4) Preserve original names & build a casefold key
+    # 4) Preserve original names & build a casefold key, once per distinct name
     df_all['Player_orig'] = df_all['Player']
-    df_all['Player_key']  = df_all['Player_orig'].str.casefold()
+    df_all['Player_key']  = normalized(df_all['Player'], lambda names: names.astype(str).str.casefold())
 
     # 5) Identify numeric columns to sum
     numeric_cols = df_all.select_dtypes(include=[np.number]).columns.tolist()
@@ -75,10 +91,12 @@ def compile_data(file_directory, output_file):
     # 7) Group by the casefold key and aggregate
     df = (
         df_all
-        .groupby('Player_key', as_index=False)
+        .groupby('Player_key', as_index=False, observed=True)
         .agg(agg_dict)
         .rename(columns={'Player_orig': 'Player'})
     )
+    # Sums of narrowed counts come back narrow when they fit; derived stats need room.
+    df = df.astype({c: np.int64 for c in numeric_cols if df[c].dtype.kind in 'iu'})
 
     # 8) Drop helper column
     df.drop(columns=['Player_key'], inplace=True)
@@ -101,10 +119,9 @@ def load_bulk_matches(bulk_matches_file):
     """
     Loads the bulk JSON file containing many matches.
     The file is expected to have a dictionary keyed by match id.
+    Matches are decoded with the typed schema in bulk_schema.
     """
-    with open(bulk_matches_file, 'r', encoding='utf-8') as f:
-        bulk_match_data = load(f)
-    return bulk_match_data
+    return bulk_schema.load_matches(bulk_matches_file)
 
 
 def load_bulk_maps(bulk_maps_file):
@@ -112,32 +129,34 @@ def load_bulk_maps(bulk_maps_file):
     Loads the bulk JSON file containing map data.
     It is expected that this file is a dictionary keyed by map ids.
     """
-    with open(bulk_maps_file, 'r', encoding='utf-8') as f:
-        bulk_map_data = load(f)
-    return bulk_map_data
+    return bulk_schema.load_maps(bulk_maps_file)
 
 
 ############
 # UPDATED: read_match_from_bulk using tagpro-eu decoding
 ############
 
-def read_match_from_bulk(match_id, bulk_match_data, bulk_map_data):
+def read_match_from_bulk(match_id, bulk_match_data, bulk_map_data, filters=None):
     """
     Reads a match using its id from bulk_match_data and attaches a decoded map
     using the tagpro-eu library. The bulk maps are stored in a separate JSON file,
     and the match data references a mapId which is used to find the corresponding map.
 
-    Only matches with timeLimit == 8 and an empty group are processed.
-    If the match does not meet these criteria, a ValueError is raised.
+    Only matches meeting `filters` (default MATCH_FILTERS: timeLimit == 8 and
+    an empty group) are processed; they are checked on the match header before
+    anything is decoded. If the match does not meet these criteria, a
+    ValueError is raised.
     """
+    filters = MATCH_FILTERS if filters is None else filters
+
     # Retrieve the raw match JSON data.
     match_data = bulk_match_data.get(str(match_id))
     if match_data is None:
         raise ValueError(f"Match data for id {match_id} not found in bulk file.")
 
-    # Filter out matches that do not have timeLimit 8 or an empty group.
-    if match_data.get("timeLimit") != 8 or match_data.get("group", "") != "":
-        raise ValueError(f"Match {match_id} skipped: does not meet criteria (timeLimit 8 and empty group required).")
+    # Filter out ineligible matches before building any tagpro_eu objects.
+    if not is_eligible(match_header(match_id, match_data), filters):
+        raise ValueError(f"Match {match_id} skipped: does not meet criteria ({describe_filters(filters)}).")
 
     # Create a Match object using the tagpro_eu library.
     from tagpro_eu.match import Match
@@ -159,283 +178,326 @@ def read_match_from_bulk(match_id, bulk_match_data, bulk_map_data):
 
 
 ############
-# UPDATED: extract_match_data with error handling for event dimension mismatch
+# UPDATED: extract_match_data over column buffers
 ############
 
-def extract_match_data(match_id, bulk_match_data, bulk_map_data, current_output_directory):
-    try:
-        match = read_match_from_bulk(match_id, bulk_match_data, bulk_map_data)
-    except ValueError as e:
-        logging.error(e)
-        return None  # Skip processing for this match.
+# Per-player stats read from tagpro_eu, as (attribute path, column).
+PLAYER_STATS = [('time.seconds', 'Time'), ('cap_diff', 'CD'), ('captures', 'Captures'),
+                ('grabs', 'Grabs'), ('hold.seconds', 'Hold'), ('drops', 'Drops'), ('pops', 'Pops'),
+                ('returns', 'Returns'), ('tags', 'Tags'), ('prevent.seconds', 'Prevent'),
+                ('pups_total', 'Pups'), ('block.seconds', 'Block'), ('button.seconds', 'Button')]
+PLAYER_STAT_GETTERS = [(attrgetter(f'stats.{path}'), column) for path, column in PLAYER_STATS]
 
-    df = DataFrame()
+# Columns of a per-match CSV before the advanced statistics.
+MATCH_COLUMNS = ['Player', 'Team', 'Minutes', 'CD', 'Captures', 'Grabs', 'Hold', 'Drops',
+                 'Pops', 'Returns', 'Tags', 'Prevent', 'Pups', 'Pups Available',
+                 'Block', 'Button', 'Support', 'Hold Against', 'K/D', 'Pup %', 'Score %',
+                 'NDPops', 'NRTags', 'KF', 'Hold/Grab', 'Prevent/Return', 'Prevent/Hold Against']
+ADVANCED_COLUMNS = ['Long Holds', 'Flaccids', 'Handoffs', 'Good Handoffs', 'Captures off Handoffs',
+                    'Quick Returns', 'Key Returns', 'Returns in Base']
 
-    timeline = match.create_timeline()
-    join_events = [k for k in timeline if 'Join team' in k[1]]
-    player_team_dict = {join_event[2].name: join_event[1].split()[-1] for join_event in join_events}
 
-    df['Player'] = [player.name for player in match.players]
-    df['Team'] = df['Player'].apply(lambda x: player_team_dict.get(x))
+class ExtractBuffers:
+    """
+    Plain column lists of the player rows of extracted matches, appended
+    match by match. table() derives the per-game columns of every match at
+    once, so a match costs its decoding and event pass, not a DataFrame.
+    """
 
-    time_statistics = ['time', 'hold', 'prevent', 'block', 'button']
-    desired_statistics = ['time', 'cap_diff', 'captures', 'grabs', 'hold', 'drops', 'pops',
-                          'returns', 'tags', 'prevent', 'pups_total', 'block', 'button']
+    def __init__(self):
+        self.match_ids, self.sizes = [], []
+        self.players, self.teams = [], []
+        self.stats = {column: [] for _, column in PLAYER_STATS}
+        self.joined = []  # whether each row has advanced statistics
+        self.advanced = {column: [] for column in ADVANCED_COLUMNS}
+        self.game_state = {column: [] for column in GAME_STATE_COLUMNS}
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def append(self, match_id, match, events):
+        """Add one decoded match; the advanced and game-state statistics run here."""
+        possessions = flag_possessions(events)
+        counts = advanced_counts(events, possessions)
+        states = game_state_counts(events, possessions)
+        team_of = {events.players[p]: events.team_names[t - 1]
+                   for p, t in zip(events.join['player'].tolist(), events.join['team'].tolist())}
+        players = match.players
+        names = [player.name for player in players]
+
+        self.match_ids.append(match_id)
+        self.sizes.append(len(names))
+        self.players += names
+        self.teams += [team_of.get(name) for name in names]
+        for getter, column in PLAYER_STAT_GETTERS:
+            self.stats[column] += map(getter, players)
+        zeros = dict.fromkeys(ADVANCED_COLUMNS, 0)
+        rows = [counts.get(name) for name in names]
+        self.joined += [row is not None for row in rows]
+        for column in ADVANCED_COLUMNS:
+            self.advanced[column] += [(row or zeros)[column] for row in rows]
+        rows = [states.get(name, GAME_STATE_ZEROS) for name in names]
+        for column in GAME_STATE_COLUMNS:
+            self.game_state[column] += [row[column] for row in rows]
+
+    def _hold_against(self, match, hold):
+        """
+        Hold of the players whose team differs from each row's, summed per
+        match. Times are whole seconds, so the sums are exact in any order.
+        """
+        team, names = pd.factorize(pd.Series(self.teams, dtype=object))  # no team: -1
+        slot = match * len(names) + team
+        totals = np.bincount(match, weights=hold, minlength=len(self.sizes))
+        same_team = np.bincount(slot[team >= 0], weights=hold[team >= 0],
+                                minlength=len(self.sizes) * len(names))
+        # A player without a team counts everyone's hold, as the per-match pandas code did.
+        against = totals[match] - np.where(team >= 0, same_team[np.maximum(slot, 0)], 0)
+        return against.astype(hold.dtype)
+
+    def table(self):
+        """One frame of every buffered match with the per-match CSV columns."""
+        match = np.repeat(np.arange(len(self.sizes)), self.sizes)
+        c = {column: np.array(values) for column, values in self.stats.items()}
+        c.update((column, np.array(values, dtype=np.int64)) for column, values in self.advanced.items())
+        c.update((column, np.array(values, dtype=type(GAME_STATE_ZEROS[column])))
+                 for column, values in self.game_state.items())
+
+        c['Minutes'] = np.round(c['Time'] / 60.0, 1)
+        c['Pups Available'] = np.bincount(match, weights=c['Pups'], minlength=len(self.sizes)) \
+                                .astype(c['Pups'].dtype)[match]
+        c['Support'] = (c['Button'] // 5) + ((c['Block'] // 5) * 2)
+        c['Hold Against'] = self._hold_against(match, c['Hold'])
+        c['NDPops'] = c['Pops'] - c['Drops']
+        c['NRTags'] = c['Tags'] - c['Returns']
+        c['KF'] = c['Grabs'] - (c['Drops'] + c['Captures'])
+        c.update(derive(c, GAME_METRICS))
+        c.update(derive(c, ADVANCED_METRICS))
+
+        # Players without a join event have no advanced statistics and no row.
+        joined = np.array(self.joined, dtype=bool)
+        return DataFrame({'Player': [p for p, j in zip(self.players, self.joined) if j],
+                          'Team': [t for t, j in zip(self.teams, self.joined) if j],
+                          **{column: c[column][joined]
+                             for column in MATCH_COLUMNS[2:] + ADVANCED_COLUMNS + ADVANCED_METRICS
+                                           + GAME_STATE_COLUMNS}})
+
+    def row_matches(self):
+        """Buffer position of the match of each table() row."""
+        match = np.repeat(np.arange(len(self.sizes)), self.sizes)
+        return match[np.array(self.joined, dtype=bool)]
+
+
+def decode_match(match_id, bulk_match_data, bulk_map_data, filters=None):
+    """(match, events) of an eligible match, or None (logged) if it is skipped."""
+    try:
+        with run_metrics.stage('extract.match_decode'):
+            match = read_match_from_bulk(match_id, bulk_match_data, bulk_map_data, filters)
+    except ValueError as e:
+        logging.error(e)
+        return None
 
-    for field in desired_statistics:
-        if field in time_statistics:
-            df[field] = [getattr(getattr(player.stats, field), 'seconds') for player in match.players]
-        else:
-            df[field] = [getattr(player.stats, field) for player in match.players]
+    with run_metrics.stage('extract.timeline_decode'):
+        events = MatchEvents.from_match(match)
+    return match, events
 
-    df.rename(columns={
-        'time': 'Time', 'cap_diff': 'CD', 'captures': 'Captures', 'grabs': 'Grabs', 'hold': 'Hold',
-        'drops': 'Drops', 'pops': 'Pops', 'returns': 'Returns', 'tags': 'Tags', 'prevent': 'Prevent',
-        'pups_total': 'Pups', 'block': 'Block', 'button': 'Button'
-    }, inplace=True)
-    df = individual_game_derivative_statistics(df)
 
-    df = df[['Player', 'Team', 'Minutes', 'CD', 'Captures', 'Grabs', 'Hold', 'Drops',
-             'Pops', 'Returns', 'Tags', 'Prevent', 'Pups', 'Pups Available',
-             'Block', 'Button', 'Support', 'Hold Against', 'K/D', 'Pup %', 'Score %',
-             'NDPops', 'NRTags', 'KF', 'Hold/Grab', 'Prevent/Return', 'Prevent/Hold Against']]
+def extract_match_data(match_id, bulk_match_data, bulk_map_data, current_output_directory):
+    decoded = decode_match(match_id, bulk_match_data, bulk_map_data)
+    if decoded is None:
+        return None  # Skip processing for this match.
 
-    try:
-        df_advanced = advanced_statistics(match_id, match)
-        df = merge(df, df_advanced, on=['Player'])
-        df = advanced_derivative_statistics(df)
-    except ValueError as e:
-        # Check if the error is due to event dimension mismatch.
-        if "Event dimension mismatch" in str(e):
-            logging.error(e)
-            # Prepare the output file path.
-            output_file = f"{match_id}.csv"
-            full_path = join(current_output_directory, output_file)
-            # If the CSV file was written, delete it.
-            if exists(full_path):
-                os.remove(full_path)
-            # Record the failed match id.
-            global failed_match_ids
-            failed_match_ids.append(match_id)
-            return None  # Skip this match.
-        else:
-            raise
+    buffers = ExtractBuffers()
+    with run_metrics.stage('extract.advanced_stats'):
+        buffers.append(match_id, *decoded)
+    df = buffers.table()
+    match_event_records[match_id] = decoded[1]
 
     # Write the CSV file if everything processed correctly.
     output_file = f"{match_id}.csv"
     full_path = join(current_output_directory, output_file)
-    df.to_csv(full_path, index=False)
+    with run_metrics.stage('extract.csv_write'):
+        df.to_csv(full_path, index=False)
     return df
 
 
-############
-# UPDATED: advanced_statistics with tagpro-eu map decoding for flag locations
-############
-
-def advanced_statistics(match_id,match):
-    timeline = match.create_timeline()
-    events = [k for k in timeline if k[1] in ['Grab Opponent flag','Return','Drop Opponent flag','Capture Opponent flag','Grab Temporary flag','Drop Temporary flag','Capture Temporary flag']]
-
-    team_dictionary = {}
-    join_events = [k for k in timeline if 'Join team' in k[1]]
-    for join_event in join_events:
-        if (join_event[2].name not in team_dictionary):
-            team_dictionary[join_event[2].name] = join_event[1].split()[-1]
-
-    teams = [match.team_blue.name,match.team_red.name]
-
-    for i,event in enumerate(events):
-        event = list(event)
-        event[0] = to_seconds(str(event[0]))
-        event.append(team_dictionary[event[-1].name])
-
-        if (event[1] == 'Grab Temporary flag'):
-            event[1] = 'Grab Opponent flag'
-
-        if (event[1] == 'Drop Temporary flag'):
-            event[1] = 'Drop Opponent flag'
-
-        if (event[1] == 'Capture Temporary flag'):
-            event[1] = 'Capture Opponent flag'
-
-        events[i] = event
-
-    events = sorted(events,key = lambda x: (x[0],x[1]))
-
-    start_events_Blue = []
-    start_events_Red = []
-    end_events_Blue = []
-    end_events_Red = []
-
-    for event in events:
-        if (event[1] == 'Grab Opponent flag' and event[-1] == teams[0]):
-            start_events_Blue.append(event)
-
-        elif (event[1] == 'Grab Opponent flag' and event[-1] == teams[-1]):
-            start_events_Red.append(event)
-
-        if (event[1] in ['Drop Opponent flag','Capture Opponent flag'] and event[-1] == teams[0]):
-            end_events_Blue.append(event)
-
-        elif (event[1] in ['Drop Opponent flag','Capture Opponent flag'] and event[-1] == teams[-1]):
-            end_events_Red.append(event)
-
-        if (event[1] == 'Return' and event[-1] == teams[-1]):
-            if (end_events_Blue[-1][1] == 'Drop Opponent flag' and end_events_Blue[-1][0] == event[0]):
-                end_events_Blue.pop()
-                end_events_Blue.append(event)
-            else:
-                end_events_Blue.append(event)
-
-        elif (event[1] == 'Return' and event[-1] == teams[0]):
-            if (end_events_Red[-1][1] == 'Drop Opponent flag' and end_events_Red[-1][0] == event[0]):
-                end_events_Red.pop()
-                end_events_Red.append(event)
-
-            else:
-                end_events_Red.append(event)
-
-    to_delete_Blue = []
-    for i in range(1,len(end_events_Blue)):
-        if (round(end_events_Blue[i][0] - end_events_Blue[i-1][0],2) < 0.25):
-            if (end_events_Blue[i-1][1] == 'Drop Opponent flag'):
-                to_delete_Blue.append(i-1)
-
-            elif (end_events_Blue[i][1] == 'Drop Opponent flag'):
-                to_delete_Blue.append(i)
-
-            else:
-                to_delete_Blue.append(i)
-
-    to_delete_Red = []
-    for i in range(1,len(end_events_Red)):
-        if (round(end_events_Red[i][0] - end_events_Red[i-1][0],2) < 0.25):
-            if (end_events_Red[i-1][1] == 'Drop Opponent flag'):
-                to_delete_Red.append(i-1)
-
-            elif (end_events_Red[i][1] == 'Drop Opponent flag'):
-                to_delete_Red.append(i)
-
-            else:
-                to_delete_Red.append(i)
+def extract_matches(match_ids, bulk_match_data, bulk_map_data, match_index=None, filters=None):
+    """
+    Extract many matches into one table: the per-match CSV columns plus
+    matchId, mapName and matchDate, in match_ids order. Rows are buffered
+    as plain lists and the per-game columns derived once for the batch;
+    nothing is written to disk.
+
+    Skipped matches are left out and failed ones are logged. Returns
+    (table, {match id: exception} of the failed matches); every match's
+    latency is recorded in run_metrics.
+    """
+    if match_index is None:
+        match_index = {}
+    buffers = ExtractBuffers()
+    failures = {}
+    for mid in match_ids:
+        start = time.perf_counter()
+        try:
+            decoded = decode_match(mid, bulk_match_data, bulk_map_data, filters)
+            if decoded is not None:
+                with run_metrics.stage('extract.advanced_stats'):
+                    buffers.append(mid, *decoded)
+                match_event_records[mid] = decoded[1]
+            status = 'processed' if decoded is not None else 'filtered'
+        except Exception as e:
+            logging.error(f"Match {mid} failed: {e}")
+            failures[mid] = e
+            status = 'failed'
+        run_metrics.record_match(mid, time.perf_counter() - start, status)
+
+    with run_metrics.stage('extract.columns'):
+        df = buffers.table()
+        headers = [match_index.get(str(mid)) or match_header(mid, bulk_match_data[str(mid)])
+                   for mid in buffers.match_ids]
+        match = buffers.row_matches()
+        df['matchId'] = pd.Series([int(mid) for mid in buffers.match_ids], dtype='int64').take(match).to_numpy()
+        df['mapName'] = pd.Series([bulk_map_data.get(str(h.mapId), {}).get("name", "Unknown Map")
+                                   for h in headers]).take(match).to_numpy()
+        df['matchDate'] = pd.Series([h.date for h in headers]).take(match).to_numpy()
+    return df, failures
 
-    end_events_Blue = [v for i,v in enumerate(end_events_Blue) if i not in to_delete_Blue]
-    end_events_Red = [v for i,v in enumerate(end_events_Red) if i not in to_delete_Red]
 
-    if (len(end_events_Blue) < len(start_events_Blue)):
-        end_events_Blue.append([match.duration.seconds,'Game ends',None,None])
+############
+# UPDATED: advanced_statistics over flag possessions from a single-pass state machine
+############
 
-    if (len(end_events_Red) < len(start_events_Red)):
-        end_events_Red.append([match.duration.seconds,'Game ends',None,None])
+def flag_possessions(match_events):
+    """
+    Pair every flag grab with the event that ended it, in one pass over the
+    (time, kind)-sorted flag events of a match.
+
+    A team's hold ends with its carrier's drop or capture, or with a return
+    by an opposing player. A drop followed within 0.25s by another end of the
+    same hold (typically the return that caused it) is replaced by that
+    event; other duplicate or stray ends are ignored, and a grab while a hold
+    is still open closes it as a drop. Holds still open at the end of the
+    match end with GAME_ENDS at its duration.
+
+    Returns {RED: [...], BLUE: [...]}, each a time-ordered list of
+    (grabber, start, end, end_kind, ender) tuples with players as indices
+    into match_events.players (ender is None for GAME_ENDS).
+    """
+    flag = match_events.flag
+    other = {RED: BLUE, BLUE: RED}
+    possessions = {RED: [], BLUE: []}
+    holding = {RED: None, BLUE: None}
+
+    for time, kind, player, team in zip(flag['time'].tolist(), flag['kind'].tolist(),
+                                        flag['player'].tolist(), flag['team'].tolist()):
+        if team not in other:
+            continue
+
+        if kind == GRAB:
+            if holding[team] is not None:
+                grabber, start = holding[team]
+                possessions[team].append((grabber, start, time, DROP, grabber))
+            holding[team] = (player, time)
+            continue
+
+        carrier_team = other[team] if kind == RETURN else team
+        held = possessions[carrier_team]
+        if holding[carrier_team] is not None:
+            grabber, start = holding[carrier_team]
+            held.append((grabber, start, time, kind, player))
+            holding[carrier_team] = None
+        elif held and held[-1][3] == DROP and round(time - held[-1][2], 2) < 0.25:
+            held[-1] = held[-1][:2] + (time, kind, player)
+
+    for team, hold in holding.items():
+        if hold is not None:
+            possessions[team].append(hold + (match_events.duration, GAME_ENDS, None))
+
+    return possessions
+
+
+def advanced_counts(match_events, possessions=None):
+    """
+    {player name: {advanced column: count}} of one match, for every player
+    with a join event, in the order they first joined. `possessions` are
+    the match's flag_possessions(), if already paired.
+    """
+    players = match_events.players
+    counts = {name: dict.fromkeys(ADVANCED_COLUMNS, 0) for name in match_events.first_teams()}
 
-    if (len(end_events_Blue) != len(start_events_Blue) or len(end_events_Red) != len(start_events_Red)):
-        raise ValueError('Event dimension mismatch while processing EU {}'.format(match_id))
+    def credit(player, column):
+        if (player is not None and players[player] in counts):
+            counts[players[player]][column] += 1
 
     tile_dimension = 40.0
-    flag_locations = []
-    tiles = match.map.tiles
-
-    for i in range(0,len(tiles)):
-        for j in range(0,len(tiles[i])):
-            if (tiles[i][j].value == 40):
-                x_location_Blue = (j + 1.0) * tile_dimension - (0.5 * tile_dimension)
-                y_location_Blue = (i + 1.0) * tile_dimension - (0.5 * tile_dimension)
-
-            elif (tiles[i][j].value == 30):
-                x_location_Red = (j + 1.0) * tile_dimension - (0.5 * tile_dimension)
-                y_location_Red = (i + 1.0) * tile_dimension - (0.5 * tile_dimension)
-
-    flag_locations.append((x_location_Blue,y_location_Blue))
-    flag_locations.append((x_location_Red,y_location_Red))
-
-    splat_events = match.splats
-
-    splats = []
-    for s in splat_events:
-        splats.append([to_seconds(str(s.time)),(s.x,s.y),s.player,s.team.name])
-
-    df = DataFrame()
-    df['Player'] = team_dictionary.keys()
-    columns = ['Long Holds','Flaccids','Handoffs','Good Handoffs','Captures off Handoffs','Quick Returns','Key Returns','Returns in Base']
-    for column in columns:
-        df[column] = 0
+    if possessions is None:
+        possessions = flag_possessions(match_events)
 
-    for i in range(0,len(start_events_Blue)):
-        if (round(abs(end_events_Blue[i][0] - start_events_Blue[i][0]),2) >= 20.0):
-            df.loc[df['Player'] == start_events_Blue[i][-2].name,'Long Holds'] += 1
+    # First splat per (time, team), for locating where a carrier was returned.
+    splat = match_events.splat
+    splat_locations = {}
+    for time, x, y, t in zip(splat['time'].tolist(), splat['x'].tolist(), splat['y'].tolist(), splat['team'].tolist()):
+        splat_locations.setdefault((time, t), (x, y))
 
-        if (round(abs(end_events_Blue[i][0] - start_events_Blue[i][0]),2) < 2.0):
-            df.loc[df['Player'] == start_events_Blue[i][-2].name,'Flaccids'] += 1
+    for team, other in ((BLUE, RED), (RED, BLUE)):
+        holds = possessions[team]
+        # Returns made by this team, i.e. ends of the other team's holds.
+        return_times = [h[2] for h in possessions[other] if h[3] == RETURN]
+        returners = [h[4] for h in possessions[other] if h[3] == RETURN]
+        enemy_flag = match_events.flag_xy[other - 1]
 
-            if (end_events_Blue[i][1] == 'Return'):
-                df.loc[df['Player'] == end_events_Blue[i][-2].name,'Quick Returns'] += 1
+        for i, (grabber, start, end, end_kind, ender) in enumerate(holds):
+            hold = round(abs(end - start), 2)
 
-        if (i > 0):
-            if (round(abs(end_events_Blue[i-1][0] - start_events_Blue[i-1][0]),2) < 3.0 and round(abs(start_events_Blue[i][0] - end_events_Blue[i-1][0]),2) < 2.0):
-                df.loc[df['Player'] == start_events_Blue[i-1][-2].name,'Handoffs'] += 1
+            if (hold >= 20.0):
+                credit(grabber, 'Long Holds')
 
-                if (round(abs(end_events_Blue[i][0] - start_events_Blue[i][0]),2) >= 5.0):
-                    df.loc[df['Player'] == start_events_Blue[i-1][-2].name,'Good Handoffs'] += 1
+            if (hold < 2.0):
+                credit(grabber, 'Flaccids')
 
-                if (end_events_Blue[i][1] == 'Capture Opponent flag'):
-                    df.loc[df['Player'] == end_events_Blue[i][-2].name,'Captures off Handoffs'] += 1
+                if (end_kind == RETURN):
+                    credit(ender, 'Quick Returns')
 
-        if (end_events_Blue[i][1] == 'Capture Opponent flag'):
-            viable_return_events = [x for x in end_events_Red if x[1] == 'Return' and x[0] <= end_events_Blue[i][0]]
+            if (i > 0):
+                previous = holds[i-1]
+                if (round(abs(previous[2] - previous[1]), 2) < 3.0 and round(abs(start - previous[2]), 2) < 2.0):
+                    credit(previous[0], 'Handoffs')
 
-            if (viable_return_events):
-                index = min(range(0,len(viable_return_events)),key = lambda j: round(abs(viable_return_events[j][0] - end_events_Blue[i][0]),2))
+                    if (hold >= 5.0):
+                        credit(previous[0], 'Good Handoffs')
 
-                if (round(abs(end_events_Blue[i][0] - viable_return_events[index][0]),2) < 3):
-                    df.loc[df['Player'] == viable_return_events[index][-2].name,'Key Returns'] += 1
+                    if (end_kind == CAPTURE):
+                        credit(ender, 'Captures off Handoffs')
 
-        if (end_events_Blue[i][1] == 'Return'):
-            viable_splats = [s for s in splats if s[0] == end_events_Blue[i][0] and s[-1] == start_events_Blue[i][-1]]
+            if (end_kind == CAPTURE):
+                # Closest earlier return by the capping team; ties go to the first.
+                j = bisect_right(return_times, end) - 1
+                if (j >= 0):
+                    gap = round(abs(end - return_times[j]), 2)
+                    while (j > 0 and round(abs(end - return_times[j-1]), 2) == gap):
+                        j -= 1
 
-            if (viable_splats):
-                distance_to_enemy_flag = sqrt((flag_locations[-1][0] - viable_splats[0][1][0])**2 + (flag_locations[-1][1] - viable_splats[0][1][1])**2)
+                    if (gap < 3):
+                        credit(returners[j], 'Key Returns')
 
-                if (distance_to_enemy_flag <= 5.5 * tile_dimension):
-                    df.loc[df['Player'] == end_events_Blue[i][-2].name,'Returns in Base'] += 1
+            if (end_kind == RETURN):
+                location = splat_locations.get((end, team))
 
-    for i in range(0,len(start_events_Red)):
-        if (round(abs(end_events_Red[i][0] - start_events_Red[i][0]),2) >= 20.0):
-            df.loc[df['Player'] == start_events_Red[i][-2].name,'Long Holds'] += 1
+                if (location):
+                    distance_to_enemy_flag = sqrt((enemy_flag[0] - location[0])**2 + (enemy_flag[1] - location[1])**2)
 
-        if (round(abs(end_events_Red[i][0] - start_events_Red[i][0]),2) < 2.0):
-            df.loc[df['Player'] == start_events_Red[i][-2].name,'Flaccids'] += 1
+                    if (distance_to_enemy_flag <= 5.5 * tile_dimension):
+                        credit(ender, 'Returns in Base')
 
-            if (end_events_Red[i][1] == 'Return'):
-                df.loc[df['Player'] == end_events_Red[i][-2].name,'Quick Returns'] += 1
+    return counts
 
-        if (i > 0):
-            if (round(abs(end_events_Red[i-1][0] - start_events_Red[i-1][0]),2) < 3.0 and round(abs(start_events_Red[i][0] - end_events_Red[i-1][0]),2) < 2.0):
-                df.loc[df['Player'] == start_events_Red[i-1][-2].name,'Handoffs'] += 1
-
-                if (round(abs(end_events_Red[i][0] - start_events_Red[i][0]),2) >= 5.0):
-                    df.loc[df['Player'] == start_events_Red[i-1][-2].name,'Good Handoffs'] += 1
-
-                if (end_events_Red[i][1] == 'Capture Opponent flag'):
-                    df.loc[df['Player'] == end_events_Red[i][-2].name,'Captures off Handoffs'] += 1
-
-        if (end_events_Red[i][1] == 'Capture Opponent flag'):
-            viable_return_events = [x for x in end_events_Blue if x[1] == 'Return' and x[0] <= end_events_Red[i][0]]
-
-            if (viable_return_events):
-                index = min(range(0,len(viable_return_events)),key = lambda j: round(abs(viable_return_events[j][0] - end_events_Red[i][0]),2))
-
-                if (round(abs(end_events_Red[i][0] - viable_return_events[index][0]),2) < 3):
-                    df.loc[df['Player'] == viable_return_events[index][-2].name,'Key Returns'] += 1
-
-        if (end_events_Red[i][1] == 'Return'):
-            viable_splats = [s for s in splats if s[0] == end_events_Red[i][0] and s[-1] == start_events_Red[i][-1]]
-
-            if (viable_splats):
-                distance_to_enemy_flag = sqrt((flag_locations[0][0] - viable_splats[0][1][0])**2 + (flag_locations[0][1] - viable_splats[0][1][1])**2)
-
-                if (distance_to_enemy_flag <= 5.5 * tile_dimension):
-                    df.loc[df['Player'] == end_events_Red[i][-2].name,'Returns in Base'] += 1
 
+def advanced_statistics(match_id, match_events):
+    possessions = flag_possessions(match_events)
+    counts = advanced_counts(match_events, possessions)
+    states = game_state_counts(match_events, possessions)
+    df = DataFrame([{**counts[name], **states[name]} for name in counts],
+                   columns=ADVANCED_COLUMNS + GAME_STATE_COLUMNS)
+    df.insert(0, 'Player', list(counts))
     return df
 
 
@@ -449,7 +511,12 @@ def create_new_stats_folder(base_output_directory):
         i += 1
 
 
-def combine_stats_csv(current_output_directory, aggregated_output_file, combined_output_file, bulk_match_data, bulk_map_data):
+def combine_stats_csv(current_output_directory, aggregated_output_file, combined_output_file, bulk_match_data, bulk_map_data,
+                      match_index=None, filters=None):
+    filters = MATCH_FILTERS if filters is None else filters
+    if match_index is None:
+        match_index = build_match_index(bulk_match_data)
+
     # Locate all CSV files in the current_output_directory
     csv_files = glob(join(current_output_directory, "*.csv"))
     filter_filename = basename(aggregated_output_file)
@@ -463,16 +530,24 @@ def combine_stats_csv(current_output_directory, aggregated_output_file, combined
             filename = basename(csv_file)
             match_id = filename.split('.')[0]
 
+            # Look the map id up in the match index and skip matches which do
+            # not meet the criteria, without decoding the match again.
+            header = match_index.get(match_id)
+            if header is None:
+                raise ValueError(f"Match data for id {match_id} not found in bulk file.")
+            if not is_eligible(header, filters):
+                raise ValueError(f"Match {match_id} skipped: does not meet criteria ({describe_filters(filters)}).")
+            map_id = str(header.mapId)
+            if not bulk_map_data.get(map_id):
+                raise ValueError(f"Map with id {map_id} not found in bulk maps data.")
+
             # Read CSV into DataFrame.
             df = pd.read_csv(csv_file)
-            # Retrieve the match object from the bulk data to extract the map id and then lookup in bulk_map_data.
-            # This will automatically skip matches which do not meet the criteria.
-            match_obj = read_match_from_bulk(match_id, bulk_match_data, bulk_map_data)
-            map_id = str(match_obj.mapId)
             # Assume bulk_map_data[map_id] returns a dictionary with a 'name' key.
             map_name = bulk_map_data.get(map_id, {}).get("name", "Unknown Map")
             df['matchId'] = match_id
             df['mapName'] = map_name
+            df['matchDate'] = header.date
             dataframes.append(df)
         except Exception as e:
             logging.error(f"Skipping file {csv_file} due to error: {e}")
@@ -513,60 +588,11 @@ def combine_stats_csv(current_output_directory, aggregated_output_file, combined
             f.write(line + "\n")
 
 
-def individual_game_derivative_statistics(df):
-    df['Minutes'] = round(df['Time'] / 60.0, 1)
-    df.drop(columns=['Time'], inplace=True)
-    df['Pups Available'] = df['Pups'].sum()
-    df['Support'] = (df['Button'] // 5) + ((df['Block'] // 5) * 2)
-    df['Hold Against'] = df['Team'].map(lambda x: df['Hold'][df['Team'] != x].sum())
-    df['K/D'] = round(df['Tags'] / df['Pops'], 2)
-    df['Pup %'] = round((df['Pups'] / df['Pups Available']) * 100.0, 2)
-    df['Score %'] = round((df['Captures'] / df['Grabs']) * 100.0, 2)
-    df['NDPops'] = df['Pops'] - df['Drops']
-    df['NRTags'] = df['Tags'] - df['Returns']
-    df['KF'] = df['Grabs'] - (df['Drops'] + df['Captures'])
-    df['Hold/Grab'] = round(df['Hold'] / df['Grabs'], 2)
-    df['Prevent/Return'] = round(df['Prevent'] / df['Returns'], 2)
-    df['Prevent/Hold Against'] = round(df['Prevent'] / df['Hold Against'], 2)
-    df.replace([nan, inf], 0, inplace=True)
-    return df
-
-
-def advanced_derivative_statistics(df):
-    df['Flaccid %'] = round((df['Flaccids'] / df['Grabs']) * 100.0, 2)
-    df['Chain %'] = round((df['Good Handoffs'] / df['Handoffs']) * 100.0, 2)
-    df['QR %'] = round((df['Quick Returns'] / df['Returns']) * 100.0, 2)
-    df['RIB %'] = round((df['Returns in Base'] / df['Returns']) * 100.0, 2)
-    df.replace([nan, inf], 0, inplace=True)
-    return df
-
-
 def cumulative_derivative_statistics(df):
-    df['K/D'] = round(df['Tags'] / df['Pops'], 2)
-    df['Pup %'] = round((df['Pups'] / df['Pups Available']) * 100.0, 2)
-    df['Score %'] = round((df['Captures'] / df['Grabs']) * 100.0, 2)
     df['NDPops'] = df['Pops'] - df['Drops']
     df['NRTags'] = df['Tags'] - df['Returns']
     df['KF'] = df['Grabs'] - (df['Drops'] + df['Captures'])
-    df['Hold/Grab'] = round(df['Hold'] / df['Grabs'], 2)
-    df['Prevent/Return'] = round(df['Prevent'] / df['Returns'], 2)
-    df['Prevent/Hold Against'] = round(df['Prevent'] / df['Hold Against'], 2)
-    df['Flaccid %'] = round((df['Flaccids'] / df['Grabs']) * 100.0, 2)
-    df['Chain %'] = round((df['Good Handoffs'] / df['Handoffs']) * 100.0, 2)
-    df['QR %'] = round((df['Quick Returns'] / df['Returns']) * 100.0, 2)
-    df['RIB %'] = round((df['Returns in Base'] / df['Returns']) * 100.0, 2)
-    df['CD/Min'] = round(df['CD'] / df['Minutes'], 2)
-    df['Captures/Min'] = round(df['Captures'] / df['Minutes'], 2)
-    df['Grabs/Min'] = round(df['Grabs'] / df['Minutes'], 2)
-    df['Hold/Min'] = round(df['Hold'] / df['Minutes'], 2)
-    df['Drops/Min'] = round(df['Drops'] / df['Minutes'], 2)
-    df['Pops/Min'] = round(df['Pops'] / df['Minutes'], 2)
-    df['Returns/Min'] = round(df['Returns'] / df['Minutes'], 2)
-    df['Tags/Min'] = round(df['Tags'] / df['Minutes'], 2)
-    df['Prevent/Min'] = round(df['Prevent'] / df['Minutes'], 2)
-    df['Pups/Min'] = round(df['Pups'] / df['Minutes'], 2)
-    df.replace([nan, inf], 0, inplace=True)
-    return df
+    return compute_metrics(df, CUMULATIVE_METRICS)
 
 
 def name_change(name_map, file_directory):
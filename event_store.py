@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+import sys
+import numpy as np
+import pandas as pd
+
+# ─── EVENT CODES ──────────────────────────────────────────────────────────────
+# Ordered like the timeline strings they replace ('Capture Opponent flag' <
+# 'Drop Opponent flag' < 'Grab Opponent flag' < 'Return'), so sorting on
+# (time, kind) gives the same order as sorting the original event tuples.
+CAPTURE, DROP, GRAB, RETURN, GAME_ENDS = range(5)
+FLAG_EVENT_KINDS = {
+    'Capture Opponent flag': CAPTURE, 'Capture Temporary flag': CAPTURE,
+    'Drop Opponent flag': DROP, 'Drop Temporary flag': DROP,
+    'Grab Opponent flag': GRAB, 'Grab Temporary flag': GRAB,
+    'Return': RETURN,
+}
+RED, BLUE = 1, 2  # same values as tagpro_eu.constants.Team
+
+# Per-match tables, each stored as concatenated columns plus an offsets array.
+TABLES = {
+    'flag':  ['time', 'kind', 'player', 'team'],
+    'splat': ['time', 'x', 'y', 'player', 'team'],
+    'join':  ['time', 'player', 'team'],
+}
+DTYPES = {'time': np.float64, 'kind': np.int8, 'player': np.int16,
+          'team': np.int8, 'x': np.int32, 'y': np.int32}
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def to_seconds(time_obj):
+    """Match-clock seconds as produced by eu_ctf.to_seconds(str(time))."""
+    m, s = divmod(int(time_obj), 3600)
+    whole, frac = f'{s / 60:.2f}'.split('.')
+    return (m * 60) + int(whole) + (int(frac) * 10000 / 1000000)
+
+
+def _table(rows, columns):
+    rows = list(rows)
+    return {col: np.array([r[i] for r in rows], dtype=DTYPES[col])
+            for i, col in enumerate(columns)}
+
+
+class MatchEvents:
+    """
+    The normalized events of one match that the advanced statistics need:
+    flag events (grab, drop, capture, return) sorted by (time, kind), splats,
+    and join events in timeline order. Players are indices into `players`,
+    teams are RED/BLUE codes indexing `team_names` (minus one).
+    """
+
+    def __init__(self, players, team_names, duration, flag_xy, flag, splat, join):
+        self.players = list(players)
+        self.team_names = tuple(team_names)
+        self.duration = float(duration)
+        self.flag_xy = np.asarray(flag_xy, dtype=np.float64)
+        self.flag = flag
+        self.splat = splat
+        self.join = join
+
+    def first_teams(self):
+        """{player name: RED/BLUE} of the team each player joined first, in join order."""
+        teams = {}
+        for p, t in zip(self.join['player'].tolist(), self.join['team'].tolist()):
+            teams.setdefault(self.players[p], t)
+        return teams
+
+    @classmethod
+    def from_match(cls, match):
+        """
+        Decode a tagpro_eu Match (with its map attached) once into arrays.
+        """
+        players = match.players
+        player_index = {id(p): i for i, p in enumerate(players)}
+        team_names = (match.team_red.name, match.team_blue.name)
+        team_codes = {team_names[0]: RED, team_names[1]: BLUE}
+        timeline = match.create_timeline()
+
+        join = []
+        first_team = {}
+        for time, event, player in timeline:
+            if event.startswith('Join team'):
+                team = team_codes.get(event[len('Join team '):])
+                join.append((to_seconds(time), player_index[id(player)], team))
+                first_team.setdefault(player.name, team)
+
+        flag = sorted(
+            ((to_seconds(time), FLAG_EVENT_KINDS[event], player_index[id(player)],
+              first_team[player.name])
+             for time, event, player in timeline if event in FLAG_EVENT_KINDS),
+            key=lambda e: (e[0], e[1]))
+
+        splat = [(to_seconds(s.time), s.x, s.y, player_index[id(s.player)],
+                  team_codes[s.team.name])
+                 for s in match.splats]
+
+        return cls(
+            [p.name for p in players], team_names, match.duration.seconds,
+            flag_locations(match.map),
+            _table(flag, TABLES['flag']),
+            _table(splat, TABLES['splat']),
+            _table(join, TABLES['join']))
+
+
+def flag_locations(tag_map, tile_dimension=40.0):
+    """
+    Pixel centres of the (red, blue) flag tiles; the last one found wins.
+    A missing flag is reported as nan.
+    """
+    locations = {30: (np.nan, np.nan), 40: (np.nan, np.nan)}
+    for i, row in enumerate(tag_map.tiles):
+        for j, tile in enumerate(row):
+            if tile.value in locations:
+                locations[tile.value] = ((j + 0.5) * tile_dimension,
+                                         (i + 0.5) * tile_dimension)
+    return [locations[30], locations[40]]
+
+
+def save_event_store(path, records):
+    """
+    Write (match_id, MatchEvents) pairs to one columnar .npz file.
+    """
+    records = list(records)
+    out = {
+        'match_id': np.array([int(mid) for mid, _ in records], dtype=np.int64),
+        'duration': np.array([ev.duration for _, ev in records], dtype=np.float64),
+        'flag_xy': np.array([ev.flag_xy for _, ev in records],
+                            dtype=np.float64).reshape(len(records), 2, 2),
+        'team_names': np.array([ev.team_names for _, ev in records],
+                               dtype=str).reshape(len(records), 2),
+        'player_name': np.array([n for _, ev in records for n in ev.players], dtype=str),
+        'player_offset': np.cumsum([0] + [len(ev.players) for _, ev in records]),
+    }
+    for table, columns in TABLES.items():
+        parts = [getattr(ev, table) for _, ev in records]
+        out[f'{table}_offset'] = np.cumsum([0] + [len(p['time']) for p in parts])
+        for col in columns:
+            out[f'{table}_{col}'] = np.concatenate(
+                [p[col] for p in parts] or [np.empty(0, dtype=DTYPES[col])])
+    np.savez_compressed(path, **out)
+
+
+class EventStore:
+    """
+    Read side of an event store file: all columns are loaded once and each
+    match is served as slices of them, looked up by matchId.
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.data = {k: data[k] for k in data.files}
+        self.match_ids = self.data['match_id']
+        self.index = {int(mid): i for i, mid in enumerate(self.match_ids)}
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def __contains__(self, match_id):
+        return int(match_id) in self.index
+
+    def __iter__(self):
+        for mid in self.match_ids:
+            yield int(mid), self.get(mid)
+
+    def _slice(self, table, i):
+        lo, hi = self.data[f'{table}_offset'][i:i + 2]
+        return {col: self.data[f'{table}_{col}'][lo:hi] for col in TABLES[table]}
+
+    def get(self, match_id):
+        i = self.index[int(match_id)]
+        lo, hi = self.data['player_offset'][i:i + 2]
+        return MatchEvents(
+            self.data['player_name'][lo:hi].tolist(),
+            self.data['team_names'][i].tolist(),
+            self.data['duration'][i],
+            self.data['flag_xy'][i],
+            self._slice('flag', i),
+            self._slice('splat', i),
+            self._slice('join', i))
+
+
+def recompute_advanced(store_paths):
+    """
+    Re-run eu_ctf.advanced_statistics over stored events, without decoding
+    any match. Returns one frame with a matchId column.
+    """
+    from eu_ctf import advanced_statistics
+
+    frames = []
+    for path in store_paths:
+        for match_id, events in EventStore(path):
+            try:
+                df = advanced_statistics(match_id, events)
+            except ValueError as e:
+                print(f"[event_store] ✖ match {match_id} failed: {e}")
+                continue
+            df['matchId'] = match_id
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python event_store.py <events.npz> [<events.npz> ...] <output.csv>")
+        sys.exit(1)
+    *stores, output_csv = sys.argv[1:]
+    df = recompute_advanced(stores)
+    df.to_csv(output_csv, index=False)
+    print(f"[event_store] wrote {len(df)} rows from {len(stores)} store(s) → {output_csv}")
+
+
+if __name__ == "__main__":
+    main()
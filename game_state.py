@@ -0,0 +1,124 @@
+"""
+Score and possession timelines of a match, and the game-state stats built
+on them.
+
+A MatchTimeline is made from a match's already decoded MatchEvents and the
+holds eu_ctf.flag_possessions paired up, so no match is decoded again:
+the captures give the running score, and the holds who had the flag when.
+game_state_counts() credits each player with:
+
+    Caps While Tied       captures made with the score level
+    Caps While Trailing   captures made while their team was behind
+    Comeback Wins         wins after their team was behind at some point
+    Hold While Down       seconds held while their team was behind
+    Last Minute Caps      holds that ended in a capture in the last minute
+"""
+import numpy as np
+
+from event_store import CAPTURE, RED, BLUE
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+GAME_STATE_COLUMNS = ['Caps While Tied', 'Caps While Trailing', 'Comeback Wins',
+                      'Hold While Down', 'Last Minute Caps']
+GAME_STATE_ZEROS   = {**dict.fromkeys(GAME_STATE_COLUMNS, 0), 'Hold While Down': 0.0}
+LAST_MINUTE        = 60.0  # seconds before the end of the match
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class MatchTimeline:
+    """
+    Score and possession state of one match as arrays.
+
+    Score: the time, scoring team and capper of every capture in time order,
+    with `red` and `blue` the score after it; the score in force from
+    boundaries[k] is red_before[k]/blue_before[k] (k = 0 is 0-0 from the
+    start). Possession: one entry per hold, with its team, grabber, start,
+    end and end kind.
+    """
+
+    def __init__(self, match_events, possessions):
+        self.duration = match_events.duration
+
+        flag = match_events.flag
+        caps = flag['kind'] == CAPTURE
+        self.cap_time = flag['time'][caps]
+        self.cap_team = flag['team'][caps]
+        self.cap_player = flag['player'][caps]
+        self.red = np.cumsum(self.cap_team == RED, dtype=np.int16)
+        self.blue = np.cumsum(self.cap_team == BLUE, dtype=np.int16)
+
+        self.boundaries = np.concatenate(([0.0], self.cap_time))
+        self.red_before = np.concatenate(([0], self.red)).astype(np.int16)
+        self.blue_before = np.concatenate(([0], self.blue)).astype(np.int16)
+
+        holds = [(team,) + hold for team in (RED, BLUE) for hold in possessions[team]]
+        self.hold_team = np.array([h[0] for h in holds], dtype=np.int8)
+        self.hold_player = np.array([h[1] for h in holds], dtype=np.int16)
+        self.hold_start = np.array([h[2] for h in holds], dtype=np.float64)
+        self.hold_end = np.array([h[3] for h in holds], dtype=np.float64)
+        self.hold_end_kind = np.array([h[4] for h in holds], dtype=np.int8)
+
+    def lead(self, team):
+        """`team`'s score minus the other team's in each score period."""
+        diff = self.red_before.astype(np.int32) - self.blue_before
+        return diff if team == RED else -diff
+
+    def final_score(self):
+        return int(self.red_before[-1]), int(self.blue_before[-1])
+
+    def time_trailing(self, team, times):
+        """Seconds `team` had spent behind from the start until each of `times`."""
+        behind = self.lead(team) < 0
+        lengths = np.diff(self.boundaries) * behind[:-1]
+        before = np.concatenate(([0.0], np.cumsum(lengths)))
+        k = np.searchsorted(self.boundaries, times, side='right') - 1
+        return before[k] + behind[k] * (times - self.boundaries[k])
+
+
+def game_state_counts(match_events, possessions):
+    """
+    {player name: {game-state column: value}} of one match, for every player
+    with a join event; a player counts for the team they joined first.
+    """
+    players = match_events.players
+    teams = match_events.first_teams()
+    counts = {name: dict(GAME_STATE_ZEROS) for name in teams}
+    timeline = MatchTimeline(match_events, possessions)
+
+    def credit(player, column, amount=1):
+        name = players[player]
+        if name in counts:
+            counts[name][column] += amount
+
+    # Captures, by the score just before each one.
+    own = np.where(timeline.cap_team == RED, timeline.red_before[:-1], timeline.blue_before[:-1])
+    other = np.where(timeline.cap_team == RED, timeline.blue_before[:-1], timeline.red_before[:-1])
+    for player, tied, trailing in zip(timeline.cap_player.tolist(), (own == other).tolist(),
+                                      (own < other).tolist()):
+        if tied:
+            credit(player, 'Caps While Tied')
+        elif trailing:
+            credit(player, 'Caps While Trailing')
+    ended_late = (timeline.hold_end_kind == CAPTURE) & \
+                 (timeline.hold_end >= timeline.duration - LAST_MINUTE)
+    for player in timeline.hold_player[ended_late].tolist():
+        credit(player, 'Last Minute Caps')
+
+    for team in (RED, BLUE):
+        mine = timeline.hold_team == team
+        down = timeline.time_trailing(team, timeline.hold_end[mine]) - \
+               timeline.time_trailing(team, timeline.hold_start[mine])
+        for player, seconds in zip(timeline.hold_player[mine].tolist(), down.tolist()):
+            credit(player, 'Hold While Down', seconds)
+
+    red, blue = timeline.final_score()
+    if red != blue:
+        winner = RED if red > blue else BLUE
+        if (timeline.lead(winner) < 0).any():
+            for name, team in teams.items():
+                if team == winner:
+                    counts[name]['Comeback Wins'] += 1
+
+    for row in counts.values():
+        row['Hold While Down'] = round(row['Hold While Down'], 2)
+    return counts
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Splat heatmaps at tile resolution: per map (one layer per team) and per
+player on each map. Counts are binned with np.bincount/np.add.at from the
+normalized match events and accumulated into one compressed .npz per mapId,
+so new matches add into the saved arrays.
+
+    python3 heatmaps.py <mapId> [--player NAME] [--csv grid.csv] [--png heatmap.png]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from event_store import RED
+from seen_matches import SeenMatches
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR    = os.path.dirname(os.path.abspath(__file__))
+HEATMAP_DIR = os.path.join(ROOT_DIR, "heatmaps")
+TILE_SIZE   = 40  # pixels per tile
+# ────────────────────────────────────────────────────────────────────────────────
+
+_map_shapes = {}
+
+
+def map_shape(map_id, bulk_map_data):
+    """(height, width) in tiles of a bulk map, decoded once per mapId."""
+    map_id = str(map_id)
+    if map_id not in _map_shapes:
+        from tagpro_eu.map import Map as TagMap
+        tag_map = TagMap(bulk_map_data[map_id])
+        _map_shapes[map_id] = (tag_map.height, tag_map.width)
+    return _map_shapes[map_id]
+
+
+def splat_cells(x, y, shape):
+    """Flat tile index of every splat; positions off the map are clipped to its edge."""
+    height, width = shape
+    col = np.clip(np.asarray(x) // TILE_SIZE, 0, width - 1)
+    row = np.clip(np.asarray(y) // TILE_SIZE, 0, height - 1)
+    return (row * width + col).astype(np.intp)
+
+
+class MapHeatmap:
+    """
+    Splat counts on one map: `teams` (2 x height x width, red then blue, by
+    the team of the player who popped) and `players` (players x height x
+    width). The matches already counted are kept so none is added twice.
+    """
+
+    def __init__(self, map_id, shape):
+        self.map_id = str(map_id)
+        self.shape = tuple(int(s) for s in shape)
+        self.teams = np.zeros((2,) + self.shape, dtype=np.int32)
+        self.players = np.zeros((0,) + self.shape, dtype=np.int32)
+        self.names = []
+        self.index = {}
+        self.match_ids = SeenMatches()
+
+    @property
+    def total(self):
+        return self.teams.sum(axis=0)
+
+    def player(self, name):
+        """A player's heatmap (zeros if they never splatted here)."""
+        row = self.index.get(name.strip().lower())
+        return self.players[row] if row is not None else np.zeros(self.shape, dtype=np.int32)
+
+    def _rows(self, names):
+        rows = []
+        for name in names:
+            key = name.strip().lower()
+            if key not in self.index:
+                self.index[key] = len(self.names)
+                self.names.append(name)
+            rows.append(self.index[key])
+        if len(self.names) > len(self.players):
+            grown = np.zeros((max(len(self.names), 2 * len(self.players)),) + self.shape, dtype=np.int32)
+            grown[:len(self.players)] = self.players
+            self.players = grown
+        return np.array(rows, dtype=np.intp)
+
+    def add(self, match_id, events):
+        """Bin one match's splats (event_store.MatchEvents); False if already counted."""
+        match_id = int(match_id)
+        if match_id in self.match_ids:
+            return False
+        splat = events.splat
+        cells = splat_cells(splat['x'], splat['y'], self.shape)
+        size = self.shape[0] * self.shape[1]
+
+        # Team layers: one bincount over (team, cell) flattened together.
+        teams = splat['team'].astype(np.intp) - RED
+        self.teams += np.bincount(teams * size + cells, minlength=2 * size) \
+                        .reshape(self.teams.shape).astype(np.int32)
+
+        rows = self._rows(events.players)[splat['player'].astype(np.intp)]
+        np.add.at(self.players.reshape(len(self.players), size), (rows, cells), 1)
+
+        self.match_ids.add(match_id)
+        return True
+
+    def save(self, path):
+        np.savez_compressed(
+            path, shape=np.array(self.shape), teams=self.teams,
+            players=self.players[:len(self.names)], player_names=np.array(self.names, dtype=str),
+            match_ids=self.match_ids.to_array())
+
+    @classmethod
+    def load(cls, map_id, path):
+        with np.load(path) as data:
+            heatmap = cls(map_id, data['shape'])
+            heatmap.teams = data['teams']
+            heatmap.players = data['players']
+            heatmap.names = data['player_names'].tolist()
+            heatmap.match_ids = SeenMatches(data['match_ids'].tolist())
+        heatmap.index = {n.strip().lower(): i for i, n in enumerate(heatmap.names)}
+        return heatmap
+
+
+class HeatmapStore:
+    """Per-map heatmaps in a directory, loaded on first use and saved when changed."""
+
+    def __init__(self, directory=HEATMAP_DIR):
+        self.directory = directory
+        self.maps = {}
+        self.changed = set()
+
+    def path(self, map_id):
+        return os.path.join(self.directory, f"{map_id}.npz")
+
+    def get(self, map_id, shape=None):
+        map_id = str(map_id)
+        if map_id not in self.maps:
+            if os.path.isfile(self.path(map_id)):
+                self.maps[map_id] = MapHeatmap.load(map_id, self.path(map_id))
+            elif shape is not None:
+                self.maps[map_id] = MapHeatmap(map_id, shape)
+            else:
+                raise KeyError(f"No heatmap for map {map_id} in {self.directory}")
+        return self.maps[map_id]
+
+    def add(self, match_id, map_id, shape, events):
+        if self.get(map_id, shape).add(match_id, events):
+            self.changed.add(str(map_id))
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for map_id in self.changed:
+            self.maps[map_id].save(self.path(map_id))
+        self.changed.clear()
+
+
+def update_heatmaps(records, match_index, bulk_map_data, directory=HEATMAP_DIR):
+    """Add (match_id, MatchEvents) pairs to the saved heatmaps of their maps."""
+    store = HeatmapStore(directory)
+    for match_id, events in records:
+        map_id = match_index[str(match_id)].mapId
+        store.add(match_id, map_id, map_shape(map_id, bulk_map_data), events)
+    changed = len(store.changed)
+    store.save()
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a map's splat heatmap.")
+    parser.add_argument('map_id')
+    parser.add_argument('--player', help="this player's splats instead of the whole map")
+    parser.add_argument('--team', choices=['red', 'blue'], help="only splats of players on this team")
+    parser.add_argument('--dir', default=HEATMAP_DIR)
+    parser.add_argument('--csv', help="write the tile grid of counts to this CSV")
+    parser.add_argument('--png', help="render to this PNG (needs matplotlib)")
+    args = parser.parse_args()
+
+    heatmap = HeatmapStore(args.dir).get(args.map_id)
+    if args.player:
+        grid = heatmap.player(args.player)
+    elif args.team:
+        grid = heatmap.teams[0 if args.team == 'red' else 1]
+    else:
+        grid = heatmap.total
+    print(f"[heatmaps] map {args.map_id}: {heatmap.shape[1]}x{heatmap.shape[0]} tiles, "
+          f"{len(heatmap.match_ids)} matches, {int(grid.sum())} splats")
+
+    if args.csv:
+        np.savetxt(args.csv, grid, fmt='%d', delimiter=',')
+    if args.png:
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("[heatmaps] ✖ matplotlib is not installed; use --csv or pip install matplotlib")
+            sys.exit(1)
+        plt.figure(figsize=(heatmap.shape[1] / 4, heatmap.shape[0] / 4))
+        plt.imshow(grid, cmap='hot', interpolation='nearest')
+        plt.axis('off')
+        plt.savefig(args.png, bbox_inches='tight')
+
+
+if __name__ == "__main__":
+    main()
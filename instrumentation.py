@@ -0,0 +1,117 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+# Upper bounds (seconds) of the per-match extraction latency histogram buckets.
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SLOWEST_MATCHES = 10
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def _cpu_seconds():
+    """CPU time of this process and its finished children (subscripts)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class RunMetrics:
+    """
+    Stage timings, per-match extraction latencies and match counters for
+    one pipeline run, written out as JSON with write().
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+        self.counters = Counter()
+        self.latencies = []  # (match_id, seconds, status)
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall and CPU time of the block to stage `name`."""
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            entry['calls'] += 1
+            entry['wall_s'] += time.perf_counter() - wall
+            entry['cpu_s'] += _cpu_seconds() - cpu
+
+    def add_stages(self, path):
+        """Add the stage timings of another process's metrics file (see write())."""
+        with open(path) as f:
+            stages = json.load(f).get('stages', {})
+        for name, timing in stages.items():
+            entry = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            for field in entry:
+                entry[field] += timing.get(field, 0)
+
+    def record_match(self, match_id, seconds, status):
+        """Record one match's extraction latency; status is processed, filtered or failed."""
+        self.counters[status] += 1
+        self.latencies.append((str(match_id), seconds, status))
+
+    def latency_summary(self):
+        seconds = sorted(s for _, s, _ in self.latencies)
+        if not seconds:
+            return {}
+        histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        for s in seconds:
+            histogram[bisect_left(LATENCY_BUCKETS, s)] += 1
+        labels = [f"<={b:g}s" for b in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]:g}s"]
+
+        def pct(q):
+            return seconds[min(len(seconds) - 1, int(q * len(seconds)))]
+
+        return {
+            'count': len(seconds),
+            'total_s': sum(seconds),
+            'p50_s': pct(0.5),
+            'p90_s': pct(0.9),
+            'p99_s': pct(0.99),
+            'max_s': seconds[-1],
+            'histogram': dict(zip(labels, histogram)),
+            'slowest': [{'matchId': mid, 'seconds': s, 'status': status}
+                        for mid, s, status in sorted(self.latencies, key=lambda r: -r[1])[:SLOWEST_MATCHES]],
+        }
+
+    def to_dict(self):
+        return {
+            'stages': self.stages,
+            'matches': dict(self.counters),
+            'extraction_latency': self.latency_summary(),
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def profile_call(output_prefix, func, *args, **kwargs):
+    """
+    Run func under cProfile, writing `<prefix>.prof` (for pstats/snakeviz)
+    and a cumulative-time summary to `<prefix>.txt`. Returns func's result.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(output_prefix + '.prof')
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+        with open(output_prefix + '.txt', 'w') as f:
+            f.write(report.getvalue())
+
+
+# Metrics of the current run; eu_ctf and ctf_statistics record into it.
+run_metrics = RunMetrics()
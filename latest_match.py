@@ -4,41 +4,115 @@ import sys
 import json
 import requests
 import xml.etree.ElementTree as ET
-from io import BytesIO
+
+import bulk_schema
+from match_index import MATCH_INDEX_FILE, build_match_index, write_match_index
 
 # ─── CONSTANTS ────────────────────────────────────────────────────────────────
-ROOT_DIR          = os.path.dirname(os.path.abspath(__file__))
-BULK_MATCHES_FILE = os.path.join(ROOT_DIR, "bulkmatches.json")
-LATEST_MATCH_FILE = os.path.join(ROOT_DIR, "latest_match.txt")
+ROOT_DIR           = os.path.dirname(os.path.abspath(__file__))
+BULK_MATCHES_FILE  = os.path.join(ROOT_DIR, "bulkmatches.json")
+LATEST_MATCH_FILE  = os.path.join(ROOT_DIR, "latest_match.txt")
+# ETag/Last-Modified and last <loc> of every sitemap fetched, for conditional requests.
+SITEMAP_CACHE_FILE = os.path.join(ROOT_DIR, "sitemap_cache.json")
+REQUEST_TIMEOUT    = 60
+# Point at a local fake (benchmarks/fake_tagpro_eu.py) for offline testing.
+TAGPRO_EU_URL      = os.environ.get("TAGPRO_EU_URL", "https://tagpro.eu").rstrip("/")
 # ────────────────────────────────────────────────────────────────────────────────
 
-def get_last_loc_from_xml(url: str) -> str:
-    resp = requests.get(url, stream=True)
-    resp.raise_for_status()
-    last = None
-    for event, elem in ET.iterparse(BytesIO(resp.content), events=("end",)):
-        if elem.tag.endswith("loc"):
-            last = elem.text
-        elem.clear()
+def load_sitemap_cache() -> dict:
+    if os.path.exists(SITEMAP_CACHE_FILE):
+        with open(SITEMAP_CACHE_FILE) as f:
+            cache = json.load(f)
+        if cache.get("base") == TAGPRO_EU_URL:
+            return cache
+    return {"base": TAGPRO_EU_URL}
+
+def save_sitemap_cache(cache: dict) -> None:
+    tmp = SITEMAP_CACHE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, SITEMAP_CACHE_FILE)
+
+def fetch_last_loc(url: str, cache: dict) -> tuple:
+    """
+    Last <loc> of the XML at url, parsed incrementally off the response
+    stream. Requests are conditional on the ETag/Last-Modified cached for
+    url; on 304 Not Modified the cached <loc> is returned without a body.
+    Returns (loc, changed).
+    """
+    entry = cache.setdefault("urls", {}).get(url, {})
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    with requests.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as resp:
+        if resp.status_code == 304 and entry.get("loc"):
+            return entry["loc"], False
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        last = None
+        for event, elem in ET.iterparse(resp.raw, events=("end",)):
+            if elem.tag.endswith("loc"):
+                last = elem.text
+            elem.clear()
+        validators = {"etag": resp.headers.get("ETag"),
+                      "last_modified": resp.headers.get("Last-Modified")}
     if last is None:
         raise RuntimeError(f"No <loc> tags found at {url}")
-    return last
+    cache["urls"][url] = dict(validators, loc=last)
+    return last, True
+
+def get_last_loc_from_xml(url: str) -> str:
+    return fetch_last_loc(url, {})[0]
 
 def get_latest_sitemap_url() -> str:
-    idx = "https://tagpro.eu/sitemaps.xml"
+    idx = f"{TAGPRO_EU_URL}/sitemaps.xml"
     loc = get_last_loc_from_xml(idx)
     print(f"[latest_match] sitemap index → latest sitemap URL: {loc}")
     return loc
 
+def match_id_from_loc(loc: str) -> int:
+    if "?match=" not in loc:
+        raise RuntimeError("Could not find '?match=' in sitemap URL")
+    return int(loc.split("?match=")[-1])
+
 def get_latest_match_id(sitemap_url: str) -> int:
     loc = get_last_loc_from_xml(sitemap_url)
     print(f"[latest_match] latest sitemap URL → last match URL: {loc}")
-    if "?match=" not in loc:
-        raise RuntimeError("Could not find '?match=' in sitemap URL")
-    mid = int(loc.split("?match=")[-1])
+    mid = match_id_from_loc(loc)
     print(f"[latest_match] extracted latest match ID: {mid}")
     return mid
 
+def poll_latest_match_id() -> int:
+    """
+    The latest match id, using as few and as small requests as possible.
+
+    The last known sitemap is re-fetched conditionally first: if it changed
+    it is still being appended to, so it is the newest and the index is not
+    needed. Only when it is unchanged is the (conditional) index checked for
+    a newer sitemap. With nothing new, that is two 304 responses. Matches in
+    a sitemap started since the last poll show up one poll later.
+    """
+    cache = load_sitemap_cache()
+    sitemap_url = cache.get("latest_sitemap")
+    changed = False
+    if sitemap_url:
+        loc, changed = fetch_last_loc(sitemap_url, cache)
+
+    if not changed:
+        index_loc, _ = fetch_last_loc(f"{TAGPRO_EU_URL}/sitemaps.xml", cache)
+        if index_loc != sitemap_url:
+            print(f"[latest_match] sitemap index → latest sitemap URL: {index_loc}")
+            sitemap_url = cache["latest_sitemap"] = index_loc
+            loc, _ = fetch_last_loc(sitemap_url, cache)
+
+    save_sitemap_cache(cache)
+    mid = match_id_from_loc(loc)
+    print(f"[latest_match] latest match ID: {mid}")
+    return mid
+
 def read_previous_match_id() -> int:
     if not os.path.exists(LATEST_MATCH_FILE):
         print(f"[latest_match] {LATEST_MATCH_FILE} not found; nothing to do.")
@@ -54,33 +128,41 @@ def update_latest_match_file(new_id: int) -> None:
         f.write(str(nxt))
     print(f"[latest_match] {LATEST_MATCH_FILE} ← {nxt}")
 
-def download_matches(first: int, last: int) -> dict:
-    url = "https://tagpro.eu/data/"
+def download_matches_json(first: int, last: int) -> bytes:
+    """The raw bulk JSON payload of matches first..last."""
+    url = f"{TAGPRO_EU_URL}/data/"
     payload = {"bulk": "matches", "first": str(first), "last": str(last)}
     print(f"[latest_match] downloading matches {first}→{last}")
     resp = requests.get(url, params=payload)
     resp.raise_for_status()
-    return resp.json()
+    return resp.content
 
-def overwrite_bulk_matches(bulk_file: str, new_data: dict) -> None:
+def download_matches(first: int, last: int) -> dict:
+    return bulk_schema.decode_matches(download_matches_json(first, last))
+
+def overwrite_bulk_matches(bulk_file: str, payload: bytes) -> None:
     """
-    Completely replace bulk_file with new_data,
+    Completely replace bulk_file with a downloaded payload, as received,
     discarding any prior contents.
     """
-    with open(bulk_file, "w") as f:
-        json.dump(new_data, f, indent=2)
+    new_data = bulk_schema.decode_matches(payload)
+    with open(bulk_file, "wb") as f:
+        f.write(payload)
     print(f"[latest_match] overwrote {bulk_file} with {len(new_data)} matches")
 
+    # Headers only, so filtering and map lookups never need the full matches.
+    write_match_index(MATCH_INDEX_FILE, build_match_index(new_data))
+    print(f"[latest_match] wrote match index {MATCH_INDEX_FILE}")
+
 def main():
-    sitemap_url = get_latest_sitemap_url()
-    latest_id   = get_latest_match_id(sitemap_url)
+    latest_id   = poll_latest_match_id()
     prev_id     = read_previous_match_id()
     if latest_id < prev_id:
         print("[latest_match] no new matches to fetch. Exiting.")
         sys.exit(0)
 
-    new_data = download_matches(prev_id, latest_id)
-    overwrite_bulk_matches(BULK_MATCHES_FILE, new_data)
+    payload = download_matches_json(prev_id, latest_id)
+    overwrite_bulk_matches(BULK_MATCHES_FILE, payload)
     update_latest_match_file(latest_id)
 
 if __name__ == "__main__":
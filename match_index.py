@@ -0,0 +1,111 @@
+import json
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR           = os.path.dirname(os.path.abspath(__file__))
+MATCH_INDEX_FILE   = os.path.join(ROOT_DIR, "bulkmatches_index.csv")
+MATCH_FILTERS_FILE = os.path.join(ROOT_DIR, "match_filters.json")
+
+# Default eligibility: ranked-style 8 minute matches outside of groups.
+# Override any field in match_filters.json; a list value matches any of its items.
+DEFAULT_MATCH_FILTERS = {'timeLimit': 8, 'group': ''}
+# ────────────────────────────────────────────────────────────────────────────────
+
+# The match fields the pipeline needs before decoding anything.
+MatchHeader = namedtuple('MatchHeader', ['matchId', 'date', 'timeLimit', 'group',
+                                         'mapId', 'duration', 'players'])
+
+# Index columns read back as text; the others are numbers or missing.
+TEXT_FIELDS = {'matchId', 'group'}
+# A null text field in the index CSV; an empty field is the empty string
+# (a null group is not "no group", so the default filter skips it).
+NULL_TEXT   = r'\N'
+
+
+def match_header(match_id, match_data):
+    return MatchHeader(
+        str(match_id),
+        match_data.get('date'),
+        match_data.get('timeLimit'),
+        match_data.get('group', ''),
+        match_data.get('mapId'),
+        match_data.get('duration'),
+        len(match_data.get('players', ())),
+    )
+
+
+def build_match_index(bulk_match_data):
+    """{matchId: MatchHeader} for every match of a bulk matches dict."""
+    return {str(mid): match_header(mid, data) for mid, data in bulk_match_data.items()}
+
+
+def write_match_index(path, index):
+    # Object columns: ints are written as ints and None as an empty field,
+    # rather than a column with a gap becoming floats.
+    df = pd.DataFrame(list(index.values()), columns=MatchHeader._fields, dtype=object)
+    for field in TEXT_FIELDS:
+        df[field] = [NULL_TEXT if v is None else v for v in df[field]]
+    df.to_csv(path, index=False)
+
+
+def header_value(text):
+    """A numeric index field as written: '' is None, then int, float or the text itself."""
+    if text == '':
+        return None
+    for parse in (int, float):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    return text
+
+
+def load_match_index(path):
+    """
+    {matchId: MatchHeader} of an index written by write_match_index, with
+    the same values build_match_index gives.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    columns = [[None if v == NULL_TEXT else v for v in df[f]] if f in TEXT_FIELDS else
+               [header_value(v) for v in df[f]] for f in MatchHeader._fields]
+    return {h.matchId: h for h in map(MatchHeader._make, zip(*columns))}
+
+
+def load_or_build_match_index(path, bulk_match_data):
+    """
+    The index written at ingest if it covers exactly the loaded matches,
+    otherwise one built from the bulk data.
+    """
+    if os.path.isfile(path):
+        index = load_match_index(path)
+        if index.keys() == {str(mid) for mid in bulk_match_data}:
+            return index
+    return build_match_index(bulk_match_data)
+
+
+def load_match_filters(path=MATCH_FILTERS_FILE):
+    filters = dict(DEFAULT_MATCH_FILTERS)
+    if os.path.isfile(path):
+        with open(path) as f:
+            filters.update(json.load(f))
+    return filters
+
+
+def is_eligible(header, filters):
+    """True if every filtered header field equals the filter value (or is one of a list)."""
+    for field, wanted in filters.items():
+        value = getattr(header, field)
+        if isinstance(wanted, (list, tuple, set)):
+            if value not in wanted:
+                return False
+        elif value != wanted:
+            return False
+    return True
+
+
+def describe_filters(filters):
+    return ", ".join(f"{k} {'in' if isinstance(v, (list, tuple, set)) else '=='} {v!r}"
+                     for k, v in filters.items())
@@ -0,0 +1,71 @@
+from collections import namedtuple
+
+import numpy as np
+
+# A derived statistic: numerator / denominator * scale, rounded to `digits`.
+Metric = namedtuple('Metric', ['name', 'numerator', 'denominator', 'scale', 'digits'])
+
+RATE_STATS = ['CD', 'Captures', 'Grabs', 'Hold', 'Drops', 'Pops', 'Returns',
+              'Tags', 'Prevent', 'Pups']
+
+# ─── METRIC REGISTRY ──────────────────────────────────────────────────────────
+# Adding a derived statistic is one entry here; the order is the column order
+# of the stats.py outputs.
+METRICS = [Metric(f'{stat}/Min', stat, 'Minutes', 1, 2) for stat in RATE_STATS] + [
+    Metric('Win %', 'Wins', 'Games', 100, 2),
+    Metric('Pup %', 'Pups', 'Pups Available', 100, 2),
+    Metric('Score %', 'Captures', 'Grabs', 100, 2),
+    Metric('Flaccid %', 'Flaccids', 'Grabs', 100, 2),
+    Metric('Chain %', 'Good Handoffs', 'Handoffs', 100, 2),
+    Metric('QR %', 'Quick Returns', 'Returns', 100, 2),
+    Metric('RIB %', 'Returns in Base', 'Returns', 100, 2),
+    Metric('K/D', 'Tags', 'Pops', 1, 2),
+    Metric('Hold/Grab', 'Hold', 'Grabs', 1, 2),
+    Metric('Prevent/Return', 'Prevent', 'Returns', 1, 2),
+    Metric('Prevent/Hold Against', 'Prevent', 'Hold Against', 1, 2),
+]
+METRICS_BY_NAME = {m.name: m for m in METRICS}
+
+# Metrics computed for each per-match CSV (basic and advanced columns) and for
+# the aggregated run output.
+GAME_METRICS = ['K/D', 'Pup %', 'Score %', 'Hold/Grab', 'Prevent/Return', 'Prevent/Hold Against']
+ADVANCED_METRICS = ['Flaccid %', 'Chain %', 'QR %', 'RIB %']
+CUMULATIVE_METRICS = GAME_METRICS + ADVANCED_METRICS + [f'{stat}/Min' for stat in RATE_STATS]
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def derive(columns, names=None, exact=False):
+    """
+    Compute the named metrics (default: all) in one pass. `columns` maps
+    column names to equal-length arrays (a DataFrame works). Division by
+    zero, and any other non-finite result, gives 0.
+
+    With exact=True the scale and rounding are skipped, giving plain
+    fractions (stats.py leaves percentage scaling to the Excel format).
+
+    Returns {name: array} in the order of `names`.
+    """
+    metrics = [METRICS_BY_NAME[n] for n in (names or METRICS_BY_NAME)]
+    sources = list(dict.fromkeys(c for m in metrics for c in (m.numerator, m.denominator)))
+    position = {c: i for i, c in enumerate(sources)}
+    matrix = np.column_stack([np.asarray(columns[c], dtype=np.float64) for c in sources])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = (matrix[:, [position[m.numerator] for m in metrics]]
+               / matrix[:, [position[m.denominator] for m in metrics]])
+        if not exact:
+            out *= np.array([m.scale for m in metrics], dtype=np.float64)
+            for digits in {m.digits for m in metrics if m.digits is not None}:
+                cols = [i for i, m in enumerate(metrics) if m.digits == digits]
+                out[:, cols] = np.round(out[:, cols], digits)
+    out[~np.isfinite(out)] = 0
+
+    return {m.name: out[:, i] for i, m in enumerate(metrics)}
+
+
+def compute_metrics(df, names=None):
+    """
+    Return `df` with the named metric columns set; existing columns keep
+    their position and new ones are appended in `names` order.
+    """
+    return df.assign(**derive(df, names))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Koalabeast profile URLs and ranked stats, one row per player in an SQLite
+database. update_profile_stats.py commits every lookup as soon as it is
+made, so an interrupted scrape keeps everything fetched so far, and
+stats.py reads the Skill column with one join on the player name.
+
+A new database at the default path imports profiles.json and
+leaderboard.json, the files that held this data before; export writes
+them back out.
+
+    python3 player_store.py export --leaderboard leaderboard.json --profiles profiles.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR         = os.path.dirname(os.path.abspath(__file__))
+STORE_FILE       = os.path.join(ROOT_DIR, "players.db")
+PROFILES_FILE    = os.path.join(ROOT_DIR, "profiles.json")
+LEADERBOARD_FILE = os.path.join(ROOT_DIR, "leaderboard.json")
+JSON_FILES       = (PROFILES_FILE, LEADERBOARD_FILE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name          TEXT PRIMARY KEY,
+    url           TEXT,
+    tier          TEXT,
+    skill         TEXT,
+    rank          TEXT,
+    stats_fetched REAL  -- unix time of the last profile fetch
+)
+"""
+LEADERBOARD_FIELDS = ['tier', 'skill', 'rank']
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def _load_json(path):
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"[player_store] ✖ could not parse {path}; not imported")
+        return {}
+
+
+class PlayerStore:
+    """
+    One SQLite connection to the player table; every write is its own
+    transaction. A new database imports `import_from`, a (profiles,
+    leaderboard) pair of JSON paths: JSON_FILES for the default STORE_FILE,
+    nothing for any other path unless given.
+    """
+
+    def __init__(self, path=STORE_FILE, import_from=None):
+        if import_from is None and path == STORE_FILE:
+            import_from = JSON_FILES
+        new = path == ':memory:' or not os.path.exists(path)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        if path != ':memory:':
+            # Readers (stats.py) are not blocked by a scrape in progress.
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute(SCHEMA)
+        if new and import_from:
+            n = self.import_json(*import_from)
+            if n and path != ':memory:':
+                print(f"[player_store] imported {n} players from {' and '.join(import_from)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def url(self, name):
+        row = self.db.execute("SELECT url FROM players WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_url(self, name, url):
+        with self.db:
+            self.db.execute("INSERT INTO players (name, url) VALUES (?, ?) "
+                            "ON CONFLICT (name) DO UPDATE SET url = excluded.url", (name, url))
+
+    def set_stats(self, name, tier, skill, rank, fetched=None):
+        with self.db:
+            self.db.execute("INSERT INTO players (name, tier, skill, rank, stats_fetched) VALUES (?, ?, ?, ?, ?) "
+                            "ON CONFLICT (name) DO UPDATE SET tier = excluded.tier, skill = excluded.skill, "
+                            "rank = excluded.rank, stats_fetched = excluded.stats_fetched",
+                            (name, tier, skill, rank, time.time() if fetched is None else fetched))
+
+    def skills_for(self, names):
+        """The scraped skill of each name, in order (None if unknown)."""
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (pos INTEGER PRIMARY KEY, name TEXT)")
+        with self.db:
+            self.db.execute("DELETE FROM wanted")
+            self.db.executemany("INSERT INTO wanted VALUES (?, ?)", enumerate(names))
+            rows = self.db.execute("SELECT p.skill FROM wanted w LEFT JOIN players p ON p.name = w.name "
+                                   "ORDER BY w.pos").fetchall()
+        return [skill for skill, in rows]
+
+    def import_json(self, profiles_path, leaderboard_path):
+        """Add the players of profiles.json/leaderboard.json-style files in one transaction."""
+        profiles, leaderboard = _load_json(profiles_path), _load_json(leaderboard_path)
+        with self.db:
+            self.db.executemany("INSERT INTO players (name, url) VALUES (?, ?) "
+                                "ON CONFLICT (name) DO UPDATE SET url = excluded.url",
+                                ((name, entry.get('url')) for name, entry in profiles.items()))
+            self.db.executemany("INSERT INTO players (name, tier, skill, rank) VALUES (?, ?, ?, ?) "
+                                "ON CONFLICT (name) DO UPDATE SET tier = excluded.tier, "
+                                "skill = excluded.skill, rank = excluded.rank",
+                                ((name, *(entry.get(f) for f in LEADERBOARD_FIELDS))
+                                 for name, entry in leaderboard.items()))
+        return len(profiles.keys() | leaderboard.keys())
+
+    def profiles(self):
+        """{name: {'url': url}} of every player with a profile URL."""
+        return {name: {'url': url} for name, url in
+                self.db.execute("SELECT name, url FROM players WHERE url IS NOT NULL ORDER BY name")}
+
+    def leaderboard(self):
+        """{name: {'tier', 'skill', 'rank'}} of every player whose stats were fetched."""
+        return {name: dict(zip(LEADERBOARD_FIELDS, values)) for name, *values in
+                self.db.execute("SELECT name, tier, skill, rank FROM players "
+                                "WHERE tier IS NOT NULL OR skill IS NOT NULL OR rank IS NOT NULL ORDER BY name")}
+
+
+def skills_for(names, path=STORE_FILE):
+    """
+    The scraped skill of each name, from the store at `path`. Without a
+    store, leaderboard.json is read into a temporary one instead.
+    """
+    names = list(names)
+    if not os.path.exists(path):
+        if not os.path.isfile(LEADERBOARD_FILE):
+            print(f"Warning: {path} not found; Skill column will be empty.")
+            return [None] * len(names)
+        path = ':memory:'
+    with PlayerStore(path, import_from=JSON_FILES) as store:
+        return store.skills_for(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export the player store as JSON files.")
+    parser.add_argument('--store', default=STORE_FILE)
+    sub = parser.add_subparsers(dest='command', required=True)
+    for command in ('import', 'export'):
+        p = sub.add_parser(command, help=f"{command} profiles/leaderboard JSON files")
+        p.add_argument('--profiles', default=PROFILES_FILE)
+        p.add_argument('--leaderboard', default=LEADERBOARD_FILE)
+    args = parser.parse_args()
+
+    with PlayerStore(args.store) as store:
+        if args.command == 'import':
+            n = store.import_json(args.profiles, args.leaderboard)
+            print(f"[player_store] imported {n} players into {args.store}")
+            return
+        for path, data in ((args.profiles, store.profiles()), (args.leaderboard, store.leaderboard())):
+            with open(path + '.tmp', 'w') as f:
+                json.dump(data, f, indent=4)
+            os.replace(path + '.tmp', path)
+            print(f"[player_store] wrote {len(data)} players → {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Ad-hoc queries over the master CSV without regenerating the stats folders.
+
+The master is loaded once and indexed by player, map, matchId and date;
+a query picks its rows from the indexes and folds only those, so any slice
+(a player on a map, a date range, a set of matches) takes milliseconds.
+
+    python3 query.py stats --player Sniper --map Oak --from 2025-01-01
+    python3 query.py matches --player Sniper --map Oak
+    python3 query.py serve --port 8800     # GET /stats?player=Sniper&map=Oak
+"""
+import argparse
+import os
+import threading
+import time
+from functools import reduce
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import stats
+from windows import DAY_SECONDS, parse_day
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR        = os.path.dirname(os.path.abspath(__file__))
+MASTER_CSV      = os.path.join(ROOT_DIR, "combinedStatsMaster.csv")
+DEFAULT_PORT    = 8800
+SUMMARY_COLUMNS = ['Player', 'Map', 'Games', 'Wins', 'Win %', 'Minutes', 'Captures', 'Grabs',
+                   'Hold', 'Returns', 'Tags', 'Pops', 'Prevent', 'K/D', 'Score %']
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def _key(text):
+    return str(text).strip().lower()
+
+
+class StatsIndex:
+    """
+    The rows of every counted match in a master CSV (see stats.match_score),
+    with row-position indexes by player key, map, matchId and day.
+    """
+
+    def __init__(self, path=MASTER_CSV):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        df = pd.read_csv(path)
+        df = df.dropna(subset=['matchId', 'Player', 'Team']).reset_index(drop=True)
+        df['matchId'] = df['matchId'].astype(np.int64)
+
+        counted, winner, self.match_table = self._results(df)
+        df = df[counted.reindex(df['matchId']).to_numpy()].reset_index(drop=True)
+        self.df = df
+        self.match_table = self.match_table[counted]
+
+        self.keys = df['Player'].str.strip().str.lower().to_numpy(dtype=object)
+        self.sides = df['Team'].str.strip().str.lower().to_numpy(dtype=object)
+        self.wins = self.sides == winner.reindex(df['matchId']).to_numpy()
+        self.minutes = df['Minutes'].to_numpy(dtype=float)
+        self.values = df.reindex(columns=stats.raw_stats, fill_value=0).to_numpy(dtype=float)
+        self.maps = (df['mapName'] if 'mapName' in df else pd.Series('', index=df.index)).fillna('').to_numpy(dtype=object)
+
+        self.by_player = pd.Series(self.keys).groupby(self.keys).indices
+        self.by_map = {_key(m): rows for m, rows in pd.Series(self.maps).groupby(self.maps).indices.items()}
+        self.by_match = df.groupby('matchId').indices
+
+        # Rows sorted by day; a date range is two binary searches.
+        dates = df['matchDate'].to_numpy(dtype=float) if 'matchDate' in df else np.full(len(df), np.nan)
+        dated = np.flatnonzero(np.isfinite(dates))
+        days = (dates[dated] // DAY_SECONDS).astype(np.int64) if len(dated) else np.empty(0, dtype=np.int64)
+        order = np.argsort(days, kind='stable')
+        self.dated_rows, self.dated_days = dated[order], days[order]
+
+    @staticmethod
+    def _results(df):
+        """
+        Per matchId: whether stats.match_score counts it, the winning side,
+        and a table of each match's date, map and score.
+        """
+        team = df['Team'].str.strip().str.lower()
+        caps = df.groupby(['matchId', team])['Captures'].sum().unstack(fill_value=0)
+        n_teams = team.groupby(df['matchId']).nunique()
+        red = caps['red'] if 'red' in caps else pd.Series(0, index=caps.index)
+        blue = caps['blue'] if 'blue' in caps else pd.Series(0, index=caps.index)
+        diff = (red - blue).abs()
+        short = df.groupby('matchId')['Minutes'].max() < 8
+        counted = (n_teams == 2) & ~(short & (diff != 5) & (diff > 0))
+        first = df.groupby('matchId').first()
+        table = pd.DataFrame({
+            'Date': pd.to_datetime(first['matchDate'], unit='s') if 'matchDate' in first else pd.NaT,
+            'Map': first['mapName'] if 'mapName' in first else None,
+            'Red': red,
+            'Blue': blue,
+        })
+        return counted, pd.Series(np.where(red > blue, 'red', 'blue'), index=caps.index), table
+
+    def rows(self, players=None, maps=None, match_ids=None, first_day=None, last_day=None):
+        """Sorted row positions matching every given filter (lists are ORed)."""
+        empty = np.empty(0, dtype=np.intp)
+        selections = []
+        if players:
+            selections.append(np.concatenate([self.by_player.get(_key(p), empty) for p in players]))
+        if maps:
+            selections.append(np.concatenate([self.by_map.get(_key(m), empty) for m in maps]))
+        if match_ids:
+            selections.append(np.concatenate([self.by_match.get(int(m), empty) for m in match_ids]))
+        if first_day is not None or last_day is not None:
+            lo = 0 if first_day is None else np.searchsorted(self.dated_days, first_day, side='left')
+            hi = len(self.dated_days) if last_day is None else np.searchsorted(self.dated_days, last_day, side='right')
+            selections.append(self.dated_rows[lo:hi])
+        if not selections:
+            return np.arange(len(self.df))
+        return reduce(np.intersect1d, [np.unique(s) for s in selections])
+
+    def fold(self, rows):
+        """A stats accumulator over the given rows."""
+        entry = stats.new_entry()
+        entry.add(self.keys[rows], self.df['Player'].to_numpy(dtype=object)[rows], self.sides[rows],
+                  self.wins[rows], self.minutes[rows], self.values[rows])
+        return entry
+
+    def stats(self, by_map=False, **filters):
+        """Player stats over the filtered rows, like players_stats_overall.csv (per map with by_map)."""
+        rows = self.rows(**filters)
+        if not by_map:
+            return stats.build_record(self.fold(rows)).sort_values(by='Minutes', ascending=False)
+        tables = []
+        for map_name in pd.unique(self.maps[rows]):
+            df = stats.build_record(self.fold(rows[self.maps[rows] == map_name]))
+            df.insert(1, 'Map', map_name)
+            tables.append(df)
+        if not tables:
+            return stats.build_record(stats.new_entry())
+        return pd.concat(tables, ignore_index=True).sort_values(by=['Map', 'Minutes'], ascending=[True, False])
+
+    def matches(self, **filters):
+        """One line per match with a filtered row: date, map, score and the filtered players."""
+        df = self.df.iloc[self.rows(**filters)]
+        players = df.groupby('matchId', sort=False)['Player'].agg(', '.join)
+        return self.match_table.loc[players.index].assign(Players=players).reset_index()
+
+
+def filters_from(args):
+    return {
+        'players': args.player,
+        'maps': args.map,
+        'match_ids': args.match,
+        'first_day': parse_day(args.date_from) if args.date_from else None,
+        'last_day': parse_day(args.date_to) if args.date_to else None,
+    }
+
+
+def summary(df, all_columns=False):
+    return df if all_columns else df[[c for c in SUMMARY_COLUMNS if c in df]]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET /stats, /matches or /match/<id> with the CLI's filters as query parameters."""
+
+    index = None
+    reload_lock = threading.Lock()
+
+    @classmethod
+    def current_index(cls):
+        """The index, rebuilt first if the master changed; one thread rebuilds it while the others wait."""
+        if os.path.getmtime(cls.index.path) != cls.index.mtime:
+            with cls.reload_lock:
+                if os.path.getmtime(cls.index.path) != cls.index.mtime:
+                    cls.index = StatsIndex(cls.index.path)
+        return cls.index
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        index = self.current_index()
+        try:
+            filters = {
+                'players': params.get('player'),
+                'maps': params.get('map'),
+                'match_ids': params.get('match'),
+                'first_day': parse_day(params['from'][0]) if 'from' in params else None,
+                'last_day': parse_day(params['to'][0]) if 'to' in params else None,
+            }
+            if url.path == '/stats':
+                df = summary(index.stats(by_map='by' in params and params['by'][0] == 'map', **filters),
+                             'all' in params)
+            elif url.path == '/matches':
+                df = index.matches(**filters)
+            elif url.path.startswith('/match/'):
+                df = index.df.iloc[index.rows(match_ids=[url.path[len('/match/'):]])]
+            else:
+                return self.send_error(404)
+        except ValueError as e:
+            return self.send_error(400, str(e))
+
+        body = df.to_json(orient='records', date_format='iso').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        print(f"[query] {self.address_string()} {fmt % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query player stats from the master CSV.")
+    parser.add_argument('--master', default=MASTER_CSV)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('stats', "player stats over the matching rows"),
+                            ('matches', "the matches with matching rows")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('--player', action='append', help="repeatable; any of them")
+        p.add_argument('--map', action='append', help="repeatable; any of them")
+        p.add_argument('--match', action='append', type=int, metavar='MATCH_ID', help="repeatable")
+        p.add_argument('--from', dest='date_from', metavar='YYYY-MM-DD')
+        p.add_argument('--to', dest='date_to', metavar='YYYY-MM-DD')
+        p.add_argument('--csv', help="write the full result to this CSV instead of printing it")
+        if name == 'stats':
+            p.add_argument('--by-map', action='store_true', help="one row per player and map")
+            p.add_argument('--all', action='store_true', help="print every column")
+
+    p = sub.add_parser('serve', help="answer queries over HTTP on localhost")
+    p.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = StatsIndex(args.master)
+    print(f"[query] indexed {len(index.df)} rows, {len(index.by_player)} players, {len(index.by_map)} maps, "
+          f"{len(index.by_match)} matches in {time.perf_counter() - start:.2f}s")
+
+    if args.command == 'serve':
+        QueryHandler.index = index
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), QueryHandler)
+        print(f"[query] serving on http://127.0.0.1:{server.server_address[1]} (Ctrl-C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+        return
+
+    start = time.perf_counter()
+    if args.command == 'stats':
+        df = index.stats(by_map=args.by_map, **filters_from(args))
+    else:
+        df = index.matches(**filters_from(args))
+    elapsed = time.perf_counter() - start
+
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"[query] {len(df)} rows → {args.csv} ({elapsed * 1000:.1f} ms)")
+    elif df.empty:
+        print(f"[query] no rows match ({elapsed * 1000:.1f} ms)")
+    else:
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print((summary(df, args.all) if args.command == 'stats' else df).to_string(index=False))
+        print(f"[query] {len(df)} rows in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Percentile ranks and qualified top-N tables per stat.
+
+Only players with enough games qualify. Each stat's top N is found by
+partial selection (np.partition for the N-th best value, then a sort of
+just the players at or above it, ties included), so a table costs about
+one pass over the players per stat. stats.py writes both tables overall
+and per map next to the stats CSVs; thresholds come from rankings.json.
+
+    python3 rankings.py Stats/latest/players_stats_overall.csv --stat Hold/8Min --min-games 50
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR         = os.path.dirname(os.path.abspath(__file__))
+RANKINGS_FILE    = os.path.join(ROOT_DIR, "rankings.json")
+
+# Override any field in rankings.json.
+DEFAULT_RANKINGS = {'top': 10, 'min_games': 50, 'min_map_games': 10}
+
+# Stats where a lower value ranks higher, as rates (/Min, /8Min) or
+# percentages. Their raw totals grow with games played, so ranking them
+# would favour players with the fewest games: they are not ranked at all.
+LOWER_IS_BETTER  = {'Drops', 'Pops', 'Flaccids', 'Hold Against', 'Flaccid %'}
+RATE_SUFFIXES    = ('/Min', '/8Min', '%')
+
+TOP_PREFIX         = "top_"
+PERCENTILES_PREFIX = "percentiles_"
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def load_rankings(path=RANKINGS_FILE):
+    settings = dict(DEFAULT_RANKINGS)
+    if os.path.isfile(path):
+        with open(path) as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def is_rate(stat):
+    return stat.endswith(RATE_SUFFIXES)
+
+
+def lower_is_better(stat):
+    return is_rate(stat) and (stat in LOWER_IS_BETTER or stat.rsplit('/', 1)[0] in LOWER_IS_BETTER)
+
+
+def is_ranked(stat):
+    """False for the raw totals of lower-is-better stats (Drops, Pops, ...); their rates are ranked."""
+    return is_rate(stat) or stat not in LOWER_IS_BETTER
+
+
+def oriented(df, stats):
+    """(players x stats) values signed so that higher is always better."""
+    signs = np.array([-1.0 if lower_is_better(s) else 1.0 for s in stats])
+    return df[stats].to_numpy(dtype=float) * signs
+
+
+def percentile_ranks(df, stats, min_games):
+    """
+    Player, Games and, per stat, the percentage of qualified players with a
+    value no better than the player's (100 = best). Blank for players with
+    fewer than `min_games` games or no value.
+    """
+    qualified = df['Games'].to_numpy() >= min_games
+    values = oriented(df, stats)[qualified]
+    ranks = np.full((len(df), len(stats)), np.nan)
+    if len(values):
+        # NaNs sort last, so the counts below a value never include them.
+        ordered = np.sort(values, axis=0)
+        counts = (~np.isnan(values)).sum(axis=0)
+        below = np.column_stack([np.searchsorted(ordered[:, j], values[:, j], side='right')
+                                 for j in range(len(stats))])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ranks[qualified] = np.where(np.isnan(values), np.nan, below / counts * 100)
+    out = pd.DataFrame(np.round(ranks, 2), columns=stats, index=df.index)
+    out.insert(0, 'Games', df['Games'])
+    out.insert(0, 'Player', df['Player'])
+    return out
+
+
+def top_n(df, stats, n, min_games):
+    """
+    The `n` best qualified players of each stat as (Stat, Rank, Player,
+    Games, Value) rows. Players tied with the n-th share its rank and are
+    all listed.
+    """
+    qualified = df[df['Games'].to_numpy() >= min_games]
+    names = qualified['Player'].astype(str).to_numpy()
+    games = qualified['Games'].to_numpy()
+    values = oriented(qualified, stats)
+    raw = qualified[stats].to_numpy(dtype=float)
+
+    tables = []
+    for j, stat in enumerate(stats):
+        present = np.flatnonzero(~np.isnan(values[:, j]))
+        col = values[present, j]
+        if len(col) > n:
+            cutoff = np.partition(col, len(col) - n)[len(col) - n]
+            keep = col >= cutoff
+            present, col = present[keep], col[keep]
+        order = np.lexsort((names[present], -col))
+        rows, col = present[order], col[order]
+        # Competition ranking: 1 + the number of strictly better values.
+        rank = 1 + np.searchsorted(-col, -col, side='left')
+        tables.append(pd.DataFrame({'Stat': stat, 'Rank': rank, 'Player': names[rows],
+                                    'Games': games[rows], 'Value': raw[rows, j]}))
+    if not tables:
+        return pd.DataFrame(columns=['Stat', 'Rank', 'Player', 'Games', 'Value'])
+    return pd.concat(tables, ignore_index=True)
+
+
+def ranking_csv_names(suffix):
+    """(top-N, percentiles) file names of a scope: 'overall' or a stats CSV's map suffix."""
+    return f"{TOP_PREFIX}{suffix}.csv", f"{PERCENTILES_PREFIX}{suffix}.csv"
+
+
+def is_ranking_file(name):
+    return name.startswith((TOP_PREFIX, PERCENTILES_PREFIX))
+
+
+def write_rankings(out, suffix, df, stats, top, min_games):
+    """Write a scope's top-N and percentile tables into `out`."""
+    top_name, pct_name = ranking_csv_names(suffix)
+    top_n(df, stats, top, min_games).to_csv(os.path.join(out, top_name), index=False)
+    percentile_ranks(df, stats, min_games).to_csv(os.path.join(out, pct_name), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the top qualified players of stats in a stats table.")
+    parser.add_argument('stats_csv', metavar='players_stats_overall.csv')
+    parser.add_argument('--stat', required=True, action='append', help="stat column (repeatable)")
+    parser.add_argument('--min-games', type=int, default=None,
+                        help=f"games needed to qualify (default: min_games in {os.path.basename(RANKINGS_FILE)})")
+    parser.add_argument('--top', type=int, default=None)
+    args = parser.parse_args()
+
+    settings = load_rankings()
+    df = pd.read_csv(args.stats_csv)
+    missing = [s for s in args.stat if s not in df.columns]
+    if missing:
+        parser.error(f"no such column: {', '.join(missing)}")
+    table = top_n(df, args.stat,
+                  settings['top'] if args.top is None else args.top,
+                  settings['min_games'] if args.min_games is None else args.min_games)
+    print(table.to_string(index=False) if len(table) else "no qualified players")
+
+
+if __name__ == "__main__":
+    main()
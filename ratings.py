@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+from combined_schema import KEY_COLUMN, SIDE_COLUMN
+from seen_matches import SeenMatches
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR          = os.path.dirname(os.path.abspath(__file__))
+RATINGS_FILE      = os.path.join(ROOT_DIR, "ratings.json")
+
+INITIAL_RATING    = 1000.0
+K_FACTOR          = 32.0   # rating points at stake in a full game
+RATING_SCALE      = 400.0  # a 400 point gap means 10:1 expected odds
+FULL_GAME_MINUTES = 8.0
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def expected_score(rating, opponent):
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / RATING_SCALE))
+
+
+class RatingEngine:
+    """
+    Team Elo over match results. A team's rating is the minutes-weighted mean
+    of its players' ratings; after a match every player moves by
+    K * (actual - expected) scaled by their share of a full game. Ties score
+    0.5. Each match is rated once, in the order given (matchId order when
+    the master is sorted); the ids of rated matches are kept, so a match
+    older than the newest one rated is still rated. Updating with a new
+    match costs O(players in the match).
+    """
+
+    def __init__(self):
+        self.players = {}  # key -> {'name', 'rating', 'games'}
+        self.rated = SeenMatches()
+
+    def rating(self, key):
+        player = self.players.get(key)
+        return player['rating'] if player else INITIAL_RATING
+
+    def update(self, match_id, match_df, red_caps, blue_caps):
+        """
+        Rate one match given its rows and final score. Returns False (and
+        changes nothing) if this match was already rated.
+        """
+        match_id = int(match_id)
+        if match_id in self.rated:
+            return False
+
+        keys = match_df[KEY_COLUMN].tolist()
+        red = (match_df[SIDE_COLUMN] == 'red').to_numpy()
+        weights = np.clip(match_df['Minutes'].to_numpy(dtype=float) / FULL_GAME_MINUTES, 0.0, 1.0)
+        ratings = np.array([self.rating(k) for k in keys])
+        if not weights[red].sum() or not weights[~red].sum():
+            return False
+
+        red_rating = np.average(ratings[red], weights=weights[red])
+        blue_rating = np.average(ratings[~red], weights=weights[~red])
+        red_score = 1.0 if red_caps > blue_caps else 0.0 if red_caps < blue_caps else 0.5
+        delta = K_FACTOR * (red_score - expected_score(red_rating, blue_rating))
+
+        for key, name, is_red, weight, rating in zip(keys, match_df['Player'], red, weights, ratings):
+            player = self.players.setdefault(key, {'name': name, 'rating': INITIAL_RATING, 'games': 0})
+            player['rating'] = float(rating + (delta if is_red else -delta) * weight)
+            player['games'] += 1
+
+        self.rated.add(match_id)
+        return True
+
+    def ratings_for(self, names):
+        """Rating (rounded to 2 places) for each player name; None if unrated."""
+        return [round(self.players[k]['rating'], 2) if (k := str(n).strip().lower()) in self.players else None
+                for n in names]
+
+    def save(self, path=RATINGS_FILE):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'rated': self.rated.to_list(), 'players': self.players}, f, indent=1)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=RATINGS_FILE):
+        engine = cls()
+        if os.path.isfile(path):
+            with open(path) as f:
+                state = json.load(f)
+            engine.rated = SeenMatches(state['rated'])
+            engine.players = state['players']
+        return engine
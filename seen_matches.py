@@ -0,0 +1,29 @@
+"""
+The ids of the matches a running total already includes. Ratings, synergy
+and heatmaps are updated incrementally from matches that may arrive in any
+id order (chunked or unsorted masters, backfilled history), so each keeps
+every id it has counted rather than only the newest one.
+"""
+import numpy as np
+
+
+class SeenMatches:
+    """A set of int match ids, saved as a sorted list or int64 array."""
+
+    def __init__(self, ids=()):
+        self.ids = {int(i) for i in ids}
+
+    def __contains__(self, match_id):
+        return int(match_id) in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, match_id):
+        self.ids.add(int(match_id))
+
+    def to_list(self):
+        return sorted(self.ids)
+
+    def to_array(self):
+        return np.array(self.to_list(), dtype=np.int64)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Content-addressed stats snapshots.
+
+Every output file is stored once under its sha256 in Stats/objects; a run
+is a small manifest (Stats/runs/<n>.json) mapping file names to hashes, so
+tables that did not change since the last run take no extra space and are
+not rewritten. Stats/latest.json points at the newest run, and Stats/latest
+holds its files as read-only hard links.
+
+    python3 snapshots.py list
+    python3 snapshots.py checkout 12 old_stats/
+    python3 snapshots.py prune --keep 20
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+from os.path import exists, join
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+STATS_DIR   = "Stats"
+LATEST_NAME = "latest"
+HASH_CHUNK  = 1 << 20
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sources_key(files):
+    """One hash for a set of {name: hash} entries, to key files derived from them."""
+    return hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def link_or_copy(src, dst):
+    """Hard-link src to dst (replacing dst), copying where links are not supported."""
+    tmp = dst + '.tmp'
+    if exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class SnapshotStore:
+    """Objects, run manifests and the latest pointer under one Stats directory."""
+
+    def __init__(self, base=STATS_DIR):
+        self.base = base
+        self.objects = join(base, "objects")
+        self.runs = join(base, "runs")
+
+    def object_path(self, digest, name):
+        return join(self.objects, digest[:2], digest + os.path.splitext(name)[1])
+
+    def staging_dir(self):
+        """A scratch directory for a run's outputs, on the same filesystem as the objects."""
+        os.makedirs(self.base, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".staging-", dir=self.base)
+
+    def add_file(self, path, digest=None):
+        """
+        Move a file into the object store under its hash (or under `digest`)
+        and return the hash. If the object already exists the file is dropped.
+        """
+        digest = digest or file_hash(path)
+        obj = self.object_path(digest, path)
+        if exists(obj):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(path, obj)
+        return digest
+
+    def add_dir(self, directory):
+        """Store every file of a directory; returns {name: hash}."""
+        return {name: self.add_file(join(directory, name))
+                for name in sorted(os.listdir(directory)) if os.path.isfile(join(directory, name))}
+
+    def has(self, digest, name):
+        return exists(self.object_path(digest, name))
+
+    def latest(self):
+        """The newest run's manifest, or None before the first run."""
+        path = join(self.base, LATEST_NAME + ".json")
+        if not exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def manifest(self, run):
+        if run == LATEST_NAME:
+            return self.latest()
+        with open(join(self.runs, f"{int(run)}.json")) as f:
+            return json.load(f)
+
+    def list_runs(self):
+        if not exists(self.runs):
+            return []
+        return sorted(int(n[:-5]) for n in os.listdir(self.runs) if n.endswith('.json') and n[:-5].isdigit())
+
+    def commit(self, files, **info):
+        """
+        Record a run of {name: hash} files (all already stored), point
+        latest at it and refresh the Stats/latest view. Returns the manifest.
+        """
+        previous = self.latest()
+        manifest = {'run': previous['run'] + 1 if previous else 1, 'created': time.time(), 'files': files}
+        manifest.update(info)
+        os.makedirs(self.runs, exist_ok=True)
+        _write_json(join(self.runs, f"{manifest['run']}.json"), manifest)
+        _write_json(join(self.base, LATEST_NAME + ".json"), manifest)
+        self.checkout(manifest, join(self.base, LATEST_NAME), clean=True)
+        return manifest
+
+    def checkout(self, manifest, directory, clean=False):
+        """
+        Link the manifest's files into `directory`; with clean=True, also
+        remove files it does not list.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, digest in manifest['files'].items():
+            link_or_copy(self.object_path(digest, name), join(directory, name))
+        if clean:
+            for name in os.listdir(directory):
+                if name not in manifest['files']:
+                    os.remove(join(directory, name))
+
+    def prune(self, keep):
+        """Drop all but the newest `keep` runs and every object no kept run references."""
+        runs = self.list_runs()
+        for run in runs[:-keep] if keep else runs:
+            os.remove(join(self.runs, f"{run}.json"))
+        referenced = {self.object_path(d, n) for run in self.list_runs()
+                      for n, d in self.manifest(run)['files'].items()}
+        latest = self.latest()
+        if latest:
+            referenced |= {self.object_path(d, n) for n, d in latest['files'].items()}
+        removed = 0
+        for root, _, names in os.walk(self.objects):
+            for name in names:
+                if join(root, name) not in referenced:
+                    os.remove(join(root, name))
+                    removed += 1
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and manage stats snapshots.")
+    parser.add_argument('--base', default=STATS_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="list runs and how many of their files changed")
+    p = sub.add_parser('checkout', help="materialize a run's files into a directory")
+    p.add_argument('run', help=f"run number or '{LATEST_NAME}'")
+    p.add_argument('directory')
+    p = sub.add_parser('prune', help="delete old runs and unreferenced objects")
+    p.add_argument('--keep', type=int, required=True, help="newest runs to keep")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.base)
+    if args.command == 'list':
+        previous = {}
+        for run in store.list_runs():
+            manifest = store.manifest(run)
+            changed = sum(previous.get(n) != d for n, d in manifest['files'].items())
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(manifest['created']))
+            print(f"[snapshots] run {run}  {created}  {len(manifest['files'])} files, {changed} changed")
+            previous = manifest['files']
+    elif args.command == 'checkout':
+        manifest = store.manifest(args.run)
+        store.checkout(manifest, args.directory)
+        print(f"[snapshots] run {manifest['run']} → {args.directory}")
+    else:
+        removed = store.prune(args.keep)
+        print(f"[snapshots] kept {min(args.keep, len(store.list_runs()))} runs, removed {removed} objects")
+
+
+if __name__ == "__main__":
+    main()
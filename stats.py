@@ -1,25 +1,26 @@
-import sys
+import argparse
 import pandas as pd
 import os
 import re
-import json
+import shutil
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from openpyxl.utils import get_column_letter
 
-# Check for input CSV argument
-if len(sys.argv) < 2:
-    print("Usage: python stats.py <combinedStatsMaster.csv>")
-    sys.exit(1)
-INPUT_CSV = sys.argv[1]
+from accumulator import StatAccumulator
+from combined_schema import KEY_COLUMN, SIDE_COLUMN, apply_schema, read_combined
+from instrumentation import run_metrics
+from metrics import METRICS, derive
+from player_store import skills_for
+from rankings import is_ranked, is_ranking_file, load_rankings, write_rankings
+from ratings import RatingEngine, RATINGS_FILE
+from snapshots import LATEST_NAME, STATS_DIR, SnapshotStore, sources_key
 
-# Set root directory and load leaderboard
+# Set root directory
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-LEADERBOARD_FILE = os.path.join(ROOT_DIR, 'leaderboard.json')
-if os.path.isfile(LEADERBOARD_FILE):
-    with open(LEADERBOARD_FILE, 'r') as f:
-        leaderboard = json.load(f)
-else:
-    leaderboard = {}
-    print(f"Warning: {LEADERBOARD_FILE} not found; Skill column will be empty.")
+WORKBOOK_NAME = 'combined_stats.xlsx'
+# Accumulator keys of a map's Red/Blue team rows, by side
+TEAM_KEYS = {'red': 'red_team', 'blue': 'blue_team'}
 
 # Define raw and derived statistics
 raw_stats = [
@@ -29,107 +30,107 @@ raw_stats = [
     'Quick Returns', 'Key Returns', 'Returns in Base', 'NDPops', 'NRTags', 'KF', 'CD'
 ]
 
-derived_stats = {
-    'CD/Min': ('CD', 'Minutes'), 'Caps/Min': ('Captures', 'Minutes'),
-    'Grabs/Min': ('Grabs', 'Minutes'), 'Hold/Min': ('Hold', 'Minutes'),
-    'Drops/Min': ('Drops', 'Minutes'), 'Pops/Min': ('Pops', 'Minutes'),
-    'Returns/Min': ('Returns', 'Minutes'), 'Tags/Min': ('Tags', 'Minutes'),
-    'Prevent/Min': ('Prevent', 'Minutes'), 'Pups/Min': ('Pups', 'Minutes'),
-    'Win %': ('Wins', 'Games'), 'Pup %': ('Pups', 'Pups Available'),
-    'Score %': ('Captures', 'Grabs'), 'Flaccid %': ('Flaccids', 'Grabs'),
-    'Chain %': ('Good Handoffs', 'Handoffs'), 'QR %': ('Quick Returns', 'Returns'),
-    'RIB %': ('Returns in Base', 'Returns'), 'K/D': ('Tags', 'Pops'),
-    'Hold/Grab': ('Hold', 'Grabs'), 'Prevent/Return': ('Prevent', 'Returns'),
-    'Prevent/Hold Against': ('Prevent', 'Hold Against')
-}
+derived_stats = [m.name for m in METRICS]
+
+# Columns that get percentile ranks and top-N tables
+ranked_stats = [s for s in raw_stats + derived_stats + [f"{stat}/8Min" for stat in raw_stats] if is_ranked(s)]
+
+# Master CSV columns the stats are built from; the stored derived stats are recomputed
+master_columns = ['matchId', 'matchDate', 'mapName', 'Player', 'Team', 'Minutes'] + raw_stats
 
 # Helper functions
-def new_entry(name):
-    return {
-        'Name': name,
-        'Games': 0,
-        'RedGames': 0,
-        'BlueGames': 0,
-        'Wins': 0,
-        'Losses': 0,
-        'RedWins': 0,
-        'BlueWins': 0,
-        'Minutes': 0,
-        'Totals': {stat: 0 for stat in raw_stats}
-    }
+def new_entry():
+    return StatAccumulator(raw_stats)
 
-def update_entry(entry, row, caps_for, caps_against, result, winner_color):
-    tc = row.get('Team', '').strip().lower()
-    entry['Games'] += 1
-    if tc == 'red':
-        entry['RedGames'] += 1
-    elif tc == 'blue':
-        entry['BlueGames'] += 1
-    entry['Minutes'] += float(row.get('Minutes', 0))
-    for stat in raw_stats:
-        entry['Totals'][stat] += float(row.get(stat, 0))
-    if result == 'win':
-        entry['Wins'] += 1
-        if tc == 'red':
-            entry['RedWins'] += 1
-        elif tc == 'blue':
-            entry['BlueWins'] += 1
-    else:
-        entry['Losses'] += 1
+def update_entry(entry, match_df, keys, names, winner):
+    sides = match_df[SIDE_COLUMN].to_numpy(dtype=object)
+    values = match_df.reindex(columns=raw_stats, fill_value=0).to_numpy(dtype=float)
+    entry.add(keys, names, sides, sides == winner,
+              match_df['Minutes'].to_numpy(dtype=float), values)
 
 def compute_derived(entry):
-    dv = {}
-    for label, (num_key, den_key) in derived_stats.items():
-        num = entry['Totals'].get(num_key, entry.get(num_key, 0))
-        den = entry['Totals'].get(den_key, entry.get(den_key, 0))
-        dv[label] = num / den if den else 0
-    minutes = entry['Minutes']
+    columns = dict(zip(raw_stats, entry.totals.T))
+    columns.update(Minutes=entry.minutes, Wins=entry.counter('Wins'),
+                   Games=entry.counter('Games'))
+    dv = derive(columns, derived_stats, exact=True)
+    minutes = entry.minutes
     for stat in raw_stats:
-        total = entry['Totals'][stat]
-        dv[f"{stat}/8Min"] = total / (minutes / 8) if minutes else 0
+        dv[f"{stat}/8Min"] = safe_divide(columns[stat], minutes / 8, minutes)
     return dv
 
+def safe_divide(num, den, guard=None):
+    """num / den elementwise, 0 wherever `guard` (default: den) is zero."""
+    guard = den if guard is None else guard
+    out = np.zeros(len(num))
+    np.divide(num, den, out=out, where=guard != 0)
+    return out
+
 def build_record(entry):
+    games = entry.counter('Games')
+    wins = entry.counter('Wins')
+    red_games = entry.counter('RedGames')
+    blue_games = entry.counter('BlueGames')
     rec = {
-        'Player': entry['Name'],
-        'Minutes': entry['Minutes'],
-        'Games': entry['Games'],
-        'Wins': entry['Wins'],
-        'Losses': entry['Losses'],
-        'Red Games': entry['RedGames'],
-        'Blue Games': entry['BlueGames'],
-        'Red Win %': entry['RedWins'] / entry['RedGames'] if entry['RedGames'] else 0,
-        'Blue Win %': entry['BlueWins'] / entry['BlueGames'] if entry['BlueGames'] else 0
+        'Player': entry.names,
+        'Minutes': entry.minutes,
+        'Games': games,
+        'Wins': wins,
+        'Losses': games - wins,
+        'Red Games': red_games,
+        'Blue Games': blue_games,
+        'Red Win %': safe_divide(entry.counter('RedWins'), red_games),
+        'Blue Win %': safe_divide(entry.counter('BlueWins'), blue_games)
     }
-    for stat in raw_stats:
-        rec[stat] = entry['Totals'][stat]
+    rec.update(zip(raw_stats, entry.totals.T))
     rec.update(compute_derived(entry))
-    return rec
+    return pd.DataFrame(rec)
 
-# Load and clean data
-df = pd.read_csv(INPUT_CSV)
-df.dropna(subset=['matchId', 'Player', 'Team'], inplace=True)
+def iter_matches(path, chunksize=None):
+    """
+    Yield (matchId, rows) for every match in the master CSV, read with the
+    combined_schema dtypes (only the columns the stats are built from).
 
-# Aggregate matches by matchId
-matches = df.groupby('matchId')
+    Without a chunksize the whole file is loaded and grouped by matchId in
+    sorted order. With one, the file is read `chunksize` rows at a time and
+    matches are yielded in file order; the rows of the last match in each
+    chunk are carried into the next one, so a match split across a chunk
+    boundary is still yielded whole. This relies on a match's rows being
+    contiguous, which holds for a master built by appending run outputs.
+    """
+    if not chunksize:
+        df = read_combined(path, master_columns)
+        df.dropna(subset=['matchId', 'Player', 'Team'], inplace=True)
+        yield from df.groupby('matchId')
+        return
 
-# Process statistics
-overall, per_map, map_results = {}, {}, {}
-counted_map_games = set()
+    # Chunks are typed after the carried rows are joined, so the categoricals
+    # of one match never come from two chunks.
+    carry = None
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=lambda c: c in master_columns):
+        chunk = chunk.dropna(subset=['matchId', 'Player', 'Team'])
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        tail = chunk['matchId'] == chunk['matchId'].iloc[-1]
+        carry = chunk[tail]
+        yield from apply_schema(chunk[~tail]).groupby('matchId', sort=False)
+    if carry is not None and not carry.empty:
+        yield from apply_schema(carry).groupby('matchId', sort=False)
 
-for match_id, match_df in matches:
+def match_score(match_df):
+    """
+    (red caps, blue caps) summed from a match's rows, or None if the match
+    is not counted: it does not have exactly two teams, or it ended early
+    (highest individual minutes < 8) without a mercy (cap difference 5) or
+    a tie. Rows are in the combined_schema layout.
+    """
     # Build true summed captures per team
-    team_caps = (
-        match_df
-          .assign(team=match_df['Team'].str.strip().str.lower())
-          .groupby('team')['Captures']
-          .sum()
-          .to_dict()
-    )
+    team_caps = match_df.groupby(SIDE_COLUMN, observed=True)['Captures'].sum().to_dict()
 
     # Skip if not exactly two teams
     if len(team_caps) != 2:
-        continue
+        return None
 
     red_caps = team_caps.get('red', 0)
     blue_caps = team_caps.get('blue', 0)
@@ -138,133 +139,237 @@ for match_id, match_df in matches:
     # Skip if highest individual minutes < 8 AND cap difference < 5 and not a tie
     max_minutes = match_df['Minutes'].max()
     if max_minutes < 8 and abs(red_caps - blue_caps) != 5 and abs(red_caps - blue_caps) > 0 :
-        continue
+        return None
+
+    return red_caps, blue_caps
+
+def fold_match(match_id, match_df, overall, per_map, map_results, ratings=None):
+    """Fold one match into the overall, per-map and map-result totals (and ratings)."""
+    score = match_score(match_df)
+    if score is None:
+        return
+    red_caps, blue_caps = score
 
     winner = 'red' if red_caps > blue_caps else 'blue'
 
+    if ratings is not None:
+        ratings.update(match_id, match_df, red_caps, blue_caps)
+
     # Map-level results
     map_name = match_df['mapName'].dropna().iloc[0] if 'mapName' in match_df else None
-    if map_name and (match_id, map_name) not in counted_map_games:
+    if map_name:
         mr = map_results.setdefault(map_name, {'Games': 0, 'RedWins': 0, 'BlueWins': 0})
         mr['Games'] += 1
         if winner == 'red':
             mr['RedWins'] += 1
         else:
             mr['BlueWins'] += 1
-        counted_map_games.add((match_id, map_name))
 
     # Per-player and per-map accumulation
-    for _, row in match_df.iterrows():
-        key = row['Player'].strip().lower()
-        overall.setdefault(key, new_entry(row['Player']))
-        res = 'win' if row['Team'].strip().lower() == winner else 'loss'
-        update_entry(overall[key], row,
-                     caps_for=row['Captures'],
-                     caps_against=team_caps[row['Team'].strip().lower()],
-                     result=res,
-                     winner_color=winner)
-
-        if map_name:
-            per_map.setdefault(map_name, {})
-            per_map[map_name].setdefault(key, new_entry(row['Player']))
-            update_entry(per_map[map_name][key], row,
-                         caps_for=row['Captures'],
-                         caps_against=team_caps[row['Team'].strip().lower()],
-                         result=res,
-                         winner_color=winner)
-            team_key = f"{row['Team'].strip().lower()}_team"
-            per_map[map_name].setdefault(team_key, new_entry(row['Team'].capitalize()))
-            update_entry(per_map[map_name][team_key], row,
-                         caps_for=row['Captures'],
-                         caps_against=team_caps[row['Team'].strip().lower()],
-                         result=res,
-                         winner_color=winner)
-
-# Build DataFrames
-overall_df = pd.DataFrame([build_record(e) for e in overall.values()]) \
-                 .sort_values(by='Minutes', ascending=False)
-overall_df.insert(1, 'Skill', overall_df['Player'].map(lambda n: leaderboard.get(n, {}).get('skill', None)))
-
-mr_df = pd.DataFrame([
-    {
-        'Map': m,
-        'Games': v['Games'],
-        'RedWins': v['RedWins'],
-        'BlueWins': v['BlueWins'],
-        'Red Win %': v['RedWins'] / v['Games'],
-        'Blue Win %': v['BlueWins'] / v['Games']
-    }
-    for m, v in map_results.items()
-])
-
-per_csvs = []
-for m, mp in per_map.items():
-    dfm = pd.DataFrame([build_record(e) for e in mp.values()]) \
-              .sort_values(by='Minutes', ascending=False)
-    fn = f"stats_{m.replace(' ', '_').replace('/', '_')[:31]}.csv"
-    per_csvs.append((fn, dfm))
-
-# Create output directory
-base = 'Stats'
-os.makedirs(base, exist_ok=True)
-existing = [
-    int(match.group(1))
-    for d in os.listdir(base)
-    if (match := re.match(r'^Stats\((\d+)\)$', d)) and os.path.isdir(os.path.join(base, d))
-]
-idx = max(existing) + 1 if existing else 1
-out = os.path.join(base, f"Stats({idx})")
-os.makedirs(out)
-
-# Save CSVs
-overall_df.to_csv(os.path.join(out, 'players_stats_overall.csv'), index=False)
-mr_df.to_csv(os.path.join(out, 'map_results.csv'), index=False)
-for fn, dfm in per_csvs:
+    names = match_df['Player'].tolist()
+    keys = match_df[KEY_COLUMN].tolist()
+    update_entry(overall, match_df, keys, names, winner)
+
+    if map_name:
+        # Player and team rows share one accumulator per map, interleaved so
+        # entries keep their first-seen order.
+        team_keys = [TEAM_KEYS[side] for side in match_df[SIDE_COLUMN]]
+        team_names = match_df['Team'].str.capitalize().tolist()
+        paired = match_df.iloc[np.arange(len(match_df)).repeat(2)]
+        per_map.setdefault(map_name, new_entry())
+        update_entry(per_map[map_name], paired,
+                     [k for pair in zip(keys, team_keys) for k in pair],
+                     [n for pair in zip(names, team_names) for n in pair],
+                     winner)
+
+def map_csv_name(map_name):
+    return f"stats_{map_name.replace(' ', '_').replace('/', '_')[:31]}.csv"
+
+def column_formats(df):
+    """(width, number format or None) for every column of a sheet."""
+    pct_cols = [c for c in derived_stats if '%' in c] + ['Red Win %', 'Blue Win %']
+    dec_cols = [c for c in derived_stats if '%' not in c] + ['Minutes'] \
+               + [c for c in df.columns if c.endswith('/8Min')]
+
+    formats = []
+    for col in df.columns:
+        values = df[col].fillna('')
+        widths = [len(col)] + [
+            len(f"{val:.2%}") if col in pct_cols else
+            len(f"{val:.2f}") if col in dec_cols else
+            len(str(val))
+            for val in values
+        ]
+        fmt = '0.00%' if col in pct_cols else '0.00' if col in dec_cols else None
+        formats.append((max(widths) + 2, fmt))
+    return formats
+
+def build_map_table(out, map_name, entry, rankings):
+    """
+    Build, sort and write one map's stats CSV and ranking tables, and work
+    out its sheet formats. Maps are independent, so this runs in a worker
+    process.
+    """
+    record = build_record(entry)
+    dfm = record.sort_values(by='Minutes', ascending=False)
+    fn = map_csv_name(map_name)
     dfm.to_csv(os.path.join(out, fn), index=False)
 
-# Generate Excel workbook
-excel_path = os.path.join(out, 'combined_stats.xlsx')
-with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-    overall_df.to_excel(writer, sheet_name='OverallPlayers', index=False)
-    mr_df.to_excel(writer, sheet_name='MapResults', index=False)
-    for fn, dfm in per_csvs:
-        raw = fn[:-4][:31]
-        sheet = re.sub(r'[:\\\/?*\[\]]', '', raw)
-        orig, i = sheet, 1
-        while sheet in writer.sheets:
-            sheet = (orig + f"_{i}")[:31]
-            i += 1
-        dfm.to_excel(writer, sheet_name=sheet, index=False)
-
-    # Adjust column widths & formats
-    for name, ws in writer.sheets.items():
-        df_ref = (
-            overall_df if name == 'OverallPlayers' else
-            mr_df if name == 'MapResults' else
-            next((df for fn, df in per_csvs
-                  if name.startswith(re.sub(r'[:\\\/?*\[\]]', '', fn[:-4][:31]))), None)
-        )
-        if df_ref is None:
-            continue
+    # Rank players only, not the map's Red/Blue team rows.
+    team_rows = [entry.index[key] for key in TEAM_KEYS.values() if key in entry.index]
+    write_rankings(out, fn[len('stats_'):-4], record.drop(index=team_rows), ranked_stats,
+                   rankings['top'], rankings['min_map_games'])
+    return fn, dfm, column_formats(dfm)
+
+def write_workbook(excel_path, sheets):
+    """Write (sheet name, DataFrame, column formats) triples to one workbook."""
+    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
+        for raw, df_ref, formats in sheets:
+            sheet = re.sub(r'[:\\\/?*\[\]]', '', raw[:31])
+            orig, i = sheet, 1
+            while sheet in writer.sheets:
+                sheet = (orig + f"_{i}")[:31]
+                i += 1
+            df_ref.to_excel(writer, sheet_name=sheet, index=False)
+
+            # Adjust column widths & formats
+            ws = writer.sheets[sheet]
+            for idx_col, (width, fmt) in enumerate(formats, start=1):
+                ws.column_dimensions[get_column_letter(idx_col)].width = width
+                if fmt:
+                    for cell in ws[get_column_letter(idx_col)]:
+                        cell.number_format = fmt
+
+            ws.freeze_panes = 'B2'
+
+def write_stats(out, overall, per_map, map_results, workers=1, maps=None, excel=True, ratings=None,
+                rankings=None):
+    """
+    Write the overall, map-result and per-map CSVs (and, with excel=True,
+    the workbook) for folded totals into `out`, each stats table with its
+    top-N and percentile tables. `maps` limits the per-map tables rewritten
+    to those maps (default: all of them). With a RatingEngine, the overall
+    table gets a Rating column after Skill. `rankings` holds the top-N and
+    minimum games settings (default: rankings.json).
+    Returns the workbook's (sheet name, DataFrame, formats) sheets.
+    """
+    rankings = rankings or load_rankings()
+
+    # Per-map tables are independent: build and write them in a worker pool
+    # while the overall table is built here.
+    jobs = [(out, m, per_map[m], rankings) for m in (per_map if maps is None else maps)]
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+    per_map_tables = pool.map(build_map_table, *zip(*jobs)) if pool and jobs else \
+                     (build_map_table(*job) for job in jobs)
+
+    # Build DataFrames
+    overall_record = build_record(overall)
+    write_rankings(out, 'overall', overall_record, ranked_stats, rankings['top'], rankings['min_games'])
+    overall_df = overall_record.sort_values(by='Minutes', ascending=False)
+    overall_df.insert(1, 'Skill', skills_for(overall_df['Player']))
+    if ratings is not None:
+        overall_df.insert(2, 'Rating', ratings.ratings_for(overall_df['Player']))
+
+    mr_df = pd.DataFrame([
+        {
+            'Map': m,
+            'Games': v['Games'],
+            'RedWins': v['RedWins'],
+            'BlueWins': v['BlueWins'],
+            'Red Win %': v['RedWins'] / v['Games'],
+            'Blue Win %': v['BlueWins'] / v['Games']
+        }
+        for m, v in map_results.items()
+    ])
+
+    # Save CSVs
+    overall_df.to_csv(os.path.join(out, 'players_stats_overall.csv'), index=False)
+    mr_df.to_csv(os.path.join(out, 'map_results.csv'), index=False)
+
+    sheets = [('OverallPlayers', overall_df, column_formats(overall_df)),
+              ('MapResults', mr_df, column_formats(mr_df))]
+    sheets += [(fn[:-4], dfm, formats) for fn, dfm, formats in per_map_tables]
+    if pool:
+        pool.shutdown()
+
+    # Generate Excel workbook
+    if excel:
+        with run_metrics.stage('stats.excel_export'):
+            write_workbook(os.path.join(out, WORKBOOK_NAME), sheets)
+    return sheets
+
+def write_snapshot(overall, per_map, map_results, base=STATS_DIR, workers=1, ratings=None, rankings=None,
+                   **info):
+    """
+    Write the stats of folded totals as a new run of the snapshot store at
+    `base`. Tables identical to an earlier run's are not stored again, and
+    the workbook is only rebuilt when one of the tables it is made from
+    changed. Returns (manifest, number of files changed since the last run).
+    """
+    store = SnapshotStore(base)
+    staging = store.staging_dir()
+    try:
+        sheets = write_stats(staging, overall, per_map, map_results, workers, excel=False, ratings=ratings,
+                             rankings=rankings)
+        files = store.add_dir(staging)
+        workbook_key = sources_key({n: d for n, d in files.items() if not is_ranking_file(n)})
+        if not store.has(workbook_key, WORKBOOK_NAME):
+            with run_metrics.stage('stats.excel_export'):
+                write_workbook(os.path.join(staging, WORKBOOK_NAME), sheets)
+            store.add_file(os.path.join(staging, WORKBOOK_NAME), workbook_key)
+        files[WORKBOOK_NAME] = workbook_key
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    previous = store.latest()
+    manifest = store.commit(files, **info)
+    changed = sum(not previous or previous['files'].get(n) != d for n, d in files.items())
+    return manifest, changed
+
+def add_ranking_arguments(parser):
+    parser.add_argument('--top', type=int, help="players per stat in the top-N tables (default: rankings.json)")
+    parser.add_argument('--min-games', type=int, help="games to qualify for the overall rankings")
+    parser.add_argument('--min-map-games', type=int, help="games on a map to qualify for its rankings")
+
+def rankings_from_args(args):
+    """rankings.json settings with the ones given on the command line in their place."""
+    rankings = load_rankings()
+    rankings.update({k: v for k, v in (('top', args.top), ('min_games', args.min_games),
+                                       ('min_map_games', args.min_map_games)) if v is not None})
+    return rankings
+
+def main():
+    parser = argparse.ArgumentParser(description="Build overall and per-map stats from the combined master CSV.")
+    parser.add_argument('input_csv', metavar='combinedStatsMaster.csv')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="stream the master CSV in chunks of this many rows instead of loading it whole")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="processes for building and writing the per-map tables (default: all cores)")
+    parser.add_argument('--ratings', default=RATINGS_FILE,
+                        help="rating state file; matches not yet rated in it are rated and it is updated")
+    parser.add_argument('--out', default=STATS_DIR, help="snapshot store for the generated stats")
+    add_ranking_arguments(parser)
+    parser.add_argument('--metrics', metavar='PATH', help="write the stage timings of this run as JSON to PATH")
+    args = parser.parse_args()
+
+    rankings = rankings_from_args(args)
+
+    # Process statistics
+    overall, per_map, map_results = new_entry(), {}, {}
+    ratings = RatingEngine.load(args.ratings)
+    with run_metrics.stage('stats.fold'):
+        for match_id, match_df in iter_matches(args.input_csv, args.chunksize):
+            fold_match(match_id, match_df, overall, per_map, map_results, ratings)
+    ratings.save(args.ratings)
+
+    with run_metrics.stage('stats.write'):
+        manifest, changed = write_snapshot(overall, per_map, map_results, args.out, args.workers, ratings,
+                                           rankings, input=os.path.abspath(args.input_csv),
+                                           input_bytes=os.path.getsize(args.input_csv))
+    print(f"Generated stats run {manifest['run']} ({changed} of {len(manifest['files'])} files changed) "
+          f"in {os.path.join(args.out, LATEST_NAME)}")
+    if args.metrics:
+        run_metrics.write(args.metrics)
 
-        pct_cols = [c for c in derived_stats if '%' in c] + ['Red Win %', 'Blue Win %']
-        dec_cols = [c for c in derived_stats if '%' not in c] + ['Minutes'] \
-                   + [c for c in df_ref.columns if c.endswith('/8Min')]
-
-        for idx_col, col in enumerate(df_ref.columns, start=1):
-            values = df_ref[col].fillna('')
-            widths = [len(col)] + [
-                len(f"{val:.2%}") if col in pct_cols else
-                len(f"{val:.2f}") if col in dec_cols else
-                len(str(val))
-                for val in values
-            ]
-            ws.column_dimensions[get_column_letter(idx_col)].width = max(widths) + 2
-            fmt = '0.00%' if col in pct_cols else '0.00' if col in dec_cols else None
-            if fmt:
-                for cell in ws[get_column_letter(idx_col)]:
-                    cell.number_format = fmt
-
-        ws.freeze_panes = 'B2'
-
-print(f"Generated sorted stats and Excel workbook in {out}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Teammate and opponent synergy: games, wins and summed cap differential for
+every pair of players who shared a match, kept as sparse pair matrices and
+exported as top-N partner and nemesis tables per player.
+
+    python3 synergy.py combinedStatsMaster.csv --top 5 --min-games 10
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from combined_schema import KEY_COLUMN, SIDE_COLUMN
+from seen_matches import SeenMatches
+from stats import iter_matches, match_score
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR      = os.path.dirname(os.path.abspath(__file__))
+SYNERGY_FILE  = os.path.join(ROOT_DIR, "synergy.npz")
+SYNERGY_DIR   = os.path.join("Stats", "Synergy")
+FLUSH_ROWS    = 1 << 20  # pending pair rows merged into the matrix at once
+# ────────────────────────────────────────────────────────────────────────────────
+
+FIELDS = ['Games', 'Wins', 'CD']
+
+
+class PairMatrix:
+    """
+    Sparse players × players totals of FIELDS. Entries are kept as sorted
+    int64 codes (row << 32 | col) with a value row each, so memory grows with
+    the pairs actually seen rather than with the square of the players.
+    New entries are buffered and merged in batches.
+    """
+
+    def __init__(self, codes=None, values=None):
+        self.codes = np.empty(0, dtype=np.int64) if codes is None else codes
+        self.values = np.empty((0, len(FIELDS))) if values is None else values
+        self._pending = []
+        self._pending_rows = 0
+
+    def add(self, rows, cols, values):
+        self._pending.append(((rows.astype(np.int64) << 32) | cols, values))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= FLUSH_ROWS:
+            self.compact()
+
+    def compact(self):
+        if not self._pending:
+            return
+        codes = np.concatenate([self.codes] + [c for c, _ in self._pending])
+        values = np.concatenate([self.values] + [v for _, v in self._pending])
+        self.codes, inverse = np.unique(codes, return_inverse=True)
+        self.values = np.zeros((len(self.codes), len(FIELDS)))
+        np.add.at(self.values, inverse, values)
+        self._pending, self._pending_rows = [], 0
+
+    def entries(self):
+        """(rows, cols, values) of every stored pair, sorted by row then col."""
+        self.compact()
+        return self.codes >> 32, self.codes & 0xFFFFFFFF, self.values
+
+
+class SynergyEngine:
+    """
+    Ordered pair totals per match: `together[i, j]` for i and j on the same
+    team, `against[i, j]` for j on the other team. Wins and CD are from i's
+    side. Each match is folded once, whatever order the ids come in (the
+    folded ids are kept), so updating with a new match costs
+    O(players in the match²).
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.names = []
+        self.together = PairMatrix()
+        self.against = PairMatrix()
+        self.folded = SeenMatches()
+
+    def _player(self, key, name):
+        i = self.index.get(key)
+        if i is None:
+            i = self.index[key] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def update(self, match_id, match_df, red_caps, blue_caps):
+        """Fold one match; False if it was already folded."""
+        match_id = int(match_id)
+        if match_id in self.folded:
+            return False
+
+        players = np.array([self._player(k, n) for k, n in
+                            zip(match_df[KEY_COLUMN], match_df['Player'])])
+        red = (match_df[SIDE_COLUMN] == 'red').to_numpy()
+
+        for side, other, cd in ((red, ~red, red_caps - blue_caps), (~red, red, blue_caps - red_caps)):
+            team, opponents = players[side], players[other]
+            result = np.array([1.0, float(cd > 0), float(cd)])
+
+            rows, cols = np.meshgrid(team, team, indexing='ij')
+            mates = rows != cols
+            self.together.add(rows[mates], cols[mates], np.tile(result, (mates.sum(), 1)))
+
+            rows, cols = np.meshgrid(team, opponents, indexing='ij')
+            self.against.add(rows.ravel(), cols.ravel(), np.tile(result, (rows.size, 1)))
+
+        self.folded.add(match_id)
+        return True
+
+    def save(self, path=SYNERGY_FILE):
+        self.together.compact()
+        self.against.compact()
+        np.savez_compressed(
+            path, names=np.array(self.names, dtype=str),
+            folded=self.folded.to_array(),
+            together_codes=self.together.codes, together_values=self.together.values,
+            against_codes=self.against.codes, against_values=self.against.values)
+
+    @classmethod
+    def load(cls, path=SYNERGY_FILE):
+        engine = cls()
+        if os.path.isfile(path):
+            with np.load(path) as data:
+                engine.names = data['names'].tolist()
+                engine.index = {n.strip().lower(): i for i, n in enumerate(engine.names)}
+                engine.folded = SeenMatches(data['folded'].tolist())
+                engine.together = PairMatrix(data['together_codes'], data['together_values'])
+                engine.against = PairMatrix(data['against_codes'], data['against_values'])
+        return engine
+
+    def top_pairs(self, matrix, other_label, n=5, min_games=10, best=True):
+        """
+        Up to `n` pairs per player with at least `min_games` games, ranked by
+        win % then CD per game: highest first with best=True (partners),
+        lowest first otherwise (nemeses).
+        """
+        rows, cols, values = matrix.entries()
+        keep = values[:, 0] >= min_games
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+        games, wins, cd = values.T
+        win_pct, cd_per_game = wins / games, cd / games
+
+        sign = -1 if best else 1
+        order = np.lexsort((sign * cd_per_game, sign * win_pct, rows))
+        ranked_rows = rows[order]
+        rank = np.arange(len(order)) - np.searchsorted(ranked_rows, ranked_rows, side='left')
+        order = order[rank < n]
+
+        names = np.array(self.names, dtype=object)
+        return pd.DataFrame({
+            'Player': names[rows[order]],
+            'Rank': rank[rank < n] + 1,
+            other_label: names[cols[order]],
+            'Games': games[order].astype(int),
+            'Wins': wins[order].astype(int),
+            'Win %': win_pct[order],
+            'CD': cd[order].astype(int),
+            'CD/Game': cd_per_game[order],
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build teammate/opponent synergy tables from the master CSV.")
+    parser.add_argument('input_csv', metavar='combinedStatsMaster.csv')
+    parser.add_argument('--state', default=SYNERGY_FILE,
+                        help="pair matrix state; matches not yet folded into it are folded and it is updated")
+    parser.add_argument('--out', default=SYNERGY_DIR)
+    parser.add_argument('--top', type=int, default=5, help="partners/nemeses per player")
+    parser.add_argument('--min-games', type=int, default=10, help="games a pair needs to be ranked")
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args()
+
+    engine = SynergyEngine.load(args.state)
+    folded = 0
+    for match_id, match_df in iter_matches(args.input_csv, args.chunksize):
+        score = match_score(match_df)
+        if score is not None:
+            folded += engine.update(match_id, match_df, *score)
+    engine.save(args.state)
+
+    os.makedirs(args.out, exist_ok=True)
+    engine.top_pairs(engine.together, 'Partner', args.top, args.min_games, best=True) \
+          .to_csv(os.path.join(args.out, 'partners.csv'), index=False)
+    engine.top_pairs(engine.against, 'Nemesis', args.top, args.min_games, best=False) \
+          .to_csv(os.path.join(args.out, 'nemeses.csv'), index=False)
+    print(f"[synergy] folded {folded} new matches; {len(engine.names)} players, "
+          f"{len(engine.together.codes)} teammate and {len(engine.against.codes)} opponent pairs → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
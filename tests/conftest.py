@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The pipeline is a set of root-level modules.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_store import BLUE, DTYPES, RED, TABLES, MatchEvents  # noqa: E402
+
+# Players: 0 and 1 on red, 2 and 3 on blue.
+PLAYERS = ['R1', 'R2', 'B1', 'B2']
+JOIN = [(0.0, 0, RED), (0.0, 1, RED), (0.0, 2, BLUE), (0.0, 3, BLUE)]
+
+
+def table(rows, name):
+    """An event_store table of (column, ...) tuples in TABLES[name] order."""
+    return {col: np.array([r[i] for r in rows], dtype=DTYPES[col]) for i, col in enumerate(TABLES[name])}
+
+
+def events(flag, duration=480, join=JOIN):
+    """MatchEvents of PLAYERS from hand-written (time, kind, player, team) flag events."""
+    flag = sorted(flag, key=lambda e: (e[0], e[1]))
+    return MatchEvents(PLAYERS, ('Red', 'Blue'), duration, [[0, 0], [0, 0]],
+                       table(flag, 'flag'), table([], 'splat'), table(join, 'join'))
+
+
+@pytest.fixture
+def make_events():
+    """The events() builder: MatchEvents of R1, R2 (red) and B1, B2 (blue)."""
+    return events
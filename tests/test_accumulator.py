@@ -0,0 +1,51 @@
+import numpy as np
+
+from accumulator import StatAccumulator
+
+STATS = ['Tags', 'Hold']
+
+
+def accumulator(rows):
+    """StatAccumulator of (name, side, win, minutes, tags, hold) rows."""
+    acc = StatAccumulator(STATS, capacity=2)
+    names = [r[0] for r in rows]
+    acc.add([n.lower() for n in names], names, [r[1] for r in rows], [r[2] for r in rows],
+            [r[3] for r in rows], [r[4:] for r in rows])
+    return acc
+
+
+def snapshot(acc):
+    return {name: (acc.totals[i].tolist(), float(acc.minutes[i]), acc.counts[i].tolist())
+            for name, i in ((n, acc.index[n.lower()]) for n in acc.names)}
+
+
+def test_merge_then_subtract_restores_the_totals_exactly():
+    base = accumulator([('A', 'red', True, 8.0, 3, 10.1), ('B', 'blue', False, 8.0, 1, 0.3)])
+    before = snapshot(base)
+    other = accumulator([('A', 'blue', False, 7.5, 2, 0.7), ('C', 'red', True, 8.0, 5, 12.34)])
+
+    base.merge(other)
+    assert base.counter('Games').tolist() == [2, 1, 1]
+    assert np.allclose(base.totals[0], [5, 10.8])
+
+    base.merge(other, -1)
+    after = snapshot(base)
+    assert {n: after[n] for n in before} == before
+    assert after['C'] == ([0.0, 0.0], 0.0, [0, 0, 0, 0, 0, 0])
+
+
+def test_subtracting_does_not_clear_a_missing_value():
+    base = accumulator([('A', 'red', True, 8.0, 3, 10.0)])
+    other = accumulator([('A', 'red', True, 8.0, 1, np.nan)])
+    base.merge(other)
+    base.merge(other, -1)
+    assert base.totals[0, 0] == 3
+    assert np.isnan(base.totals[0, 1])
+
+
+def test_merging_an_empty_accumulator_changes_nothing():
+    base = accumulator([('A', 'red', True, 8.0, 3, 10.0)])
+    before = snapshot(base)
+    base.merge(StatAccumulator(STATS), -1)
+    assert snapshot(base) == before
+
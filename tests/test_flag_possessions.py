@@ -0,0 +1,50 @@
+from event_store import BLUE, CAPTURE, DROP, GAME_ENDS, GRAB, RED, RETURN
+from eu_ctf import flag_possessions
+
+# Players (see conftest.events): 0 and 1 on red, 2 and 3 on blue.
+
+
+def test_grab_then_capture_is_one_hold(make_events):
+    holds = flag_possessions(make_events([(10.0, GRAB, 0, RED), (25.5, CAPTURE, 0, RED)]))
+    assert holds == {RED: [(0, 10.0, 25.5, CAPTURE, 0)], BLUE: []}
+
+
+def test_return_ends_the_other_teams_hold(make_events):
+    holds = flag_possessions(make_events([(10.0, GRAB, 0, RED), (14.0, RETURN, 2, BLUE)]))
+    assert holds[RED] == [(0, 10.0, 14.0, RETURN, 2)]
+    assert holds[BLUE] == []
+
+
+def test_drop_then_return_within_quarter_second_becomes_the_return(make_events):
+    holds = flag_possessions(make_events([(10.0, GRAB, 0, RED), (14.0, DROP, 0, RED),
+                                     (14.2, RETURN, 2, BLUE)]))
+    assert holds[RED] == [(0, 10.0, 14.2, RETURN, 2)]
+
+
+def test_return_a_quarter_second_or_more_after_a_drop_is_ignored(make_events):
+    holds = flag_possessions(make_events([(10.0, GRAB, 0, RED), (14.0, DROP, 0, RED),
+                                     (14.25, RETURN, 2, BLUE)]))
+    assert holds[RED] == [(0, 10.0, 14.0, DROP, 0)]
+
+
+def test_stray_end_without_an_open_hold_is_ignored(make_events):
+    holds = flag_possessions(make_events([(5.0, RETURN, 2, BLUE), (6.0, CAPTURE, 0, RED)]))
+    assert holds == {RED: [], BLUE: []}
+
+
+def test_grab_over_an_open_hold_closes_it_as_a_drop(make_events):
+    holds = flag_possessions(make_events([(10.0, GRAB, 0, RED), (12.0, GRAB, 1, RED),
+                                     (20.0, CAPTURE, 1, RED)]))
+    assert holds[RED] == [(0, 10.0, 12.0, DROP, 0), (1, 12.0, 20.0, CAPTURE, 1)]
+
+
+def test_hold_open_at_the_end_closes_at_the_duration(make_events):
+    holds = flag_possessions(make_events([(470.0, GRAB, 2, BLUE)], duration=480))
+    assert holds[BLUE] == [(2, 470.0, 480.0, GAME_ENDS, None)]
+
+
+def test_teams_are_paired_independently(make_events):
+    holds = flag_possessions(make_events([(10.0, GRAB, 0, RED), (11.0, GRAB, 2, BLUE),
+                                     (15.0, CAPTURE, 2, BLUE), (16.0, RETURN, 3, BLUE)]))
+    assert holds[BLUE] == [(2, 11.0, 15.0, CAPTURE, 2)]
+    assert holds[RED] == [(0, 10.0, 16.0, RETURN, 3)]
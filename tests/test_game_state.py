@@ -0,0 +1,78 @@
+import pytest
+
+from event_store import BLUE, CAPTURE, GRAB, RED, RETURN
+from eu_ctf import flag_possessions
+from game_state import GAME_STATE_ZEROS, MatchTimeline, game_state_counts
+
+# Players (see conftest.events): R1 (0) and R2 (1) on red, B1 (2) and B2 (3) on blue.
+
+
+@pytest.fixture
+def counts(make_events):
+    """game_state_counts of hand-written flag events."""
+    def build(flag, **kwargs):
+        match_events = make_events(flag, **kwargs)
+        return game_state_counts(match_events, flag_possessions(match_events))
+    return build
+
+
+def cap(grabbed, captured, player, team):
+    return [(grabbed, GRAB, player, team), (captured, CAPTURE, player, team)]
+
+
+# Blue scores first, red equalises from behind and then takes the lead.
+COMEBACK = cap(20.0, 50.0, 2, BLUE) + cap(60.0, 100.0, 0, RED) + cap(110.0, 200.0, 1, RED)
+
+
+def test_timeline_score_periods(make_events):
+    match_events = make_events(COMEBACK)
+    timeline = MatchTimeline(match_events, flag_possessions(match_events))
+    assert timeline.boundaries.tolist() == [0.0, 50.0, 100.0, 200.0]
+    assert timeline.lead(RED).tolist() == [0, -1, 0, 1]
+    assert timeline.lead(BLUE).tolist() == [0, 1, 0, -1]
+    assert timeline.final_score() == (2, 1)
+    assert timeline.time_trailing(RED, [0.0, 75.0, 300.0]).tolist() == [0.0, 25.0, 50.0]
+
+
+def test_caps_are_classed_by_the_score_before_them(counts):
+    result = counts(COMEBACK)
+    assert result['B1']['Caps While Tied'] == 1
+    assert result['R1']['Caps While Trailing'] == 1
+    assert result['R1']['Caps While Tied'] == 0
+    assert result['R2']['Caps While Tied'] == 1
+    assert result['R2']['Caps While Trailing'] == 0
+
+
+def test_comeback_win_credits_every_player_of_the_winning_team(counts):
+    result = counts(COMEBACK)
+    assert {p: row['Comeback Wins'] for p, row in result.items()} == {'R1': 1, 'R2': 1, 'B1': 0, 'B2': 0}
+
+
+def test_no_comeback_win_for_a_team_that_always_led_or_a_tie(counts):
+    assert all(row['Comeback Wins'] == 0 for row in counts(cap(10.0, 20.0, 0, RED)).values())
+    tied = cap(10.0, 20.0, 0, RED) + cap(30.0, 40.0, 2, BLUE)
+    assert all(row['Comeback Wins'] == 0 for row in counts(tied).values())
+
+
+def test_hold_while_down_counts_only_the_seconds_spent_behind(counts):
+    result = counts(COMEBACK)
+    assert result['R1']['Hold While Down'] == 40.0   # held 60-100, behind 50-100
+    assert result['R2']['Hold While Down'] == 0.0
+    assert result['B1']['Hold While Down'] == 0.0
+
+    # A hold that starts level and goes on after the other team scores.
+    result = counts(cap(30.0, 40.0, 0, RED) + [(20.0, GRAB, 2, BLUE), (80.5, RETURN, 1, RED)])
+    assert result['B1']['Hold While Down'] == 40.5
+
+
+def test_last_minute_caps_are_captures_ending_in_the_last_sixty_seconds(counts):
+    late = cap(400.0, 419.9, 0, RED) + cap(410.0, 420.0, 2, BLUE) + cap(450.0, 479.0, 3, BLUE)
+    result = counts(late, duration=480)
+    assert {p: row['Last Minute Caps'] for p, row in result.items()} == {'R1': 0, 'R2': 0, 'B1': 1, 'B2': 1}
+
+
+def test_only_joined_players_are_counted_on_their_first_team(counts):
+    join = [(0.0, 0, RED), (5.0, 2, BLUE), (6.0, 0, BLUE)]
+    result = counts(cap(10.0, 20.0, 3, BLUE), join=join)
+    assert set(result) == {'R1', 'B1'}
+    assert result['R1'] == GAME_STATE_ZEROS
@@ -0,0 +1,36 @@
+from match_index import (DEFAULT_MATCH_FILTERS, build_match_index, is_eligible, load_match_index,
+                         write_match_index)
+
+BULK = {
+    '1': {'date': 1700000000, 'timeLimit': 8, 'group': '', 'mapId': 12, 'duration': 28800, 'players': [{}] * 8},
+    '2': {'date': 1700000600.5, 'timeLimit': None, 'group': None, 'mapId': None, 'duration': None},
+    '3': {'date': 1700001200, 'timeLimit': 8, 'group': 'abc', 'mapId': 'custom', 'duration': 14000},
+    '4': {'timeLimit': 8.0, 'mapId': 7},
+    '5': {'timeLimit': 8, 'group': None, 'mapId': 7},
+}
+
+
+def test_written_index_loads_back_the_built_headers(tmp_path):
+    index = build_match_index(BULK)
+    path = tmp_path / 'index.csv'
+    write_match_index(path, index)
+    loaded = load_match_index(path)
+    assert loaded == index
+    for mid in index:
+        assert [type(v) for v in loaded[mid]] == [type(v) for v in index[mid]]
+
+
+def test_null_group_stays_distinct_from_no_group(tmp_path):
+    path = tmp_path / 'index.csv'
+    write_match_index(path, build_match_index(BULK))
+    loaded = load_match_index(path)
+    assert loaded['4'].group == ''
+    assert loaded['5'].group is None
+    assert not is_eligible(loaded['5'], DEFAULT_MATCH_FILTERS)
+
+
+def test_eligibility_survives_a_null_time_limit(tmp_path):
+    path = tmp_path / 'index.csv'
+    write_match_index(path, build_match_index(BULK))
+    loaded = load_match_index(path)
+    assert [mid for mid, h in loaded.items() if is_eligible(h, DEFAULT_MATCH_FILTERS)] == ['1', '4']
@@ -0,0 +1,46 @@
+import json
+
+from player_store import PlayerStore
+
+PROFILES = {'Ana': {'url': 'https://tagpro.koalabeast.com/profile/a'},
+            'Bo': {'url': 'https://tagpro.koalabeast.com/profile/b'}}
+LEADERBOARD = {'Ana': {'tier': 'Gold', 'skill': '1500', 'rank': '12'},
+               'Cy': {'tier': 'Silver', 'skill': '1200', 'rank': '40'}}
+
+
+def json_files(tmp_path):
+    paths = str(tmp_path / 'profiles.json'), str(tmp_path / 'leaderboard.json')
+    for path, data in zip(paths, (PROFILES, LEADERBOARD)):
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    return paths
+
+
+def test_skills_follow_the_given_names_with_none_for_unknown_ones(tmp_path):
+    with PlayerStore(str(tmp_path / 'players.db'), import_from=json_files(tmp_path)) as store:
+        assert store.skills_for(['Cy', 'Nobody', 'Ana', 'Bo', 'Cy']) == ['1200', None, '1500', None, '1200']
+        assert store.skills_for([]) == []
+
+
+def test_url_and_stats_writes_update_one_row(tmp_path):
+    with PlayerStore(str(tmp_path / 'players.db')) as store:
+        store.set_url('Ana', 'old')
+        store.set_stats('Ana', 'Gold', '1500', '12', fetched=1.0)
+        store.set_url('Ana', 'new')
+        store.set_stats('Ana', 'Platinum', '1600', '3', fetched=2.0)
+
+        assert store.url('Ana') == 'new'
+        assert store.profiles() == {'Ana': {'url': 'new'}}
+        assert store.leaderboard() == {'Ana': {'tier': 'Platinum', 'skill': '1600', 'rank': '3'}}
+        assert store.db.execute("SELECT stats_fetched FROM players").fetchall() == [(2.0,)]
+
+
+def test_import_then_export_gives_back_the_json_files(tmp_path):
+    with PlayerStore(str(tmp_path / 'players.db'), import_from=json_files(tmp_path)) as store:
+        assert store.profiles() == PROFILES
+        assert store.leaderboard() == LEADERBOARD
+
+
+def test_only_the_default_store_imports_the_repo_json_files(tmp_path):
+    with PlayerStore(str(tmp_path / 'players.db')) as store:
+        assert store.profiles() == {} and store.leaderboard() == {}
@@ -0,0 +1,46 @@
+import os
+
+from update_profile_stats import (RANKED_ROW_LABEL, SEARCH_BASE, enclosing_elements, parse_profile_stats,
+                                  parse_profile_url)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_ranked_na_row_is_read_from_a_profile():
+    assert parse_profile_stats(fixture('profile.html')) == ('Gold II', '1843', '#212')
+
+
+def test_enclosing_row_is_not_confused_with_a_track_tag():
+    rows = list(enclosing_elements(fixture('profile.html'), RANKED_ROW_LABEL, 'tr'))
+    assert len(rows) == 1
+    assert rows[0].startswith('<tr class="ranked-row">')
+    assert rows[0].endswith('</tr>')
+
+
+def test_label_written_with_entities_falls_back_to_all_rows():
+    html = fixture('profile_entities.html')
+    assert not list(enclosing_elements(html, RANKED_ROW_LABEL, 'tr'))
+    assert parse_profile_stats(html) == ('Platinum', '2011', '#37')
+
+
+def test_unplaced_or_missing_ranked_row_gives_empty_strings():
+    assert parse_profile_stats(fixture('profile_unranked.html')) == ('', '', '')
+    assert parse_profile_stats(fixture('search.html')) == ('', '', '')
+
+
+def test_search_returns_the_first_exact_name_match_ignoring_case():
+    html = fixture('search.html')
+    assert parse_profile_url(html, 'some ball') == f"{SEARCH_BASE}/profile/5e9b77aa01"
+    assert parse_profile_url(html, '  Some Ball Jr ') == f"{SEARCH_BASE}/profile/5f1a0c0e2b"
+    assert parse_profile_url(html, 'Some') == ""
+
+
+def test_search_with_unquoted_links_falls_back_to_parsing_the_page():
+    html = fixture('search_unquoted.html')
+    assert parse_profile_url(html, 'Some Ball') == f"{SEARCH_BASE}/profile/62cc13ef22"
+    assert parse_profile_url(html, 'Nobody') == ""
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from rankings import is_ranked, lower_is_better, top_n
+
+
+def test_only_rates_and_percentages_rank_lower_first():
+    assert lower_is_better('Drops/8Min')
+    assert lower_is_better('Pops/Min')
+    assert lower_is_better('Flaccid %')
+    assert not lower_is_better('Drops')
+    assert not lower_is_better('Prevent/Hold Against')
+    assert not lower_is_better('Hold/8Min')
+
+
+def test_raw_totals_of_lower_is_better_stats_are_not_ranked():
+    assert not is_ranked('Drops')
+    assert not is_ranked('Hold Against')
+    assert is_ranked('Drops/8Min')
+    assert is_ranked('Captures')
+
+
+def test_top_n_puts_the_lowest_rate_first_and_skips_unqualified_players():
+    df = pd.DataFrame({'Player': ['a', 'b', 'c', 'd'], 'Games': [1, 20, 30, 40],
+                       'Drops/8Min': [0.0, 3.0, 1.5, 1.5]})
+    table = top_n(df, ['Drops/8Min'], 2, min_games=10)
+    assert table['Player'].tolist() == ['c', 'd']
+    assert table['Rank'].tolist() == [1, 1]
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from combined_schema import apply_schema
+from ratings import INITIAL_RATING, RatingEngine
+
+
+def match(red='a', blue='b'):
+    return apply_schema(pd.DataFrame({'Player': [red, blue], 'Team': ['Red', 'Blue'], 'Minutes': 8.0}))
+
+
+def test_matches_are_rated_once_in_any_id_order():
+    engine = RatingEngine()
+    assert engine.update(20, match(), 1, 0)
+    assert engine.update(10, match('c', 'd'), 1, 0)   # older id, e.g. an unsorted master
+    assert not engine.update(20, match(), 1, 0)
+    assert engine.players['a']['games'] == 1
+    assert engine.players['c']['rating'] > INITIAL_RATING
+
+
+def test_rated_ids_survive_a_save(tmp_path):
+    path = str(tmp_path / 'ratings.json')
+    engine = RatingEngine()
+    engine.update(20, match(), 1, 0)
+    engine.save(path)
+
+    engine = RatingEngine.load(path)
+    assert not engine.update(20, match(), 1, 0)
+    assert engine.update(10, match(), 0, 1)
+    assert engine.players['a']['games'] == 2
+
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from combined_schema import apply_schema
+from rankings import ranking_csv_names
+from stats import build_map_table, fold_match, master_columns, new_entry, raw_stats
+
+
+def test_map_rankings_drop_only_the_team_rows(tmp_path):
+    players = ['Dream_Team', 'a', 'b', 'c']
+    df = pd.DataFrame({'matchId': 1, 'matchDate': 0, 'mapName': 'Bombing Run',
+                       'Player': players, 'Team': ['Red', 'Red', 'Blue', 'Blue'], 'Minutes': 8.0},
+                      columns=master_columns).fillna({s: 0 for s in raw_stats})
+    df['Captures'] = [1, 0, 0, 0]
+    per_map = {}
+    fold_match(1, apply_schema(df), new_entry(), per_map, {})
+    entry = per_map['Bombing Run']
+    assert {'red_team', 'blue_team', 'dream_team'} <= set(entry.index)
+
+    fn, dfm, _ = build_map_table(str(tmp_path), 'Bombing Run', entry, {'top': 10, 'min_map_games': 1})
+    assert set(dfm['Player']) == set(players) | {'Red', 'Blue'}
+    _, pct_name = ranking_csv_names(fn[len('stats_'):-4])
+    assert set(pd.read_csv(tmp_path / pct_name)['Player']) == set(players)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from combined_schema import apply_schema
+from synergy import PairMatrix, SynergyEngine
+
+
+def rows(red, blue):
+    return apply_schema(pd.DataFrame({'Player': list(red) + list(blue),
+                                      'Team': ['Red'] * len(red) + ['Blue'] * len(blue)}))
+
+
+def pairs(engine, matrix):
+    """{(player, other): [games, wins, cd]} of a pair matrix."""
+    r, c, values = matrix.entries()
+    return {(engine.names[i], engine.names[j]): v.tolist() for i, j, v in zip(r, c, values)}
+
+
+def test_match_adds_ordered_teammate_and_opponent_pairs():
+    engine = SynergyEngine()
+    engine.update(1, rows(['a', 'b'], ['c']), 3, 1)
+
+    assert pairs(engine, engine.together) == {('a', 'b'): [1, 1, 2], ('b', 'a'): [1, 1, 2]}
+    assert pairs(engine, engine.against) == {
+        ('a', 'c'): [1, 1, 2], ('b', 'c'): [1, 1, 2],
+        ('c', 'a'): [1, 0, -2], ('c', 'b'): [1, 0, -2]}
+
+
+def test_compact_sums_pending_rows_into_sorted_unique_pairs():
+    matrix = PairMatrix()
+    matrix.add(np.array([2, 0]), np.array([1, 1]), np.array([[1, 1, 3], [1, 0, -1]]))
+    matrix.add(np.array([0]), np.array([1]), np.array([[1, 1, 2]]))
+    matrix.compact()
+
+    assert matrix.codes.tolist() == [(0 << 32) | 1, (2 << 32) | 1]
+    assert matrix.values.tolist() == [[2, 1, 1], [1, 1, 3]]
+    assert not matrix._pending
+
+
+def test_top_pairs_rank_by_win_rate_then_cap_differential():
+    engine = SynergyEngine()
+    results = [('b', 2, 0), ('b', 1, 0),      # with b: 2 wins, CD +3
+               ('c', 5, 0), ('c', 0, 1),      # with c: 1 win,  CD +4
+               ('d', 1, 0), ('d', 1, 0),      # with d: 2 wins, CD +2
+               ('e', 9, 0)]                   # with e: one game only
+    for match_id, (mate, red, blue) in enumerate(results):
+        engine.update(match_id, rows(['a', mate], ['x', 'y']), red, blue)
+
+    partners = engine.top_pairs(engine.together, 'Partner', n=3, min_games=2)
+    best = partners[partners['Player'] == 'a']
+    assert best['Partner'].tolist() == ['b', 'd', 'c']
+    assert best['Rank'].tolist() == [1, 2, 3]
+
+    nemeses = engine.top_pairs(engine.together, 'Partner', n=1, min_games=2, best=False)
+    assert nemeses[nemeses['Player'] == 'a']['Partner'].tolist() == ['c']
+
+
+def test_state_round_trips_and_does_not_fold_a_match_twice(tmp_path):
+    path = str(tmp_path / 'synergy.npz')
+    engine = SynergyEngine()
+    engine.update(20, rows(['a', 'b'], ['c']), 2, 1)
+    engine.save(path)
+
+    loaded = SynergyEngine.load(path)
+    assert pairs(loaded, loaded.against) == pairs(engine, engine.against)
+    assert not loaded.update(20, rows(['a', 'b'], ['c']), 2, 1)
+    assert loaded.update(10, rows(['a', 'b'], ['c']), 0, 1)
+    assert pairs(loaded, loaded.together)[('a', 'b')] == [2, 1, 0]
@@ -0,0 +1,70 @@
+import functools
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import heatmaps
+import latest_match
+import watch
+from eu_ctf import load_bulk_maps
+from match_index import DEFAULT_MATCH_FILTERS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from fake_tagpro_eu import FakeTagproEU  # noqa: E402
+from synthetic import generate_bulk  # noqa: E402
+
+FIRST_ID = 1000000
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """A FakeTagproEU with 4 of 12 matches posted and its bulk maps; watch's files go to tmp_path."""
+    matches, maps = generate_bulk(12, seed=3, first_id=FIRST_ID)
+    fake = FakeTagproEU(matches, port=0, initial=4).start()
+
+    monkeypatch.setattr(latest_match, 'TAGPRO_EU_URL', fake.url)
+    monkeypatch.setattr(latest_match, 'SITEMAP_CACHE_FILE', str(tmp_path / 'sitemap_cache.json'))
+    monkeypatch.setattr(latest_match, 'LATEST_MATCH_FILE', str(tmp_path / 'latest_match.txt'))
+    for name, path in (('WATCH_DIR', 'watch'), ('LIVE_STATS_DIR', 'Live'), ('CHECKPOINT_FILE', 'state.pkl'),
+                       ('MASTER_COMBINED_CSV', 'master.csv'), ('APPEND_JOURNAL', 'watch/master_append.json'),
+                       ('RATINGS_FILE', 'ratings.json')):
+        monkeypatch.setattr(watch, name, str(tmp_path / path))
+    monkeypatch.setattr(watch, 'update_heatmaps',
+                        functools.partial(heatmaps.update_heatmaps, directory=str(tmp_path / 'heatmaps')))
+    os.makedirs(tmp_path / 'watch')
+    with open(tmp_path / 'bulkmaps.json', 'w') as f:
+        json.dump(maps, f)
+    yield fake, load_bulk_maps(str(tmp_path / 'bulkmaps.json'))
+    fake.stop()
+
+
+def test_two_polls_fold_only_the_new_matches(server, tmp_path):
+    fake, bulk_maps = server
+    state = watch.WatchState(FIRST_ID)
+
+    assert watch.update(state, bulk_maps, DEFAULT_MATCH_FILTERS) == 4
+    assert state.next_match_id == FIRST_ID + 4
+    assert '/sitemaps.xml' in fake.requests
+
+    fake.release(5)
+    first_poll = len(fake.requests)
+    assert watch.update(state, bulk_maps, DEFAULT_MATCH_FILTERS) == 5
+    assert state.next_match_id == FIRST_ID + 9
+    # The latest sitemap changed, so the sitemap index is not fetched again.
+    second_poll = fake.requests[first_poll:]
+    assert '/sitemaps.xml' not in second_poll
+    assert [p for p in second_poll if p.startswith('/data/')] == \
+        [f"/data/?bulk=matches&first={FIRST_ID + 4}&last={FIRST_ID + 8}"]
+
+    master = pd.read_csv(tmp_path / 'master.csv')
+    assert sorted(master['matchId'].unique()) == list(range(FIRST_ID, FIRST_ID + 9))
+    assert state.master_size == os.path.getsize(tmp_path / 'master.csv')
+    assert not os.path.exists(tmp_path / 'watch' / 'master_append.json')
+
+    # Nothing new: no match is folded and no bulk data is requested.
+    third_poll = len(fake.requests)
+    assert watch.update(state, bulk_maps, DEFAULT_MATCH_FILTERS) == 0
+    assert not [p for p in fake.requests[third_poll:] if p.startswith('/data/')]
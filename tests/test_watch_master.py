@@ -0,0 +1,75 @@
+import json
+
+import pandas as pd
+
+from watch import append_rows, restore_master
+
+HEADER = b"Player,Team,matchId\n"
+ROWS = pd.DataFrame({'Player': ['A', 'B'], 'Team': ['Red', 'Blue'], 'matchId': [7, 7]})
+
+
+def master(tmp_path, content=HEADER + b"X,Red,1\n"):
+    path = tmp_path / 'master.csv'
+    path.write_bytes(content)
+    return str(path), len(content)
+
+
+def test_append_records_its_span(tmp_path):
+    path, size = master(tmp_path)
+    journal = str(tmp_path / 'journal.json')
+    end = append_rows(path, ROWS, journal)
+    with open(journal) as f:
+        pending = json.load(f)
+    assert pending['offset'] == size
+    assert end == size + pending['length']
+    assert open(path, 'rb').read()[size:] == b"A,Red,7\nB,Blue,7\n"
+
+
+def test_restore_cuts_only_watchs_own_append(tmp_path):
+    path, size = master(tmp_path)
+    journal = str(tmp_path / 'journal.json')
+    append_rows(path, ROWS, journal)
+    with open(path, 'ab') as f:
+        f.write(b"C,Red,8\n")  # combine.py appending after the interrupted update
+
+    assert not restore_master(path, size, journal)
+    assert open(path, 'rb').read() == HEADER + b"X,Red,1\nC,Red,8\n"
+
+
+def test_restore_undoes_an_interrupted_append(tmp_path):
+    path, size = master(tmp_path)
+    journal = str(tmp_path / 'journal.json')
+    append_rows(path, ROWS, journal)
+    assert restore_master(path, size, journal)
+    assert open(path, 'rb').read() == HEADER + b"X,Red,1\n"
+
+    # Cut short while writing: the partial rows go too.
+    append_rows(path, ROWS, journal)
+    with open(path, 'r+b') as f:
+        f.truncate(size + 5)
+    assert restore_master(path, size, journal)
+    assert open(path, 'rb').read() == HEADER + b"X,Red,1\n"
+
+
+def test_master_changed_outside_watch_is_left_alone(tmp_path):
+    path, size = master(tmp_path)
+    journal = str(tmp_path / 'journal.json')
+    with open(path, 'ab') as f:
+        f.write(b"C,Red,8\n")
+    assert not restore_master(path, size, journal)
+    assert open(path, 'rb').read() == HEADER + b"X,Red,1\nC,Red,8\n"
+
+    # A journal whose bytes are not at its offset any more is not applied either.
+    path, size = master(tmp_path)
+    append_rows(path, ROWS, journal)
+    with open(path, 'r+b') as f:
+        f.seek(size)
+        f.write(b"Z")
+    assert not restore_master(path, size, journal)
+    assert open(path, 'rb').read()[size:] == b"Z,Red,7\nB,Blue,7\n"
+
+
+def test_clean_master_needs_no_restore(tmp_path):
+    path, size = master(tmp_path)
+    assert restore_master(path, size, str(tmp_path / 'journal.json'))
+    assert open(path, 'rb').read() == HEADER + b"X,Red,1\n"
@@ -0,0 +1,45 @@
+import pandas as pd
+
+import stats
+from combined_schema import apply_schema
+from windows import DAY_SECONDS, DailyTotals, RollingWindow
+
+
+def match(day, match_id, red_tags):
+    """A counted 8-minute match on `day` that red wins 1-0."""
+    df = pd.DataFrame({'matchId': match_id, 'matchDate': day * DAY_SECONDS + 3600.0, 'mapName': 'Map',
+                       'Player': ['R', 'B'], 'Team': ['Red', 'Blue'], 'Minutes': 8.0})
+    for stat in stats.raw_stats:
+        df[stat] = 0
+    df['Captures'] = [1, 0]
+    df['Tags'] = [red_tags, 0]
+    return apply_schema(df)
+
+
+def played(entry):
+    """{name: (totals, minutes, counts)} of the entries with games."""
+    return {name: (entry.totals[i].tolist(), float(entry.minutes[i]), entry.counts[i].tolist())
+            for name, i in ((n, entry.index[n.lower()]) for n in entry.names) if entry.counts[i][0]}
+
+
+def test_rolling_window_matches_a_fresh_sum_of_its_days():
+    daily, rolling = DailyTotals(), RollingWindow(3)
+    for day in range(10, 20):
+        daily.add_match(match(day, day, day))
+
+    for last_day in (12, 13, 17, 16, 40, 19):
+        rolling.advance(daily, last_day)
+        assert played(rolling.total) == played(daily.window(last_day - 2, last_day))
+
+
+def test_matches_added_inside_the_window_are_counted_and_old_days_dropped():
+    daily, rolling = DailyTotals(), RollingWindow(2)
+    daily.add_match(match(5, 1, 4))
+    rolling.advance(daily, 6)
+    for day, match_id in ((6, 2), (1, 3)):
+        counted = daily.add_match(match(day, match_id, 2))
+        rolling.add_match(match(day, match_id, 2), *counted)
+    assert rolling.total.totals[rolling.total.index['r'], stats.raw_stats.index('Tags')] == 6
+
+    daily.drop_before(rolling.first_day)
+    assert sorted(daily.days) == [5, 6]
@@ -1,63 +1,191 @@
-import json
+import argparse
+import bisect
+import gzip
+import hashlib
+import os
+import re
 import requests
 import pandas as pd
 import time
 import sys
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import requests.utils
 
+from player_store import PlayerStore, STORE_FILE
+
 # ─── CONSTANTS ────────────────────────────────────────────────────────────────
 SEARCH_BASE       = "https://tagpro.koalabeast.com"
 REQUEST_DELAY     = 3  # seconds between HTTP requests
-PROFILES_FILE     = "profiles.json"
-LEADERBOARD_FILE  = "leaderboard.json"
+CACHE_DIR         = "html_cache"
+CACHE_KEEP        = 5  # responses kept per URL
+RANKED_ROW_LABEL  = "Ranked CTF (NA)"
+
+# Profile anchors of a search page, each parsed on its own.
+PROFILE_LINK_RE   = re.compile(r"<a\b[^>]*\bhref\s*=\s*[\"']/profile/.*?</a>", re.IGNORECASE | re.DOTALL)
+
+# ─── RESPONSE CACHE ───────────────────────────────────────────────────────────
+class ResponseCache:
+    """
+    Raw HTML responses on disk by URL and fetch time
+    (<dir>/<url hash>/<unix time>.html.gz, with the URL in url.txt), so pages
+    can be parsed again later without new requests. Offline, the newest
+    cached response is used and nothing is fetched.
+    """
+
+    def __init__(self, directory=CACHE_DIR, offline=False, max_age=None, keep=CACHE_KEEP):
+        self.directory = directory
+        self.offline = offline
+        self.max_age = max_age
+        self.keep = keep
+
+    def _url_dir(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest()[:24])
+
+    def _responses(self, url):
+        folder = self._url_dir(url)
+        if not os.path.isdir(folder):
+            return []
+        return sorted((int(n.split('.')[0]), os.path.join(folder, n))
+                      for n in os.listdir(folder) if n.endswith('.html.gz'))
+
+    def latest(self, url):
+        """(fetch time, html) of the newest cached response, or None."""
+        responses = self._responses(url)
+        if not responses:
+            return None
+        fetched, path = responses[-1]
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return fetched, f.read()
+
+    def store(self, url, html):
+        folder = self._url_dir(url)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, 'url.txt'), 'w') as f:
+            f.write(url)
+        path = os.path.join(folder, f"{int(time.time())}.html.gz")
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(path + '.tmp', path)
+        for _, old in self._responses(url)[:-self.keep]:
+            os.remove(old)
+
+    def get(self, url):
+        """
+        The HTML of `url`: from the cache when offline or when the newest
+        response is younger than max_age, otherwise fetched and stored.
+        Returns None if it can be neither fetched nor found in the cache.
+        """
+        cached = self.latest(url)
+        if self.offline:
+            return cached[1] if cached else None
+        if cached and self.max_age is not None and time.time() - cached[0] < self.max_age:
+            return cached[1]
+
+        try:
+            resp = requests.get(url)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            print(f"[update_profile_stats] request failed for {url}: {e}")
+            time.sleep(REQUEST_DELAY)
+            return None
+        self.store(url, resp.text)
+        time.sleep(REQUEST_DELAY)
+        return resp.text
+
+
+response_cache = ResponseCache()
+
+# ─── PARSING ──────────────────────────────────────────────────────────────────
+def enclosing_elements(html: str, marker: str, tag: str):
+    """
+    Yield the markup of the innermost <tag> element around each occurrence
+    of `marker`, found by string search without parsing the page.
+    """
+    lower = html.lower()
+    # Opening tags only: "<tr" followed by whitespace or ">", not "<track".
+    starts = [m.start() for m in re.finditer(rf"<{tag}[\s>]", lower)]
+    at = html.find(marker)
+    while at >= 0:
+        before = bisect.bisect_left(starts, at)
+        end = lower.find(f"</{tag}>", at)
+        if before and end >= 0:
+            yield html[starts[before - 1]:end + len(tag) + 3]
+        at = html.find(marker, at + len(marker))
+
+
+def parse_profile_url(html: str, name: str) -> str:
+    """
+    The first profile link on a search page whose displayed name matches
+    `name` case-insensitively, or "". Only the profile anchors are parsed.
+    """
+    target = name.strip().lower()
+    links = PROFILE_LINK_RE.findall(html)
+    if links:
+        anchors = BeautifulSoup("".join(links), "html.parser").find_all("a")
+    else:
+        # Unusual markup: fall back to building just the anchors of the whole page.
+        anchors = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("a")).find_all("a")
+    for link in anchors:
+        href = link.get("href") or ""
+        if href.startswith("/profile/") and link.get_text(strip=True).lower() == target:
+            return f"{SEARCH_BASE}{href}"
+    return ""
+
+
+def ranked_row_stats(rows):
+    """(tier, skill, rank) of the first Ranked CTF (NA) row among parsed <tr>s, or None."""
+    for row in rows:
+        cells = row.find_all("td")
+        if len(cells) >= 2 and RANKED_ROW_LABEL in cells[0].get_text(strip=True):
+            container = cells[1].find("div", class_="profile-tier-display")
+            if not container:
+                return "", "", ""
+            tier  = container.find("span", class_="tier-badge").get_text(strip=True) if container.find("span", class_="tier-badge") else ""
+            skill = container.find("span", class_="skill-value").get_text(strip=True) if container.find("span", class_="skill-value") else ""
+            rank  = container.find("span", class_="rank-value").get_text(strip=True)  if container.find("span", class_="rank-value")  else ""
+            return tier, skill, rank
+    return None
+
+
+def parse_profile_stats(html: str):
+    """
+    (tier, skill, rank) from the Ranked CTF (NA) row of a profile page, or
+    empty strings. Only the table rows around the label are parsed.
+    """
+    for fragment in enclosing_elements(html, RANKED_ROW_LABEL, "tr"):
+        stats = ranked_row_stats(BeautifulSoup(fragment, "html.parser", parse_only=SoupStrainer("tr")).find_all("tr"))
+        if stats:
+            return stats
+    # The label may be written with entities: fall back to all the page's rows.
+    rows = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("tr")).find_all("tr")
+    return ranked_row_stats(rows) or ("", "", "")
 
 # ─── UTILITIES ────────────────────────────────────────────────────────────────
-def get_profile_url(name: str) -> str:
+def get_profile_url(name: str, cache: ResponseCache = None) -> str:
     """
     Given a TagPro player name, search Koalabeast’s playersearch?q= page.
     Returns the first profile URL whose displayed name matches case-insensitively `name`,
     or an empty string if none is found.
     """
     encoded = requests.utils.quote(name)
-    search_url = f"{SEARCH_BASE}/playersearch?q={encoded}"
-    try:
-        resp = requests.get(search_url)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        print(f"[get_profile_url] request failed for {name}: {e}")
-        time.sleep(REQUEST_DELAY)
-        return ""
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    target = name.strip().lower()
-    # find all profile links and match inner text case-insensitively
-    for link in soup.find_all("a", href=lambda h: h and h.startswith("/profile/")):
-        display_name = link.get_text(strip=True)
-        if display_name.lower() == target:
-            time.sleep(REQUEST_DELAY)
-            return f"{SEARCH_BASE}{link['href']}"
-
-    # fallback: no case-insensitive match
-    time.sleep(REQUEST_DELAY)
-    return ""
+    html = (cache or response_cache).get(f"{SEARCH_BASE}/playersearch?q={encoded}")
+    return parse_profile_url(html, name) if html else ""
 
 
-def ensure_profile_urls(players: list, profiles: dict) -> bool:
+def ensure_profile_urls(players: list, store: PlayerStore, cache: ResponseCache = None) -> bool:
     """
-    Ensure each player has a 'url' in profiles; if missing, look up via get_profile_url()
-    and add to profiles dict. Returns True if profiles was modified.
+    Ensure each player has a profile URL in the store; if missing, look up via
+    get_profile_url() and commit it at once. Returns True if any URL was added.
     """
     updated = False
     for name in players:
-        if profiles.get(name, {}).get('url'):
+        if store.url(name):
             continue
 
         print(f"Searching profile URL for '{name}'...")
-        url = get_profile_url(name)
+        url = get_profile_url(name, cache)
         if url:
-            profiles[name] = profiles.get(name, {})
-            profiles[name]['url'] = url
+            store.set_url(name, url)
             updated = True
             print(f"  -> Found URL: {url}")
         else:
@@ -65,85 +193,54 @@ def ensure_profile_urls(players: list, profiles: dict) -> bool:
     return updated
 
 
-def fetch_profile_stats(profile_url: str):
+def fetch_profile_stats(profile_url: str, cache: ResponseCache = None):
     """
     Fetch tier, skill, rank from Ranked CTF (NA) row of a profile.
     Returns (tier, skill, rank) or empty strings on failure.
     """
-    try:
-        resp = requests.get(profile_url)
-        resp.raise_for_status()
-    except requests.RequestException as e:
-        print(f"[fetch_profile_stats] failed for {profile_url}: {e}")
-        time.sleep(REQUEST_DELAY)
-        return "", "", ""
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    for row in soup.find_all("tr"):
-        cells = row.find_all("td")
-        if len(cells) >= 2 and "Ranked CTF (NA)" in cells[0].get_text(strip=True):
-            container = cells[1].find("div", class_="profile-tier-display")
-            if not container:
-                break
-            tier  = container.find("span", class_="tier-badge").get_text(strip=True) if container.find("span", class_="tier-badge") else ""
-            skill = container.find("span", class_="skill-value").get_text(strip=True) if container.find("span", class_="skill-value") else ""
-            rank  = container.find("span", class_="rank-value").get_text(strip=True)  if container.find("span", class_="rank-value")  else ""
-            time.sleep(REQUEST_DELAY)
-            return tier, skill, rank
-
-    time.sleep(REQUEST_DELAY)
-    return "", "", ""
+    html = (cache or response_cache).get(profile_url)
+    return parse_profile_stats(html) if html else ("", "", "")
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python update_profile_stats.py <AggregatedStatsOutput.csv>")
-        sys.exit(1)
-    agg_csv = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Look up koalabeast profiles and ranked stats of players.")
+    parser.add_argument('agg_csv', metavar='AggregatedStatsOutput.csv')
+    parser.add_argument('--offline', action='store_true',
+                        help=f"parse the newest cached responses in {CACHE_DIR} instead of making requests")
+    parser.add_argument('--max-age', type=float, metavar='SECONDS',
+                        help="reuse cached responses younger than this instead of fetching again")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--store', default=STORE_FILE, help="player database (default: %(default)s)")
+    args = parser.parse_args()
+    cache = ResponseCache(args.cache_dir, args.offline, args.max_age)
 
     try:
-        df = pd.read_csv(agg_csv)
+        df = pd.read_csv(args.agg_csv)
     except Exception as e:
-        print(f"Error reading '{agg_csv}': {e}")
+        print(f"Error reading '{args.agg_csv}': {e}")
         sys.exit(1)
     players = df['Player'].dropna().unique().tolist()
-    print(f"Loaded {len(players)} players from '{agg_csv}'.")
-
-    try:
-        with open(PROFILES_FILE, 'r') as f:
-            profiles = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        profiles = {}
-        print(f"Initialized new '{PROFILES_FILE}'.")
-
-    if ensure_profile_urls(players, profiles):
-        with open(PROFILES_FILE, 'w') as f:
-            json.dump(profiles, f, indent=4)
-        print(f"Saved new URLs to '{PROFILES_FILE}'.")
-
-    try:
-        with open(LEADERBOARD_FILE, 'r') as f:
-            leaderboard = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        leaderboard = {}
-        print(f"Initialized new '{LEADERBOARD_FILE}'.")
-
-    for name in players:
-        url = profiles.get(name, {}).get('url')
-        if not url:
-            print(f"Skipping '{name}': no URL available.")
-            continue
-        print(f"Fetching stats for '{name}'...")
-        tier, skill, rank = fetch_profile_stats(url)
-        leaderboard[name] = {
-            'tier': tier,
-            'skill': skill,
-            'rank': rank
-        }
-
-    with open(LEADERBOARD_FILE, 'w') as f:
-        json.dump(leaderboard, f, indent=4)
-    print(f"All stats updated in '{LEADERBOARD_FILE}'.")
+    print(f"Loaded {len(players)} players from '{args.agg_csv}'.")
+
+    # Every URL and every player's stats are committed as soon as they are
+    # fetched, so an interrupted run keeps what it got.
+    with PlayerStore(args.store) as store:
+        if ensure_profile_urls(players, store, cache):
+            print(f"Saved new URLs to '{args.store}'.")
+
+        for name in players:
+            url = store.url(name)
+            if not url:
+                print(f"Skipping '{name}': no URL available.")
+                continue
+            if cache.offline and cache.latest(url) is None:
+                print(f"Skipping '{name}': profile page not cached.")
+                continue
+            print(f"Fetching stats for '{name}'...")
+            tier, skill, rank = fetch_profile_stats(url, cache)
+            store.set_stats(name, tier, skill, rank)
+
+    print(f"All stats updated in '{args.store}'.")
 
 if __name__ == "__main__":
     main()
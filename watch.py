@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Watch mode: poll tagpro.eu for new matches and fold them into running
+totals, refreshing the live stats within one poll interval of a match being
+posted. The totals are checkpointed after every update, so a restarted
+watcher continues where it stopped without re-reading the master CSV.
+
+    python3 watch.py --interval 30
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import signal
+import threading
+import time
+from os.path import join, dirname, abspath, exists, getsize
+
+import pandas as pd
+
+import latest_match
+import stats
+from combine import upgrade_master_header
+from combined_schema import apply_schema
+from eu_ctf import load_bulk_maps, extract_matches, match_event_records
+from event_store import save_event_store
+from heatmaps import update_heatmaps
+from instrumentation import run_metrics
+from match_index import build_match_index, is_eligible, load_match_filters
+from ratings import RatingEngine, RATINGS_FILE
+from windows import DailyTotals, RollingWindow, day_number, window_record, window_csv_name
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+ROOT_DIR            = dirname(abspath(__file__))
+WATCH_DIR           = join(ROOT_DIR, "outputs", "watch")
+LIVE_STATS_DIR      = join(ROOT_DIR, "Stats", "Live")
+CHECKPOINT_FILE     = join(ROOT_DIR, "watch_state.pkl")
+APPEND_JOURNAL      = join(WATCH_DIR, "master_append.json")  # the master append in progress
+BULK_MAPS_FILE      = join(ROOT_DIR, "bulkmaps.json")
+MASTER_COMBINED_CSV = join(ROOT_DIR, "combinedStatsMaster.csv")
+DEFAULT_INTERVAL    = 30  # seconds between polls
+LIVE_WINDOW_DAYS    = 30  # rolling window kept in Stats/Live
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+class WatchState:
+    """Running totals and ratings, plus where they stop: next match id and master CSV size."""
+
+    def __init__(self, next_match_id, master_size=0):
+        self.next_match_id = next_match_id
+        self.master_size = master_size
+        self.overall = stats.new_entry()
+        self.per_map = {}
+        self.map_results = {}
+        self.ratings = RatingEngine()
+        self.daily = DailyTotals()
+        self.rolling = RollingWindow(LIVE_WINDOW_DAYS)
+
+    def fold(self, match_id, match_df):
+        stats.fold_match(match_id, match_df, self.overall, self.per_map, self.map_results, self.ratings)
+        counted = self.daily.add_match(match_df)
+        if counted:
+            self.rolling.add_match(match_df, *counted)
+
+    @classmethod
+    def bootstrap(cls, master_csv):
+        """Fold the whole master CSV once; the starting point without a checkpoint."""
+        state = cls(latest_match.read_previous_match_id())
+        if exists(master_csv):
+            for match_id, match_df in stats.iter_matches(master_csv):
+                state.fold(match_id, match_df)
+            state.master_size = getsize(master_csv)
+        return state
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def restore_master(master_csv, size, journal=APPEND_JOURNAL):
+    """
+    Undo the master append of an interrupted update: cut out the bytes it
+    recorded in `journal`, keeping anything appended after them. Returns
+    False if the master is then not the checkpointed one, i.e. it was
+    changed outside watch (for example by combine.py).
+    """
+    current = getsize(master_csv) if exists(master_csv) else 0
+    pending = None
+    if exists(journal):
+        with open(journal) as f:
+            pending = json.load(f)
+        os.remove(journal)
+    if pending is None or pending['offset'] != size or current <= size:
+        return current == size
+
+    with open(master_csv, 'r+b') as f:
+        f.seek(size)
+        ours = f.read(pending['length'])
+        if len(ours) == pending['length'] and hashlib.sha256(ours).hexdigest() != pending['sha256']:
+            return False
+        rest = f.read()  # empty unless another writer appended after the update
+        f.seek(size)
+        f.write(rest)
+        f.truncate()
+    print(f"[watch] removed the {len(ours)} bytes an interrupted update appended to {master_csv}")
+    return not rest
+
+
+def append_rows(master_csv, rows, journal=APPEND_JOURNAL):
+    """
+    Append combined rows to the master CSV in its column order, recording
+    the offset, length and hash of the append in `journal` first so that
+    restore_master can undo exactly this append. Returns the new size.
+    """
+    offset = getsize(master_csv) if exists(master_csv) else 0
+    if offset > 0:
+        header = pd.read_csv(master_csv, nrows=0).columns
+        data = rows.reindex(columns=header).to_csv(header=False, index=False)
+    else:
+        data = rows.to_csv(index=False)
+    data = data.encode()
+    with open(journal + '.tmp', 'w') as f:
+        json.dump({'offset': offset, 'length': len(data), 'sha256': hashlib.sha256(data).hexdigest()}, f)
+    os.replace(journal + '.tmp', journal)
+    with open(master_csv, 'ab') as f:
+        f.write(data)
+    return offset + len(data)
+
+
+def resume(state):
+    """
+    The checkpointed state with the master restored to match it, or, if the
+    master was changed outside watch, a new state folded from the master.
+    """
+    if restore_master(MASTER_COMBINED_CSV, state.master_size, APPEND_JOURNAL):
+        return state
+    print(f"[watch] {MASTER_COMBINED_CSV} changed since the checkpoint; folding it again")
+    state = WatchState.bootstrap(MASTER_COMBINED_CSV)
+    state.save(CHECKPOINT_FILE)
+    return state
+
+
+def fetch_new_matches(state):
+    """The bulk data of every match posted since the last update ({} if none)."""
+    latest_id = latest_match.poll_latest_match_id()
+    if latest_id < state.next_match_id:
+        return latest_id, {}
+    return latest_id, latest_match.download_matches(state.next_match_id, latest_id)
+
+
+def update(state, bulk_maps, filters):
+    """
+    One poll: fetch, extract and fold new matches, append them to the master
+    CSV and refresh the live stats. Returns the number of matches folded.
+    """
+    run_metrics.reset()
+    # Rows appended by anyone else would be missing from the totals.
+    if (getsize(MASTER_COMBINED_CSV) if exists(MASTER_COMBINED_CSV) else 0) != state.master_size:
+        raise RuntimeError(f"{MASTER_COMBINED_CSV} was changed outside watch")
+    with run_metrics.stage('fetch'):
+        latest_id, new_matches = fetch_new_matches(state)
+    if not new_matches:
+        return 0
+
+    index = build_match_index(new_matches)
+    eligible = []
+    for mid in sorted(new_matches, key=int):
+        if is_eligible(index[mid], filters):
+            eligible.append(mid)
+        else:
+            run_metrics.counters['filtered'] += 1
+    with run_metrics.stage('extract'):
+        rows, failures = extract_matches(eligible, new_matches, bulk_maps, index, filters)
+    # Failures are kept per update, next to its event store.
+    for mid, e in failures.items():
+        print(f"[watch] ✖ match {mid} failed: {e}")
+    if failures:
+        with open(join(WATCH_DIR, f"failed_{state.next_match_id}_{latest_id}.txt"), 'w') as f:
+            f.writelines(f"{mid}\t{e}\n" for mid, e in failures.items())
+
+    changed_maps = set()
+    master_size = state.master_size
+    if len(rows):
+        # A master from before a column was added gets it now; checkpoint the
+        # new size so a restart never truncates into the rewritten file.
+        if upgrade_master_header(MASTER_COMBINED_CSV, list(rows.columns)) and \
+                getsize(MASTER_COMBINED_CSV) != state.master_size:
+            state.master_size = master_size = getsize(MASTER_COMBINED_CSV)
+            state.save(CHECKPOINT_FILE)
+        with run_metrics.stage('fold'):
+            for match_id, match_df in apply_schema(rows).groupby('matchId', sort=False):
+                state.fold(match_id, match_df)
+                changed_maps.add(match_df['mapName'].iloc[0])
+        with run_metrics.stage('master_append'):
+            master_size = append_rows(MASTER_COMBINED_CSV, rows, APPEND_JOURNAL)
+        with run_metrics.stage('event_store'):
+            save_event_store(join(WATCH_DIR, f"events_{state.next_match_id}_{latest_id}.npz"),
+                             match_event_records.items())
+        with run_metrics.stage('heatmaps'):
+            update_heatmaps(match_event_records.items(), index, bulk_maps)
+        match_event_records.clear()
+
+    with run_metrics.stage('refresh'):
+        os.makedirs(LIVE_STATS_DIR, exist_ok=True)
+        state.rolling.advance(state.daily, day_number(time.time()))
+        state.daily.drop_before(state.rolling.first_day)
+        window_record(state.rolling.total).to_csv(
+            join(LIVE_STATS_DIR, window_csv_name(f"last_{LIVE_WINDOW_DAYS}_days")), index=False)
+        stats.write_stats(LIVE_STATS_DIR, state.overall, state.per_map, state.map_results,
+                          maps=[m for m in changed_maps if m in state.per_map], excel=False,
+                          ratings=state.ratings)
+
+    # Checkpoint last: until it is written, a restart redoes this update.
+    state.next_match_id = latest_id + 1
+    state.master_size = master_size
+    state.save(CHECKPOINT_FILE)
+    if exists(APPEND_JOURNAL):
+        os.remove(APPEND_JOURNAL)
+    state.ratings.save(RATINGS_FILE)
+    latest_match.update_latest_match_file(latest_id)
+    run_metrics.write(join(WATCH_DIR, "metrics.json"))
+    return run_metrics.counters['processed']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll tagpro.eu and keep the live stats up to date.")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="seconds between polls")
+    parser.add_argument('--once', action='store_true', help="run a single update and exit")
+    parser.add_argument('--excel', action='store_true',
+                        help="also rewrite the Excel workbook in Stats/Live on shutdown")
+    args = parser.parse_args()
+
+    os.makedirs(WATCH_DIR, exist_ok=True)
+    if exists(CHECKPOINT_FILE):
+        state = resume(WatchState.load(CHECKPOINT_FILE))
+        print(f"[watch] resumed from checkpoint at match {state.next_match_id}")
+    else:
+        state = WatchState.bootstrap(MASTER_COMBINED_CSV)
+        state.save(CHECKPOINT_FILE)
+        print(f"[watch] folded {MASTER_COMBINED_CSV}; starting at match {state.next_match_id}")
+
+    bulk_maps = load_bulk_maps(BULK_MAPS_FILE)
+    filters = load_match_filters()
+
+    # Finish the current update on SIGINT/SIGTERM, then stop.
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            n = update(state, bulk_maps, filters)
+            if n:
+                print(f"[watch] ✓ folded {n} new matches in {time.perf_counter() - start:.1f}s; "
+                      f"next match {state.next_match_id}")
+        except Exception as e:
+            print(f"[watch] ✖ update failed, retrying in {args.interval:g}s: {e}")
+            # Totals may be partly folded: go back to the last checkpoint.
+            state = resume(WatchState.load(CHECKPOINT_FILE))
+        if args.once:
+            break
+        stop.wait(args.interval)
+
+    if args.excel:
+        stats.write_stats(LIVE_STATS_DIR, state.overall, state.per_map, state.map_results,
+                          ratings=state.ratings)
+    print("[watch] stopped.")
+
+
+if __name__ == "__main__":
+    main()
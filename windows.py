@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Date-windowed player stats ("last 30 days", seasons) from the master CSV.
+
+Counted matches are folded once into per-day totals; any window is then the
+sum of its days, and a rolling window is kept current by adding new matches
+and subtracting the days that fall out of it. Rows without a matchDate
+(masters written before it was recorded) only count towards all-time stats.
+
+    python3 windows.py combinedStatsMaster.csv --last 30 --last 7 \
+        --range "Season 5=2025-01-06:2025-03-30"
+"""
+import argparse
+import math
+import os
+from datetime import datetime, timezone
+
+import stats
+from combined_schema import KEY_COLUMN
+
+# ─── CONSTANTS ────────────────────────────────────────────────────────────────
+DAY_SECONDS = 86400
+WINDOWS_DIR = os.path.join("Stats", "Windows")
+# ────────────────────────────────────────────────────────────────────────────────
+
+
+def day_number(timestamp):
+    """UTC day of a unix timestamp (days since 1970-01-01)."""
+    return int(timestamp // DAY_SECONDS)
+
+
+def parse_day(text):
+    return day_number(datetime.strptime(text, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def day_label(day):
+    return datetime.fromtimestamp(day * DAY_SECONDS, timezone.utc).strftime('%Y-%m-%d')
+
+
+def match_day(match_df):
+    """The UTC day a match was played, or None without a matchDate."""
+    if 'matchDate' not in match_df:
+        return None
+    dates = match_df['matchDate'].dropna()
+    if dates.empty or not math.isfinite(float(dates.iloc[0])):
+        return None
+    return day_number(float(dates.iloc[0]))
+
+
+def fold_into(entry, match_df, winner):
+    names = match_df['Player'].tolist()
+    keys = match_df[KEY_COLUMN].tolist()
+    stats.update_entry(entry, match_df, keys, names, winner)
+
+
+class DailyTotals:
+    """Per-day player totals of counted matches, keyed by UTC day number."""
+
+    def __init__(self):
+        self.days = {}
+
+    def add_match(self, match_df):
+        """Fold one match into its day; returns (day, winner), or None if not counted."""
+        day = match_day(match_df)
+        score = stats.match_score(match_df)
+        if day is None or score is None:
+            return None
+        winner = 'red' if score[0] > score[1] else 'blue'
+        fold_into(self.days.setdefault(day, stats.new_entry()), match_df, winner)
+        return day, winner
+
+    def drop_before(self, first_day):
+        """Forget the days before first_day, once no window will include them again."""
+        for day in [d for d in self.days if d < first_day]:
+            del self.days[day]
+
+    def window(self, first_day, last_day):
+        """Totals over days first_day..last_day (inclusive)."""
+        total = stats.new_entry()
+        for day in sorted(d for d in self.days if first_day <= d <= last_day):
+            total.merge(self.days[day])
+        return total
+
+
+class RollingWindow:
+    """
+    Totals of the `days` most recent days up to a moving last day. New
+    matches are added directly; advancing subtracts the expired days and adds
+    the entering ones, so an update costs the days that changed, not the
+    window or the whole history.
+    """
+
+    def __init__(self, days):
+        self.days = days
+        self.first_day = self.last_day = None
+        self.total = stats.new_entry()
+
+    def add_match(self, match_df, day, winner):
+        """Call for every match added to the DailyTotals this window follows."""
+        if self.last_day is not None and self.first_day <= day <= self.last_day:
+            fold_into(self.total, match_df, winner)
+
+    def advance(self, daily, last_day):
+        first_day = last_day - self.days + 1
+        if self.last_day is None:
+            self.total = daily.window(first_day, last_day)
+        else:
+            old_days = range(self.first_day, self.last_day + 1)
+            new_days = range(first_day, last_day + 1)
+            for day in old_days:
+                if day not in new_days and day in daily.days:
+                    self.total.merge(daily.days[day], -1)
+            for day in new_days:
+                if day not in old_days and day in daily.days:
+                    self.total.merge(daily.days[day])
+        self.first_day, self.last_day = first_day, last_day
+
+
+def window_record(entry):
+    """stats.build_record for a window, without players who have no games in it."""
+    df = stats.build_record(entry).sort_values(by='Minutes', ascending=False)
+    return df[df['Games'] > 0]
+
+
+def window_csv_name(label):
+    return f"players_stats_{label.replace(' ', '_').replace('/', '_')}.csv"
+
+
+def parse_range(text):
+    """'[name=]YYYY-MM-DD:YYYY-MM-DD' → (label, first day, last day)."""
+    name, _, span = text.rpartition('=')
+    start, end = span.split(':')
+    return name or f"{start}_{end}", parse_day(start), parse_day(end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write player stats for date windows of the master CSV.")
+    parser.add_argument('input_csv', metavar='combinedStatsMaster.csv')
+    parser.add_argument('--last', type=int, action='append', default=[], metavar='DAYS',
+                        help="a window of the last DAYS days up to --as-of (repeatable)")
+    parser.add_argument('--range', action='append', default=[], metavar='[NAME=]START:END',
+                        help="a fixed window of dates, inclusive, e.g. 'Season 5=2025-01-06:2025-03-30' (repeatable)")
+    parser.add_argument('--as-of', help="last day of the --last windows (default: today, UTC)")
+    parser.add_argument('--out', default=WINDOWS_DIR)
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args()
+
+    daily = DailyTotals()
+    for _, match_df in stats.iter_matches(args.input_csv, args.chunksize):
+        daily.add_match(match_df)
+
+    today = parse_day(args.as_of) if args.as_of else day_number(datetime.now(timezone.utc).timestamp())
+    windows = [(f"last_{n}_days", today - n + 1, today) for n in args.last]
+    windows += [parse_range(r) for r in args.range]
+
+    os.makedirs(args.out, exist_ok=True)
+    for label, first_day, last_day in windows:
+        df = window_record(daily.window(first_day, last_day))
+        path = os.path.join(args.out, window_csv_name(label))
+        df.to_csv(path, index=False)
+        print(f"[windows] {label} ({day_label(first_day)} → {day_label(last_day)}): {len(df)} players → {path}")
+
+
+if __name__ == "__main__":
+    main()